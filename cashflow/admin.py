@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Status, Type, Category, Subcategory, CashFlowRecord
+from .models import Budget, Status, Type, Category, Subcategory, CashFlowRecord, Job, RecurringTemplate, Tenant
 
 
 @admin.register(Status)
@@ -10,6 +10,43 @@ class StatusAdmin(admin.ModelAdmin):
     search_fields = ('name',)  # Fields to enable search functionality
 
 
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Admin interface for monitoring background jobs."""
+
+    list_display = ('id', 'kind', 'status', 'progress', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+
+
+@admin.register(RecurringTemplate)
+class RecurringTemplateAdmin(admin.ModelAdmin):
+    """Admin interface for recurring transaction templates."""
+
+    list_display = ('name', 'frequency', 'interval', 'amount', 'start_date', 'end_date', 'active', 'materialized_until')
+    list_filter = ('frequency', 'active')
+    search_fields = ('name',)
+
+
+@admin.register(Budget)
+class BudgetAdmin(admin.ModelAdmin):
+    """Admin interface for category and subcategory budgets."""
+
+    list_display = ('category', 'subcategory', 'period', 'limit')
+    list_filter = ('period', 'category')
+
+
+@admin.register(Tenant)
+class TenantAdmin(admin.ModelAdmin):
+    """Admin interface for the tenant registry (use ``manage.py tenants`` to create or move)."""
+
+    list_display = ('slug', 'name', 'database', 'created_at')
+    readonly_fields = ('slug', 'database')
+    search_fields = ('slug', 'name')
+
+    def has_add_permission(self, request):
+        return False
+
+
 # Standard registration for other models
 admin.site.register(Type)
 admin.site.register(Category)
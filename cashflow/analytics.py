@@ -0,0 +1,207 @@
+"""
+Vectorized statistics and anomaly detection on record amounts.
+
+The amounts, dates and categories of a filtered selection are streamed from
+the database with ``values_list`` in chunks straight into NumPy arrays; no
+model instances are created. All statistics are then computed on whole
+arrays: grouping uses ``bincount`` over category indexes and a single sort,
+daily series use cumulative sums.
+"""
+from itertools import islice
+
+import numpy as np
+
+from .models import Category
+
+DEFAULT_CHUNK_SIZE = 5000
+PERCENTILES = (10, 25, 50, 75, 90, 95, 99)
+
+
+def load_arrays(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Load ids, dates, amounts and category ids of a queryset into arrays.
+
+    Args:
+        queryset: CashFlowRecord queryset (e.g. ``CashFlowFilter(...).qs``)
+        chunk_size: Rows fetched from the database cursor at a time
+
+    Returns:
+        dict: ``ids`` (int64), ``dates`` (datetime64[D]), ``amounts``
+        (float64) and ``categories`` (int64) arrays of equal length
+    """
+    rows = queryset.order_by().values_list('id', 'date', 'amount', 'category_id').iterator(chunk_size=chunk_size)
+    chunks = []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        ids, dates, amounts, categories = zip(*chunk)
+        chunks.append((
+            np.array(ids, dtype=np.int64),
+            np.array(dates, dtype='datetime64[D]'),
+            np.array(amounts, dtype=np.float64),
+            np.array(categories, dtype=np.int64),
+        ))
+    if not chunks:
+        return {
+            'ids': np.empty(0, dtype=np.int64),
+            'dates': np.empty(0, dtype='datetime64[D]'),
+            'amounts': np.empty(0, dtype=np.float64),
+            'categories': np.empty(0, dtype=np.int64),
+        }
+    ids, dates, amounts, categories = (np.concatenate(column) for column in zip(*chunks))
+    return {'ids': ids, 'dates': dates, 'amounts': amounts, 'categories': categories}
+
+
+def summarize(amounts):
+    """Count, total, mean, standard deviation and percentiles of an array."""
+    if not amounts.size:
+        return {'count': 0}
+    percentiles = np.percentile(amounts, PERCENTILES)
+    return {
+        'count': int(amounts.size),
+        'total': round(float(amounts.sum()), 2),
+        'mean': round(float(amounts.mean()), 2),
+        'std': round(float(amounts.std()), 2),
+        'min': round(float(amounts.min()), 2),
+        'max': round(float(amounts.max()), 2),
+        'median': round(float(np.median(amounts)), 2),
+        'percentiles': {f'p{p}': round(float(value), 2) for p, value in zip(PERCENTILES, percentiles)},
+    }
+
+
+def group_stats(amounts, groups):
+    """Per-group statistics plus per-row group mean, std and quartiles.
+
+    Args:
+        amounts: float64 array
+        groups: Group key per amount
+
+    Returns:
+        tuple: ``(keys, stats, row_stats)`` where ``stats`` maps each key to
+        its summary and ``row_stats`` holds ``mean``, ``std``, ``q1`` and
+        ``q3`` arrays aligned with ``amounts``
+    """
+    keys, inverse, counts = np.unique(groups, return_inverse=True, return_counts=True)
+    sums = np.bincount(inverse, weights=amounts, minlength=keys.size)
+    means = sums / counts
+    variances = np.bincount(inverse, weights=(amounts - means[inverse]) ** 2, minlength=keys.size) / counts
+
+    # One sort groups the rows; each group is then a contiguous, sorted slice
+    order = np.lexsort((amounts, inverse))
+    boundaries = np.concatenate(([0], np.cumsum(counts)))
+    sorted_amounts = amounts[order]
+    q1 = np.empty(keys.size)
+    q3 = np.empty(keys.size)
+    stats = {}
+    for index, key in enumerate(keys):
+        values = sorted_amounts[boundaries[index]:boundaries[index + 1]]
+        stats[key.item()] = summarize(values)
+        q1[index], q3[index] = np.percentile(values, (25, 75))
+
+    row_stats = {
+        'mean': means[inverse],
+        'std': np.sqrt(variances)[inverse],
+        'q1': q1[inverse],
+        'q3': q3[inverse],
+    }
+    return keys, stats, row_stats
+
+
+def rolling_daily(dates, amounts, window):
+    """Daily totals and their trailing ``window``-day rolling average.
+
+    Days without records count as zero, so the average reflects calendar time.
+    """
+    if not dates.size:
+        return []
+    start = dates.min()
+    offsets = (dates - start).astype(np.int64)
+    totals = np.bincount(offsets, weights=amounts)
+    cumulative = np.concatenate(([0.0], np.cumsum(totals)))
+    days = np.arange(totals.size)
+    lower = np.maximum(days + 1 - window, 0)
+    rolling = (cumulative[days + 1] - cumulative[lower]) / (days + 1 - lower)
+    calendar = start + days
+    return [
+        {'date': str(day), 'total': round(float(total), 2), 'rolling_mean': round(float(mean), 2)}
+        for day, total, mean in zip(calendar, totals, rolling)
+    ]
+
+
+def detect_outliers(arrays, row_stats, z_threshold, iqr_factor):
+    """Flag amounts far from their category by z-score or Tukey's IQR fences."""
+    amounts = arrays['amounts']
+    std = row_stats['std']
+    z_scores = np.divide(amounts - row_stats['mean'], std, out=np.zeros_like(amounts), where=std > 0)
+    iqr = row_stats['q3'] - row_stats['q1']
+    low = row_stats['q1'] - iqr_factor * iqr
+    high = row_stats['q3'] + iqr_factor * iqr
+
+    by_z = np.abs(z_scores) >= z_threshold
+    by_iqr = (amounts < low) | (amounts > high)
+    flagged = np.flatnonzero(by_z | by_iqr)
+    flagged = flagged[np.argsort(-np.abs(z_scores[flagged]), kind='stable')]
+    return [
+        {
+            'id': int(arrays['ids'][index]),
+            'date': str(arrays['dates'][index]),
+            'category_id': int(arrays['categories'][index]),
+            'amount': round(float(amounts[index]), 2),
+            'z_score': round(float(z_scores[index]), 2),
+            'methods': [name for name, mask in (('zscore', by_z), ('iqr', by_iqr)) if mask[index]],
+        }
+        for index in flagged
+    ]
+
+
+def analyze(queryset, window=7, z_threshold=3.0, iqr_factor=1.5, max_outliers=100, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Compute statistics and outliers for a record selection.
+
+    Args:
+        queryset: CashFlowRecord queryset to analyze
+        window: Rolling average window in days
+        z_threshold: Absolute z-score at which an amount is an outlier
+        iqr_factor: Multiple of the IQR beyond the quartiles that is an outlier
+        max_outliers: Number of outliers returned, most extreme first
+        chunk_size: Rows fetched from the database cursor at a time
+
+    Returns:
+        dict: JSON-serializable ``overall``, ``categories``, ``daily``,
+        ``outliers`` and ``outlier_count`` results
+    """
+    return analyze_arrays(load_arrays(queryset, chunk_size), None, window, z_threshold, iqr_factor, max_outliers)
+
+
+def analyze_arrays(arrays, category_names=None, window=7, z_threshold=3.0, iqr_factor=1.5, max_outliers=100):
+    """``analyze`` on arrays shaped like the result of ``load_arrays``.
+
+    Args:
+        arrays: ``ids``, ``dates``, ``amounts`` and ``categories`` arrays
+            (e.g. from a columnar snapshot, see snapshot.py)
+        category_names: ``{category id: name}``; looked up in the database
+            when None
+    """
+    result = {
+        'overall': summarize(arrays['amounts']),
+        'categories': [],
+        'daily': [],
+        'outliers': [],
+        'outlier_count': 0,
+    }
+    if not arrays['amounts'].size:
+        return result
+
+    keys, stats, row_stats = group_stats(arrays['amounts'], arrays['categories'])
+    if category_names is None:
+        category_names = dict(Category.objects.filter(pk__in=keys.tolist()).values_list('id', 'name'))
+    result['categories'] = [
+        {'category_id': key, 'category': category_names.get(key, ''), **summary}
+        for key, summary in sorted(stats.items(), key=lambda item: -item[1]['total'])
+    ]
+    result['daily'] = rolling_daily(arrays['dates'], arrays['amounts'], window)
+    outliers = detect_outliers(arrays, row_stats, z_threshold, iqr_factor)
+    result['outlier_count'] = len(outliers)
+    result['outliers'] = outliers[:max_outliers]
+    for outlier in result['outliers']:
+        outlier['category'] = category_names.get(outlier['category_id'], '')
+    return result
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CashflowConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cashflow'
+
+    def ready(self):
+        # Connect cache invalidation signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,166 @@
+"""
+Online backups of the SQLite database.
+
+``backup_database`` copies the live database with SQLite's backup API a few
+pages at a time and sleeps between steps. The source is read-locked only
+while a step runs, so writers are stalled for at most one step instead of the
+whole copy; the longest step is reported as ``max_step_ms``, an upper bound of
+how long a writer waited (not a measured wait). A write from another
+connection makes SQLite restart the copy, so a busy database is given until
+``timeout`` seconds before the backup fails. The copy is written under a
+temporary name and only renamed into place once it is complete (and,
+optionally, passed ``PRAGMA integrity_check``).
+"""
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BACKUP_PREFIX = 'cashflow-'
+BACKUP_SUFFIXES = ('.sqlite3', '.sqlite3.gz')
+
+
+class BackupError(Exception):
+    """Raised when a backup cannot be made or fails verification."""
+
+
+def backup_dir():
+    """Return the directory that holds backups."""
+    return os.fspath(settings.CASHFLOW_BACKUP_DIR)
+
+
+def _source_connection(alias):
+    """Open the database to back up; returns ``(connection, close_after)``."""
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        raise BackupError(f'Online backup needs SQLite, {alias!r} uses {connection.vendor}')
+    if connection.is_in_memory_db():
+        # A separate connection would see an empty database
+        connection.ensure_connection()
+        return connection.connection, False
+    name = os.fspath(connection.settings_dict['NAME'])
+    return sqlite3.connect(f'file:{name}?mode=ro', uri=True, timeout=connection.settings_dict['OPTIONS'].get('timeout', 5)), True
+
+
+def backup_database(directory=None, alias='default', pages=256, sleep=0.05, compress=False, integrity_check=False,
+                    timeout=None):
+    """Copy the live database to a timestamped file.
+
+    Args:
+        directory: Destination directory (defaults to ``CASHFLOW_BACKUP_DIR``)
+        alias: Database alias to back up
+        pages: Pages copied per step; smaller steps mean shorter writer stalls
+        sleep: Seconds to pause between steps so writers can proceed
+        compress: Gzip the finished copy
+        integrity_check: Run ``PRAGMA integrity_check`` on the copy
+        timeout: Seconds the copy may take, restarts included (defaults to
+            ``CASHFLOW_BACKUP_TIMEOUT``)
+
+    Returns:
+        dict: ``path``, ``bytes`` (size of the written file), ``pages``, ``steps``, ``restarts``,
+        ``seconds``, ``mb_per_second`` and ``max_step_ms``
+
+    Raises:
+        BackupError: If the database is not SQLite, the copy is corrupt or
+            writers kept it from finishing within ``timeout``
+    """
+    timeout = settings.CASHFLOW_BACKUP_TIMEOUT if timeout is None else timeout
+    directory = directory or backup_dir()
+    os.makedirs(directory, exist_ok=True)
+    # Microseconds keep backups started within the same second apart
+    name = f'{BACKUP_PREFIX}{timezone.now():%Y%m%d-%H%M%S-%f}.sqlite3'
+    path = os.path.join(directory, name)
+    partial = path + '.part'
+
+    stats = {'steps': 0, 'restarts': 0, 'max_step_ms': 0.0, 'pages': 0}
+    step_started = time.perf_counter()
+    previous_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal step_started, previous_remaining
+        now = time.perf_counter()
+        stats['steps'] += 1
+        stats['pages'] = total
+        stats['max_step_ms'] = max(stats['max_step_ms'], (now - step_started) * 1000)
+        if previous_remaining is not None and remaining > previous_remaining:
+            stats['restarts'] += 1
+        previous_remaining = remaining
+        # Raising aborts the copy; the partial file is removed below
+        if remaining and now - started > timeout:
+            raise BackupError(
+                f"Backup did not finish within {timeout} s ({stats['restarts']} restarts by concurrent writes)"
+            )
+        if remaining and sleep:
+            time.sleep(sleep)
+        step_started = time.perf_counter()
+
+    source, close_source = _source_connection(alias)
+    started = time.perf_counter()
+    try:
+        destination = sqlite3.connect(partial)
+        try:
+            source.backup(destination, pages=pages, progress=progress)
+            copied = stats['pages'] * destination.execute('PRAGMA page_size').fetchone()[0]
+            if integrity_check:
+                result = destination.execute('PRAGMA integrity_check').fetchone()[0]
+                if result != 'ok':
+                    raise BackupError(f'Integrity check failed: {result}')
+        finally:
+            destination.close()
+    except Exception:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        if close_source:
+            source.close()
+
+    if compress:
+        with open(partial, 'rb') as raw, gzip.open(partial + '.gz', 'wb') as packed:
+            shutil.copyfileobj(raw, packed, 1024 * 1024)
+        os.remove(partial)
+        partial, path = partial + '.gz', path + '.gz'
+    os.replace(partial, path)
+
+    seconds = time.perf_counter() - started
+    stats.update(
+        path=path,
+        bytes=os.path.getsize(path),
+        seconds=round(seconds, 3),
+        mb_per_second=round(copied / 1024 / 1024 / seconds, 2) if seconds else 0.0,
+        max_step_ms=round(stats['max_step_ms'], 3),
+    )
+    logger.info(
+        'Backup %s: %d pages in %d steps (%d restarts), %.2f s (%.2f MB/s), longest step %.1f ms',
+        path, stats['pages'], stats['steps'], stats['restarts'], seconds, stats['mb_per_second'],
+        stats['max_step_ms'],
+    )
+    return stats
+
+
+def list_backups(directory=None):
+    """Return backup file paths, oldest first."""
+    directory = directory or backup_dir()
+    if not os.path.isdir(directory):
+        return []
+    return [
+        os.path.join(directory, name) for name in sorted(os.listdir(directory))
+        if name.startswith(BACKUP_PREFIX) and name.endswith(BACKUP_SUFFIXES)
+    ]
+
+
+def rotate_backups(keep, directory=None):
+    """Delete all but the ``keep`` newest backups; return the removed paths."""
+    backups = list_backups(directory)
+    expired = backups[:-keep] if keep > 0 else []
+    for path in expired:
+        os.remove(path)
+    return expired
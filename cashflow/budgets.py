@@ -0,0 +1,220 @@
+"""
+Budgets compared with actual spending.
+
+Actual figures never come from the records table. ``PeriodAggregate``
+holds the monthly total and count per type, category and subcategory, and
+three SQLite triggers on the records table keep it current: every insert,
+delete or relevant update adjusts one or two aggregate rows inside the
+statement that writes the record, so the aggregates commit or roll back
+with it. This covers every write path (forms, ``bulk_create`` including
+ignored conflicts, ``bulk_update``, raw SQL). Checking every budget then
+reads at most a few aggregate rows per budget.
+
+Rebuilding a table in a migration drops its triggers on SQLite, so
+``ensure_triggers`` runs after every ``migrate`` and recomputes the
+aggregates when a trigger was missing. Other database backends get no
+triggers; ``manage.py rebuild_aggregates --check`` reports any drift.
+"""
+from calendar import monthrange
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models import BigIntegerField, Count, F, Sum
+from django.db.models.functions import Cast, Round, TruncMonth
+
+from .forecast import income_type_ids
+from .models import Budget, CashFlowRecord, PeriodAggregate
+from .tenants import db_alias
+
+# Months per budget period
+PERIOD_MONTHS = {Budget.PERIOD_MONTH: 1, Budget.PERIOD_QUARTER: 3, Budget.PERIOD_YEAR: 12}
+
+_OLD_KEY = (
+    "category_id = OLD.category_id AND month = date(OLD.date, 'start of month') "
+    'AND subcategory_id = OLD.subcategory_id AND type_id = OLD.type_id'
+)
+_ADD = '''
+    INSERT INTO {aggregates} (month, type_id, category_id, subcategory_id, amount_minor, records)
+    VALUES (
+        date(NEW.date, 'start of month'), NEW.type_id, NEW.category_id, NEW.subcategory_id,
+        CAST(ROUND(NEW.amount * 100) AS INTEGER), 1
+    )
+    ON CONFLICT (category_id, month, subcategory_id, type_id) DO UPDATE
+    SET amount_minor = amount_minor + excluded.amount_minor, records = records + 1;
+'''
+_SUBTRACT = '''
+    UPDATE {aggregates}
+    SET amount_minor = amount_minor - CAST(ROUND(OLD.amount * 100) AS INTEGER), records = records - 1
+    WHERE {old_key};
+    DELETE FROM {aggregates} WHERE records <= 0 AND {old_key};
+'''
+TRIGGERS = {
+    'cashflow_aggregate_insert': 'AFTER INSERT ON {records} BEGIN' + _ADD + 'END',
+    'cashflow_aggregate_delete': 'AFTER DELETE ON {records} BEGIN' + _SUBTRACT + 'END',
+    'cashflow_aggregate_update': (
+        'AFTER UPDATE OF date, type_id, category_id, subcategory_id, amount ON {records} '
+        'WHEN OLD.date IS NOT NEW.date OR OLD.type_id IS NOT NEW.type_id '
+        'OR OLD.category_id IS NOT NEW.category_id OR OLD.subcategory_id IS NOT NEW.subcategory_id '
+        'OR OLD.amount IS NOT NEW.amount BEGIN' + _SUBTRACT + _ADD + 'END'
+    ),
+}
+
+
+def _trigger_sql(name):
+    return f'CREATE TRIGGER {name} ' + TRIGGERS[name].format(
+        records=CashFlowRecord._meta.db_table,
+        aggregates=PeriodAggregate._meta.db_table,
+        old_key=_OLD_KEY,
+    )
+
+
+def ensure_triggers(using=None):
+    """Create the aggregate triggers that are missing and rebuild the aggregates if any was.
+
+    Returns:
+        list: Names of the triggers created
+    """
+    using = using or db_alias()
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+    missing = [name for name in TRIGGERS if name not in existing]
+    if missing:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            for name in missing:
+                cursor.execute(_trigger_sql(name))
+            rebuild_aggregates(using)
+    return missing
+
+
+def expected_aggregates(using=None):
+    """``{(category, month, subcategory, type): (amount_minor, records)}`` computed from the records."""
+    rows = CashFlowRecord.objects.using(using or db_alias()).order_by().annotate(
+        month=TruncMonth('date'),
+    ).values('category_id', 'month', 'subcategory_id', 'type_id').annotate(
+        amount_minor=Sum(Cast(Round(F('amount') * 100), BigIntegerField())),
+        records=Count('id'),
+    ).values_list('category_id', 'month', 'subcategory_id', 'type_id', 'amount_minor', 'records')
+    return {tuple(row[:4]): (row[4], row[5]) for row in rows}
+
+
+def stored_aggregates(using=None):
+    """The aggregates as stored, keyed like ``expected_aggregates``."""
+    rows = PeriodAggregate.objects.using(using or db_alias()).values_list(
+        'category_id', 'month', 'subcategory_id', 'type_id', 'amount_minor', 'records',
+    )
+    return {tuple(row[:4]): (row[4], row[5]) for row in rows}
+
+
+def rebuild_aggregates(using=None):
+    """Recompute every aggregate from the records in one transaction.
+
+    Returns:
+        int: Number of aggregate rows written
+    """
+    using = using or db_alias()
+    aggregates = expected_aggregates(using)
+    with transaction.atomic(using=using):
+        PeriodAggregate.objects.using(using).all().delete()
+        PeriodAggregate.objects.using(using).bulk_create([
+            PeriodAggregate(
+                category_id=category, month=month, subcategory_id=subcategory, type_id=type_id,
+                amount_minor=amount_minor, records=records,
+            )
+            for (category, month, subcategory, type_id), (amount_minor, records) in aggregates.items()
+        ], batch_size=1000)
+    return len(aggregates)
+
+
+def period_bounds(period, day):
+    """First day of the budget period containing ``day`` and first day after it."""
+    months = PERIOD_MONTHS[period]
+    first_month = (day.month - 1) // months * months + 1
+    start = date(day.year, first_month, 1)
+    last = date(day.year, first_month + months - 1, 1)
+    return start, last + timedelta(days=monthrange(last.year, last.month)[1])
+
+
+def _months(start, end):
+    month = start
+    while month < end:
+        yield month
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def budget_report(today=None):
+    """Spending against every budget for the periods containing ``today``.
+
+    Spending is the total of records whose type is not an income type
+    (``CASHFLOW_INCOME_TYPES``). Runs three queries whatever the number of
+    records: budgets, types and the aggregates of the budgeted months.
+
+    Returns:
+        dict: ``date`` and ``budgets``, a list of dicts with ``id``,
+        ``category``, ``subcategory`` (or None), ``period``, ``start``,
+        ``end`` (inclusive), ``limit``, ``spent``, ``remaining``, ``used``
+        (share of the limit), ``burn_rate`` (spent per elapsed day),
+        ``projected`` (spending at this rate by the period end),
+        ``daily_allowance`` (remaining per day left) and ``status``
+        (``ok``, ``at_risk`` or ``over``)
+    """
+    today = today or date.today()
+    budgets = list(Budget.objects.select_related('category', 'subcategory').order_by(
+        'category__name', F('subcategory__name').asc(nulls_first=True), 'period',
+    ))
+    if not budgets:
+        return {'date': today.isoformat(), 'budgets': []}
+
+    bounds = {budget.pk: period_bounds(budget.period, today) for budget in budgets}
+    spending = PeriodAggregate.objects.filter(
+        category_id__in={budget.category_id for budget in budgets},
+        month__gte=min(start for start, _ in bounds.values()),
+        month__lt=max(end for _, end in bounds.values()),
+    ).exclude(type_id__in=income_type_ids()).values_list('category_id', 'subcategory_id', 'month').annotate(
+        total=Sum('amount_minor'),
+    ).order_by()
+    by_category, by_subcategory = {}, {}
+    for category, subcategory, month, total in spending:
+        by_category[category, month] = by_category.get((category, month), 0) + total
+        by_subcategory[subcategory, month] = total
+
+    rows = []
+    for budget in budgets:
+        start, end = bounds[budget.pk]
+        if budget.subcategory_id:
+            minor = sum(by_subcategory.get((budget.subcategory_id, month), 0) for month in _months(start, end))
+        else:
+            minor = sum(by_category.get((budget.category_id, month), 0) for month in _months(start, end))
+        spent = Decimal(minor) / 100
+        days = (end - start).days
+        elapsed = min(max((today - start).days + 1, 1), days)
+        burn_rate = spent / elapsed
+        projected = burn_rate * days
+        remaining = budget.limit - spent
+        if spent > budget.limit:
+            status = 'over'
+        elif projected > budget.limit:
+            status = 'at_risk'
+        else:
+            status = 'ok'
+        rows.append({
+            'id': budget.pk,
+            'category': budget.category.name,
+            'subcategory': budget.subcategory.name if budget.subcategory_id else None,
+            'period': budget.period,
+            'start': start.isoformat(),
+            'end': (end - timedelta(days=1)).isoformat(),
+            'limit': float(budget.limit),
+            'spent': float(spent),
+            'remaining': float(remaining),
+            'used': round(float(spent / budget.limit), 4) if budget.limit else None,
+            'burn_rate': round(float(burn_rate), 2),
+            'projected': round(float(projected), 2),
+            'daily_allowance': round(float(max(remaining, 0) / (days - elapsed)), 2) if days > elapsed else None,
+            'status': status,
+        })
+    return {'date': today.isoformat(), 'budgets': rows}
@@ -0,0 +1,244 @@
+"""
+Data-versioned caching for pages and query results.
+
+Every committed write to a record or reference table bumps a single data
+version stored in Django's cache backend. Cache keys embed that version, so
+entries built from older data are never read again and simply expire; no
+key enumeration is needed to invalidate them, which keeps the scheme safe to
+share between workers through any cache backend.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+
+from . import metrics
+from .tenants import current_tenant, db_alias
+
+# How long, and over how many versions, per-version change dates are kept
+CHANGES_TIMEOUT = 7 * 24 * 3600
+MAX_CHANGES_LOOKUP = 1000
+
+# Rendered in place of the CSRF token on pages stored in the page cache
+CSRF_PLACEHOLDER = '__cashflow_csrf_token__'
+
+metrics.declare(
+    'page_cache.hits', 'page_cache.misses',
+    'filter_cache.local_hits', 'filter_cache.shared_hits', 'filter_cache.misses',
+)
+
+# Query parameters that do not change which records a filter selects
+NON_FILTER_PARAMS = ('page', 'stream', '_profile')
+
+
+def make_key(*parts):
+    """Build a namespaced cache key from its parts.
+
+    Keys built while a tenant is active are prefixed with its slug, so every
+    tenant has its own data version and cached entries.
+    """
+    tenant = current_tenant()
+    prefix = f'cashflow:tenant:{tenant}:' if tenant else 'cashflow:'
+    return prefix + ':'.join(str(part) for part in parts)
+
+
+def get_data_version():
+    """Return the current data version, initializing it when missing."""
+    key = make_key('data-version')
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never revisits old versions
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(changed_dates=None):
+    """Advance the data version, invalidating every versioned entry.
+
+    Args:
+        changed_dates: Record dates touched by the write, when known; an
+            empty iterable means no record row changed. Consumers that
+            recompute incrementally read this back with ``earliest_change``.
+
+    Returns:
+        int: The new data version
+    """
+    key = make_key('data-version')
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        get_data_version()
+        version = cache.incr(key)
+    if changed_dates is not None:
+        earliest = min(changed_dates, default=None)
+        cache.set(make_key('changes', version), earliest.isoformat() if earliest else '', CHANGES_TIMEOUT)
+    return version
+
+
+def earliest_change(since_version, version):
+    """Return the earliest record date changed after ``since_version``.
+
+    Returns:
+        tuple: ``(known, earliest)``; ``known`` is False when any write in the
+        range did not record its dates (or the entry expired), and
+        ``earliest`` is an ISO date string or None when no record changed
+    """
+    if version - since_version > MAX_CHANGES_LOOKUP or version < since_version:
+        return False, None
+    keys = [make_key('changes', number) for number in range(since_version + 1, version + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys):
+        return False, None
+    dates = [value for value in changes.values() if value]
+    return True, min(dates, default=None)
+
+
+def can_cache():
+    """Whether results read now may be shared through the cache.
+
+    Data read inside an open transaction may include uncommitted writes that
+    are later rolled back, so such results are neither stored nor served.
+    """
+    return not connections[db_alias()].in_atomic_block
+
+
+def normalized_query(query_dict, ignore=()):
+    """Return a canonical query string: sorted keys and values, no blanks."""
+    items = []
+    for key in sorted(query_dict):
+        if key in ignore:
+            continue
+        values = sorted(value for value in query_dict.getlist(key) if value != '')
+        items.extend((key, value) for value in values)
+    return urlencode(items)
+
+
+def page_cache_key(request, name, version):
+    """Cache key for a rendered page: view, language, data version, path and query."""
+    digest = hashlib.sha1(f'{request.path}?{normalized_query(request.GET)}'.encode()).hexdigest()
+    return make_key('page', name, translation.get_language(), version, digest)
+
+
+def versioned_page_cache(view):
+    """
+    Cache the rendered HTML of a GET view under the current data version.
+
+    The page is stored with a CSRF placeholder that is replaced by the
+    requesting client's own token on every response.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            not settings.CASHFLOW_PAGE_CACHE
+            or request.method != 'GET'
+            or getattr(request, 'cashflow_profiling', False)
+            or not can_cache()
+        ):
+            return view(request, *args, **kwargs)
+
+        # Read the version before the data so a concurrent write can only make
+        # the stored page unreachable, never stale
+        key = page_cache_key(request, view.__name__, get_data_version())
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.incr('page_cache.hits')
+            response = HttpResponse(cached.replace(CSRF_PLACEHOLDER, get_token(request)))
+            response['X-Page-Cache'] = 'hit'
+            return response
+
+        metrics.incr('page_cache.misses')
+        request.csrf_token_placeholder = True
+        response = view(request, *args, **kwargs)
+        request.csrf_token_placeholder = False
+        if response.status_code != 200 or response.streaming:
+            return response
+
+        content = response.content.decode(response.charset)
+        cache.set(key, content, settings.CASHFLOW_PAGE_CACHE_TIMEOUT)
+        response.content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+        response['X-Page-Cache'] = 'miss'
+        return response
+    return wrapper
+
+
+class LRUCache:
+    """Thread-safe, size-bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Per-process layer in front of the shared cache for filter results
+filter_results = LRUCache(settings.CASHFLOW_FILTER_CACHE_SIZE)
+
+
+def filter_cache_key(name, query_dict, version):
+    """Cache key for a filter result: result name, data version and normalized filters."""
+    query = normalized_query(query_dict, ignore=NON_FILTER_PARAMS)
+    return make_key('filter', name, version, hashlib.sha1(query.encode()).hexdigest())
+
+
+def cached_filter_result(name, query_dict, compute):
+    """
+    Return the result of a filter query, computing it at most once per data version.
+
+    Results are looked up in the process-local LRU first, then in the shared
+    cache, so workers reuse each other's work and hot filter combinations
+    cost no query at all.
+
+    Args:
+        name: Name of the result kind (e.g. ``record_ids``)
+        query_dict: Request filter parameters; order and blank values are ignored
+        compute: Callable producing the result (a picklable value) on a miss
+    """
+    if not settings.CASHFLOW_FILTER_CACHE or not can_cache():
+        return compute()
+
+    key = filter_cache_key(name, query_dict, get_data_version())
+    result = filter_results.get(key)
+    if result is not None:
+        metrics.incr('filter_cache.local_hits')
+        return result
+
+    result = cache.get(key)
+    if result is not None:
+        metrics.incr('filter_cache.shared_hits')
+    else:
+        metrics.incr('filter_cache.misses')
+        result = compute()
+        cache.set(key, result, settings.CASHFLOW_FILTER_CACHE_TIMEOUT)
+    filter_results.set(key, result)
+    return result
@@ -0,0 +1,13 @@
+from .cache import CSRF_PLACEHOLDER
+
+
+def page_cache_csrf(request):
+    """
+    Render a CSRF placeholder while a page is being stored in the page cache.
+
+    Runs after Django's built-in csrf processor, so it overrides ``csrf_token``
+    only for pages rendered by ``versioned_page_cache``.
+    """
+    if getattr(request, 'csrf_token_placeholder', False):
+        return {'csrf_token': CSRF_PLACEHOLDER}
+    return {}
@@ -0,0 +1,70 @@
+"""
+Duplicate record handling based on content fingerprints.
+
+Policies applied when a new record has the fingerprint of an existing one
+(``CASHFLOW_DUPLICATE_POLICY`` or a per-import override):
+
+- ``skip``: the new record is not saved
+- ``warn``: the new record is saved and the duplicate reported (the form asks
+  for confirmation first)
+- ``merge``: the existing record takes the status and comment of the new one
+  instead of a second record being saved
+"""
+from django.db.models import Aggregate, CharField, Count, Min
+from django.utils import timezone
+
+from .models import CashFlowRecord
+
+POLICY_SKIP = 'skip'
+POLICY_WARN = 'warn'
+POLICY_MERGE = 'merge'
+POLICIES = (POLICY_SKIP, POLICY_WARN, POLICY_MERGE)
+
+# Values copied onto the existing record by the merge policy
+MERGE_FIELDS = ('status', 'comment')
+
+
+class GroupConcat(Aggregate):
+    """``GROUP_CONCAT`` aggregate (SQLite, MySQL)."""
+
+    function = 'GROUP_CONCAT'
+    output_field = CharField()
+
+
+def existing_by_fingerprint(fingerprints, exclude_pk=None):
+    """Map fingerprints to the oldest existing record having them (one indexed query)."""
+    records = CashFlowRecord.objects.filter(fingerprint__in=set(fingerprints)).only(
+        'id', 'fingerprint', 'status', 'comment', 'date'
+    )
+    if exclude_pk is not None:
+        records = records.exclude(pk=exclude_pk)
+    found = {}
+    for record in records.order_by('pk'):
+        found.setdefault(record.fingerprint, record)
+    return found
+
+
+def merge_record(original, incoming):
+    """Copy the merge fields of ``incoming`` onto ``original`` (unsaved)."""
+    for field in MERGE_FIELDS:
+        attname = CashFlowRecord._meta.get_field(field).attname
+        setattr(original, attname, getattr(incoming, attname))
+    # bulk_update() does not apply auto_now
+    original.updated_at = timezone.now()
+    return original
+
+
+def duplicate_groups():
+    """Fingerprints shared by several records, in one grouped query.
+
+    Returns:
+        QuerySet: dicts with ``fingerprint``, ``count``, ``first_id`` and
+        ``ids`` (comma-separated), largest groups first
+    """
+    return (
+        CashFlowRecord.objects.order_by()
+        .values('fingerprint')
+        .annotate(count=Count('id'), first_id=Min('id'), ids=GroupConcat('id'))
+        .filter(count__gt=1)
+        .order_by('-count', 'first_id')
+    )
@@ -0,0 +1,264 @@
+"""
+Live change events for the record list (Server-Sent Events).
+
+Committed writes of records and reference items are published to an
+in-process ``Broker`` holding the most recent events in a ring buffer.
+``stream`` serves them as an ``text/event-stream`` body from an async
+generator, so one ASGI event loop holds many idle connections. Each
+connection costs one waiting coroutine. Clients resume with
+``Last-Event-ID``. Under WSGI, ``backlog`` answers each poll instead and
+resumes from the shared data version.
+
+Writes made by other worker processes (and bulk writes that send no
+signals) are noticed through the shared data version, which the broker
+polls every ``CASHFLOW_EVENTS_POLL`` seconds; they produce a ``refresh``
+event that asks clients to reload the list.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+
+from . import metrics
+from .cache import get_data_version
+from .models import CashFlowRecord, Category, Status, Subcategory, Type
+from .tenants import current_tenant, use_tenant
+
+# Event name of each reference model
+REFERENCE_MODELS = {Status: 'status', Type: 'type', Category: 'category', Subcategory: 'subcategory'}
+RELATION_FIELDS = ('status', 'type', 'category', 'subcategory')
+
+
+class Subscription:
+    """Wake-up signal of one connection, safe to trigger from any thread."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.ready = asyncio.Event()
+
+    def notify(self):
+        try:
+            self.loop.call_soon_threadsafe(self.ready.set)
+        except RuntimeError:
+            # The connection's event loop is already closed
+            pass
+
+    async def wait(self, timeout):
+        """Wait for a notification; returns False on timeout."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self.ready.clear()
+        return True
+
+
+class Broker:
+    """
+    In-process fan-out of change events.
+
+    Event ids are ``"<broker token>-<sequence>"``; the token changes with
+    every process, so an id from another worker or an older process is
+    recognized and answered with a ``refresh`` event. Events are tagged with
+    their tenant and only delivered to that tenant's connections.
+    """
+
+    def __init__(self, buffer_size=1000):
+        self.token = uuid.uuid4().hex[:8]
+        # Tenant -> data version already announced by events
+        self.known_versions = {}
+        self._events = deque(maxlen=buffer_size)
+        self._sequence = itertools.count(1)
+        self._last = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._version_checked = {}
+
+    @property
+    def last(self):
+        """Sequence of the newest event (0 before the first one)."""
+        return self._last
+
+    @property
+    def connections(self):
+        """Number of open event streams in this process."""
+        return len(self._subscribers)
+
+    def event_id(self, sequence):
+        return f'{self.token}-{sequence}'
+
+    def publish(self, kind, data, tenant=None):
+        """Append an event and wake every connection; callable from any thread."""
+        with self._lock:
+            self._last = next(self._sequence)
+            self._events.append((self._last, kind, data, tenant))
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.notify()
+        return self._last
+
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def resume_point(self, last_event_id):
+        """Sequence to continue after, or None when the client missed events.
+
+        A missing id starts at the newest event. Ids of another process or
+        older than the ring buffer cannot be resumed.
+        """
+        with self._lock:
+            if not last_event_id:
+                return self._last
+            token, _, sequence = last_event_id.partition('-')
+            if token != self.token or not sequence.isdigit():
+                return None
+            sequence = int(sequence)
+            oldest = self._events[0][0] if self._events else self._last + 1
+            if sequence > self._last or sequence < oldest - 1:
+                return None
+            return sequence
+
+    def events_after(self, sequence, tenant=None):
+        """``(sequence, kind, data)`` of the tenant's events newer than ``sequence``."""
+        with self._lock:
+            return [event[:3] for event in self._events if event[0] > sequence and event[3] == tenant]
+
+    def remember_version(self):
+        """Record the active tenant's data version as already announced by local events."""
+        self.known_versions[current_tenant()] = get_data_version()
+
+    async def poll_version(self, interval, tenant=None):
+        """Publish ``refresh`` when the data version changed without a local event.
+
+        Only one connection per tenant and interval actually reads the version.
+        """
+        now = time.monotonic()
+        if now - self._version_checked.get(tenant, 0.0) < interval:
+            return
+        self._version_checked[tenant] = now
+        version = await asyncio.to_thread(_tenant_data_version, tenant)
+        known = self.known_versions.get(tenant)
+        if known is not None and version != known:
+            self.publish('refresh', {}, tenant)
+        self.known_versions[tenant] = version
+
+
+def _tenant_data_version(tenant):
+    with use_tenant(tenant):
+        return get_data_version()
+
+
+broker = Broker(settings.CASHFLOW_EVENTS_BUFFER)
+metrics.register_gauge('events.connections', lambda: broker.connections)
+
+
+def record_event(instance, deleted=False):
+    """Compact event data for a record write.
+
+    Names of related items are included only when already loaded on the
+    instance (always the case for form and PATCH saves), so publishing
+    never queries.
+    """
+    if deleted:
+        return {'op': 'deleted', 'id': instance.pk}
+    data = {
+        'op': 'saved',
+        'id': instance.pk,
+        'date': str(instance.date),
+        'amount': str(instance.amount),
+        'comment': instance.comment or '',
+    }
+    for field in RELATION_FIELDS:
+        descriptor = getattr(CashFlowRecord, field)
+        related_id = getattr(instance, f'{field}_id')
+        name = getattr(instance, field).name if descriptor.is_cached(instance) else None
+        data[field] = [related_id, name]
+    return data
+
+
+def reference_event(sender, instance, deleted=False):
+    """Compact event data for a reference item write."""
+    return {
+        'op': 'deleted' if deleted else 'saved',
+        'model': REFERENCE_MODELS[sender],
+        'id': instance.pk,
+        'name': instance.name,
+    }
+
+
+def publish(kind, data):
+    """Publish an event for the active tenant and mark its data version as announced."""
+    broker.publish(kind, data, current_tenant())
+    broker.remember_version()
+
+
+def format_event(event_id, kind, data):
+    """Serialize one SSE message."""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {kind}\ndata: {payload}\n\n'
+
+
+def backlog(last_event_id, tenant=None):
+    """SSE text of the changes since the client's last poll (finite).
+
+    Poll ids are ``"<data version>/<event id>"``. The data version is shared
+    by all workers, so an unchanged version means nothing happened whichever
+    worker answers. A changed version is patched with this process's events
+    when they account for every bump since (one per published write), and
+    answered with ``refresh`` otherwise. The reply always ends with the
+    current id, so the next poll resumes from here.
+    """
+    version = get_data_version()
+    poll_id = f'{version}/{broker.event_id(broker.last)}'
+    chunks = [f'retry: {settings.CASHFLOW_EVENTS_POLL * 1000}\n\n']
+    seen_version, _, event_id = (last_event_id or '').partition('/')
+    if last_event_id and seen_version != str(version):
+        sequence = broker.resume_point(event_id) if seen_version.isdigit() else None
+        missed = broker.events_after(sequence, tenant) if sequence is not None else []
+        if missed and len(missed) == version - int(seen_version):
+            chunks.extend(format_event(poll_id, kind, data) for _, kind, data in missed)
+        else:
+            chunks.append(format_event(poll_id, 'refresh', {}))
+    # A message without data still sets the id EventSource reconnects with
+    chunks.append(f'id: {poll_id}\n: poll\n\n')
+    return ''.join(chunks)
+
+
+async def stream(last_event_id, tenant=None):
+    """Yield SSE messages until the client disconnects.
+
+    Sends a comment line as heartbeat when nothing was sent for
+    ``CASHFLOW_EVENTS_HEARTBEAT`` seconds, so proxies keep the connection.
+    """
+    subscription = broker.subscribe()
+    try:
+        yield f'retry: {settings.CASHFLOW_EVENTS_POLL * 1000}\n\n'
+        sequence = broker.resume_point(last_event_id)
+        if sequence is None:
+            sequence = broker.last
+            yield format_event(broker.event_id(sequence), 'refresh', {})
+        last_sent = time.monotonic()
+        while True:
+            for seq, kind, data in broker.events_after(sequence, tenant):
+                yield format_event(broker.event_id(seq), kind, data)
+                sequence = seq
+                last_sent = time.monotonic()
+            if not await subscription.wait(settings.CASHFLOW_EVENTS_POLL):
+                if time.monotonic() - last_sent >= settings.CASHFLOW_EVENTS_HEARTBEAT:
+                    yield ': ping\n\n'
+                    last_sent = time.monotonic()
+            await broker.poll_version(settings.CASHFLOW_EVENTS_POLL, tenant)
+    finally:
+        broker.unsubscribe(subscription)
@@ -1,7 +1,20 @@
 import django_filters
 from django import forms
 from django.utils.translation import gettext_lazy as _
-from .models import CashFlowRecord
+from .models import CashFlowRecord, Category, Status, Subcategory, Type
+
+
+class ModelInFilter(django_filters.ModelMultipleChoiceFilter):
+    """Match any of the selected items with one indexed ``IN`` lookup.
+
+    The stock filter ORs one equality per value and adds ``DISTINCT``,
+    which a foreign key never needs.
+    """
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return qs.filter(**{f'{self.field_name}__in': value})
 
 
 class CashFlowFilter(django_filters.FilterSet):
@@ -9,8 +22,10 @@ class CashFlowFilter(django_filters.FilterSet):
     Advanced filtering system for CashFlowRecord queries.
     
     Provides comprehensive filtering capabilities including:
-    - Date range filtering with custom date picker widgets
-    - Exact match filtering for related models (status, type, etc.)
+    - Date and amount range filtering with custom input widgets
+    - Multi-value filtering for related models (status, type, etc.);
+      a single value still works as an exact match
+    - Comment presence filtering
     - Consistent Bootstrap form styling across all filters
     - Localized field labels
     """
@@ -24,14 +39,28 @@ class CashFlowFilter(django_filters.FilterSet):
         })
     )
 
+    amount = django_filters.RangeFilter(
+        field_name='amount',
+        label=_('Amount'),
+        widget=django_filters.widgets.RangeWidget(attrs={
+            'type': 'number',
+            'step': '0.01',
+            'class': 'form-control form-control-sm'
+        })
+    )
+    status = ModelInFilter(queryset=Status.objects.all())
+    type = ModelInFilter(queryset=Type.objects.all())
+    category = ModelInFilter(queryset=Category.objects.all())
+    subcategory = ModelInFilter(queryset=Subcategory.objects.all())
+    has_comment = django_filters.BooleanFilter(
+        label=_('Comment'),
+        method='filter_has_comment',
+        widget=django_filters.widgets.BooleanWidget(),
+    )
+
     class Meta:
         model = CashFlowRecord
-        fields = {
-            'status': ['exact'],
-            'type': ['exact'],
-            'category': ['exact'],
-            'subcategory': ['exact'],
-        }
+        fields = ['date', 'amount', 'status', 'type', 'category', 'subcategory', 'has_comment']
 
     def __init__(self, *args, **kwargs):
         """Initialize filters with consistent styling and localized labels."""
@@ -43,6 +72,16 @@ class CashFlowFilter(django_filters.FilterSet):
         # Apply consistent Bootstrap styling to all select inputs
         self._apply_bootstrap_styling()
 
+    def filter_has_comment(self, queryset, name, value):
+        """Keep records with (``True``) or without (``False``) a comment.
+
+        Both conditions are written exactly like the partial indexes on
+        ``comment`` so SQLite can use them.
+        """
+        if value:
+            return queryset.filter(comment__gt='')
+        return queryset.exclude(comment__gt='')
+
     def _set_filter_labels(self):
         """Apply translated labels to filter fields."""
         label_mapping = {
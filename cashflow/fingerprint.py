@@ -0,0 +1,30 @@
+"""
+Content fingerprints of cash flow records.
+
+Two records describe the same transaction when their date, amount, type,
+category, subcategory and comment match; comments are compared ignoring
+case and whitespace. The fingerprint is a SHA-256 of those values, stored
+in an indexed column so a duplicate is found with a single index lookup.
+"""
+import hashlib
+from decimal import Decimal
+
+CENTS = Decimal('0.01')
+
+
+def normalize_comment(comment):
+    """Lowercase a comment and collapse its whitespace."""
+    return ' '.join((comment or '').split()).casefold()
+
+
+def record_fingerprint(date, amount, type_id, category_id, subcategory_id, comment):
+    """Return the hex fingerprint of a record's identifying values."""
+    payload = '|'.join([
+        date.isoformat(),
+        str(Decimal(amount).quantize(CENTS)),
+        str(type_id),
+        str(category_id),
+        str(subcategory_id),
+        normalize_comment(comment),
+    ])
+    return hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,245 @@
+"""
+Cash-flow forecasting from monthly rollups of the record history.
+
+Records are aggregated in the database into monthly totals per
+(type, category) series. All series are fitted at once: a linear trend by
+least squares over the whole matrix, plus an additive month-of-year seasonal
+index once two full years of history exist. Projections are cached per data
+version. The rollup itself is cached with the version it was built at; when
+the change journal (``cache.earliest_change``) shows that only recent months
+changed, only those months are aggregated again.
+"""
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from .cache import can_cache, earliest_change, get_data_version, make_key
+from .models import CashFlowRecord, Category, Type
+
+MIN_SEASONAL_MONTHS = 24
+PROJECTION_TIMEOUT = 24 * 3600
+
+
+def month_index(value):
+    """Number of months since year 0 for a date, datetime64 or 'YYYY-MM' string."""
+    if isinstance(value, str):
+        year, month = value[:7].split('-')
+        return int(year) * 12 + int(month) - 1
+    return value.year * 12 + value.month - 1
+
+
+def month_label(index):
+    """Inverse of ``month_index``: 'YYYY-MM'."""
+    return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+def aggregate_months(start=None, end=None):
+    """Monthly totals per (type, category) from the database.
+
+    Args:
+        start: First month index to include (None for all history)
+        end: Last month index to include
+
+    Returns:
+        list: ``(month_index, type_id, category_id, total)`` tuples
+    """
+    records = CashFlowRecord.objects.all()
+    if start is not None:
+        records = records.filter(date__gte=date(start // 12, start % 12 + 1, 1))
+    if end is not None:
+        following = end + 1
+        records = records.filter(date__lt=date(following // 12, following % 12 + 1, 1))
+    rows = (
+        records.order_by()
+        .annotate(month=TruncMonth('date'))
+        .values_list('month', 'type_id', 'category_id')
+        .annotate(total=Sum('amount'))
+    )
+    return [(month_index(month), type_id, category_id, float(total)) for month, type_id, category_id, total in rows]
+
+
+def build_rollup(rows, start, end, keys=None, matrix=None):
+    """Place aggregated rows into a (series x month) matrix.
+
+    Existing ``keys``/``matrix`` columns are kept and new series appended, so
+    a partial re-aggregation can be merged into a cached rollup.
+    """
+    keys = list(keys or [])
+    positions = {key: index for index, key in enumerate(keys)}
+    for _, type_id, category_id, _ in rows:
+        if (type_id, category_id) not in positions:
+            positions[(type_id, category_id)] = len(keys)
+            keys.append((type_id, category_id))
+
+    width = end - start + 1
+    merged = np.zeros((len(keys), width))
+    if matrix is not None and matrix.size:
+        merged[:matrix.shape[0], :matrix.shape[1]] = matrix[:, :width]
+    if rows:
+        months, series, totals = zip(*((month, positions[(t, c)], total) for month, t, c, total in rows))
+        np.add.at(merged, (np.array(series), np.array(months) - start), np.array(totals))
+    return keys, merged
+
+
+def load_rollup(end):
+    """Return the cached rollup for months up to ``end``, refreshing what changed.
+
+    Returns:
+        dict: ``start``, ``end``, ``keys`` and ``matrix``
+    """
+    if not can_cache():
+        return _full_rollup(end)
+
+    version = get_data_version()
+    rollup_key = make_key('forecast', 'rollup')
+    rollup = cache.get(rollup_key)
+    if rollup is not None and rollup['end'] == end:
+        if rollup['version'] == version:
+            return rollup
+        known, earliest = earliest_change(rollup['version'], version)
+        if known and (earliest is None or month_index(earliest) > end):
+            rollup = {**rollup, 'version': version}
+        elif known and month_index(earliest) >= rollup['start']:
+            rollup = _partial_rollup(rollup, month_index(earliest), version)
+        else:
+            rollup = None
+    else:
+        rollup = None
+
+    if rollup is None:
+        rollup = {**_full_rollup(end), 'version': version}
+    cache.set(rollup_key, rollup, None)
+    return rollup
+
+
+def _full_rollup(end):
+    rows = aggregate_months(end=end)
+    if not rows:
+        return {'start': end, 'end': end, 'keys': [], 'matrix': np.zeros((0, 1)), 'months_aggregated': 0}
+    start = min(row[0] for row in rows)
+    keys, matrix = build_rollup(rows, start, end)
+    return {'start': start, 'end': end, 'keys': keys, 'matrix': matrix, 'months_aggregated': end - start + 1}
+
+
+def _partial_rollup(rollup, since, version):
+    """Re-aggregate months from ``since`` on and merge them into ``rollup``."""
+    rows = aggregate_months(start=since, end=rollup['end'])
+    matrix = rollup['matrix'].copy()
+    matrix[:, since - rollup['start']:] = 0
+    keys, matrix = build_rollup(rows, rollup['start'], rollup['end'], rollup['keys'], matrix)
+    return {
+        **rollup,
+        'keys': keys,
+        'matrix': matrix,
+        'version': version,
+        'months_aggregated': rollup['end'] - since + 1,
+    }
+
+
+def fit_and_project(matrix, start, horizon):
+    """Project every series ``horizon`` months past the end of ``matrix``.
+
+    Args:
+        matrix: (series x months) history of monthly totals
+        start: Month index of the first column
+        horizon: Number of months to project
+
+    Returns:
+        ndarray: (series x horizon) non-negative projections
+    """
+    series, months = matrix.shape
+    if not series:
+        return np.zeros((0, horizon))
+    t = np.arange(months)
+    design = np.column_stack((np.ones(months), t))
+    # One least-squares solve fits the trend of all series at once
+    coefficients, *_ = np.linalg.lstsq(design, matrix.T, rcond=None)
+    future_t = np.arange(months, months + horizon)
+    projection = (np.column_stack((np.ones(horizon), future_t)) @ coefficients).T
+
+    if months >= MIN_SEASONAL_MONTHS:
+        residuals = matrix - (design @ coefficients).T
+        month_of_year = (start + t) % 12
+        one_hot = np.eye(12)[month_of_year]
+        seasonal = (residuals @ one_hot) / one_hot.sum(axis=0)
+        seasonal -= seasonal.mean(axis=1, keepdims=True)
+        projection += seasonal[:, (start + future_t) % 12]
+    return np.clip(projection, 0, None)
+
+
+def income_type_ids():
+    """Ids of types counted as income (by name, case-insensitive)."""
+    names = {name.casefold() for name in settings.CASHFLOW_INCOME_TYPES}
+    return {pk for pk, name in Type.objects.values_list('id', 'name') if name.casefold() in names}
+
+
+def forecast(horizon=6, today=None):
+    """Project income, expense and net per category for the next months.
+
+    History runs up to the last complete month before ``today``; the current
+    month is projected, not fitted.
+
+    Args:
+        horizon: Number of months to project
+        today: Reference date (defaults to today)
+
+    Returns:
+        dict: ``history_start``, ``history_end``, ``months``, ``categories``
+        (per-category ``income``/``expense``/``net`` lists) and ``totals``
+        (``income``, ``expense``, ``net`` and running ``balance``)
+    """
+    end = month_index(today or date.today()) - 1
+    version = get_data_version() if can_cache() else None
+    key = make_key('forecast', version, end, horizon)
+    if version is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    rollup = load_rollup(end)
+    projection = fit_and_project(rollup['matrix'], rollup['start'], horizon)
+    income_types = income_type_ids()
+    keys = rollup['keys']
+    is_income = np.array([type_id in income_types for type_id, _ in keys], dtype=bool)
+    categories = np.array([category_id for _, category_id in keys], dtype=np.int64)
+
+    names = dict(Category.objects.filter(pk__in=set(categories.tolist())).values_list('id', 'name'))
+    per_category = []
+    for category_id in sorted(names, key=names.get):
+        rows = categories == category_id
+        income = projection[rows & is_income].sum(axis=0)
+        expense = projection[rows & ~is_income].sum(axis=0)
+        per_category.append({
+            'category_id': category_id,
+            'category': names[category_id],
+            'income': _rounded(income),
+            'expense': _rounded(expense),
+            'net': _rounded(income - expense),
+        })
+
+    income = projection[is_income].sum(axis=0)
+    expense = projection[~is_income].sum(axis=0)
+    history_net = rollup['matrix'][is_income].sum() - rollup['matrix'][~is_income].sum()
+    result = {
+        'history_start': month_label(rollup['start']),
+        'history_end': month_label(end),
+        'months': [month_label(end + step) for step in range(1, horizon + 1)],
+        'categories': per_category,
+        'totals': {
+            'income': _rounded(income),
+            'expense': _rounded(expense),
+            'net': _rounded(income - expense),
+            'balance': _rounded(history_net + np.cumsum(income - expense)),
+        },
+    }
+    if version is not None:
+        cache.set(key, result, PROJECTION_TIMEOUT)
+    return result
+
+
+def _rounded(values):
+    return [round(float(value), 2) for value in values]
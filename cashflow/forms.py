@@ -1,4 +1,5 @@
 from django import forms
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from .models import CashFlowRecord
 
@@ -13,7 +14,9 @@ class CashFlowForm(forms.ModelForm):
     - Support for required relationship fields
     - Localized placeholder text
     - Client-side date picker integration
+    - Duplicate detection by content fingerprint (CASHFLOW_DUPLICATE_POLICY)
     """
+    confirm_duplicate = forms.BooleanField(required=False, label=_('Save anyway'))
 
     class Meta:
         model = CashFlowRecord
@@ -43,6 +46,10 @@ class CashFlowForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         """Initialize form with consistent styling for all fields."""
         super().__init__(*args, **kwargs)
+        # Existing record with the same fingerprint, set by clean()
+        self.duplicate_of = None
+        # True when a duplicate can be saved after ticking confirm_duplicate
+        self.duplicate_needs_confirmation = False
         
         # Apply consistent select field styling
         select_fields = {
@@ -94,10 +101,84 @@ class CashFlowForm(forms.ModelForm):
         ]
         
         for field in required_relations:
-            if not cleaned_data.get(field):
+            if field in self.fields and not cleaned_data.get(field):
                 self.add_error(
                     field,
                     _("This selection is required")
                 )
-                
-        return cleaned_data
\ No newline at end of file
+
+        return cleaned_data
+
+    def _post_clean(self):
+        super()._post_clean()
+        # The instance now holds the submitted values merged over the stored ones
+        if not self.errors:
+            self._check_duplicate(self.cleaned_data)
+
+    def _check_duplicate(self, cleaned_data):
+        """Look up a record with the same content fingerprint (one indexed query).
+
+        With the ``skip`` policy a duplicate is rejected, with ``warn`` it is
+        rejected until ``confirm_duplicate`` is checked; ``merge`` accepts it
+        and ``save()`` updates the existing record instead.
+        """
+        fingerprint = self.instance.compute_fingerprint()
+        duplicates = CashFlowRecord.objects.filter(fingerprint=fingerprint)
+        if self.instance.pk:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        self.duplicate_of = duplicates.order_by('pk').only('pk').first()
+
+        policy = settings.CASHFLOW_DUPLICATE_POLICY
+        if self.duplicate_of is None or policy == 'merge':
+            return
+        if policy == 'warn':
+            if cleaned_data.get('confirm_duplicate'):
+                return
+            self.duplicate_needs_confirmation = True
+        self.add_error(None, forms.ValidationError(
+            _('This record duplicates record #%(id)s.'),
+            code='duplicate',
+            params={'id': self.duplicate_of.pk},
+        ))
+
+    def save(self, commit=True):
+        """Save the record, or merge it into its duplicate under the ``merge`` policy.
+
+        Returns:
+            CashFlowRecord: The saved (or updated existing) record
+        """
+        if self.duplicate_of is None or self.instance.pk or settings.CASHFLOW_DUPLICATE_POLICY != 'merge':
+            return super().save(commit)
+        original = CashFlowRecord.objects.get(pk=self.duplicate_of.pk)
+        original.status = self.cleaned_data['status']
+        original.comment = self.cleaned_data.get('comment')
+        if commit:
+            original.save(update_fields=['status', 'comment'])
+        return original
+
+
+class CashFlowPatchForm(CashFlowForm):
+    """
+    Partial update of an existing CashFlowRecord.
+
+    Only the fields present in the submitted data are bound, validated and
+    listed in ``changed_fields``; the rest keep their stored values.
+    """
+
+    def __init__(self, data, instance, **kwargs):
+        super().__init__(data, instance=instance, **kwargs)
+        for name in list(self.fields):
+            if name not in data and name != 'confirm_duplicate':
+                del self.fields[name]
+        self.changed_fields = [name for name in self.fields if name != 'confirm_duplicate']
+
+    def save(self, commit=True):
+        """Write only the changed columns.
+
+        Returns:
+            CashFlowRecord: The updated record
+        """
+        record = super().save(commit=False)
+        if commit:
+            record.save(update_fields=self.changed_fields)
+        return record
@@ -0,0 +1,344 @@
+"""
+Local background job subsystem.
+
+Jobs are stored as ``Job`` rows that act as a database-backed queue, so no
+external broker is needed. ``manage.py run_jobs`` claims queued rows and runs
+the registered handler for each job in a process pool. Handlers report
+progress through a ``JobContext`` and write their result to a file under
+``settings.CASHFLOW_JOBS_ROOT``.
+"""
+import csv
+import logging
+import os
+import traceback
+from datetime import date
+from functools import partial
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.http import QueryDict
+from django.utils import timezone
+
+from . import duplicates
+from .cache import bump_data_version
+from .filters import CashFlowFilter
+from .models import CashFlowRecord, Category, Job, Status, Subcategory, Type
+from .tenants import current_tenant, db_alias, use_tenant
+
+logger = logging.getLogger(__name__)
+
+# Registry of job kind -> handler(context, **params)
+JOB_HANDLERS = {}
+
+EXPORT_COLUMNS = ['date', 'status', 'type', 'category', 'subcategory', 'amount', 'comment']
+
+
+def register_job(kind):
+    """Register a function as the handler for a job kind."""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def jobs_root():
+    """Return the directory that holds job uploads and results."""
+    return os.fspath(settings.CASHFLOW_JOBS_ROOT)
+
+
+class JobContext:
+    """
+    Handle passed to job handlers.
+
+    Provides throttled progress reporting and a per-job result directory.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self._last_progress = -1
+
+    def set_progress(self, done, total, message=''):
+        """Persist progress as a percentage, writing only when it changes.
+
+        Args:
+            done: Number of processed items
+            total: Total number of items (0 when unknown)
+            message: Optional short status text
+        """
+        progress = min(100, int(done * 100 / total)) if total else 0
+        if progress == self._last_progress and not message:
+            return
+        self._last_progress = progress
+        Job.objects.filter(pk=self.job.pk).update(progress=progress, message=message[:255])
+
+    def result_path(self, filename):
+        """Return the absolute path for a result file and record it on the job."""
+        directory = os.path.join(jobs_root(), 'results', str(self.job.pk))
+        os.makedirs(directory, exist_ok=True)
+        self.job.result_file = os.path.join('results', str(self.job.pk), filename)
+        return os.path.join(directory, filename)
+
+
+def submit_job(kind, params=None):
+    """Queue a new job.
+
+    Args:
+        kind: Registered job kind
+        params: JSON-serializable handler parameters
+
+    Returns:
+        Job: The queued job
+
+    Raises:
+        ValueError: If no handler is registered for ``kind``
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    params = dict(params or {})
+    if current_tenant():
+        # The worker runs the job against the submitting tenant's ledger
+        params.setdefault('tenant', current_tenant())
+    return Job.objects.create(kind=kind, params=params)
+
+
+def save_upload(uploaded_file):
+    """Store an uploaded file under the jobs root and return its path."""
+    directory = os.path.join(jobs_root(), 'uploads')
+    os.makedirs(directory, exist_ok=True)
+    stamp = timezone.now().strftime('%Y%m%d%H%M%S%f')
+    path = os.path.join(directory, f'{stamp}-{os.path.basename(uploaded_file.name)}')
+    with open(path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    return path
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to the running state.
+
+    The conditional UPDATE acts as a compare-and-set, so several workers can
+    poll the same table without claiming a job twice.
+
+    Returns:
+        int | None: ID of the claimed job, or None when the queue is empty
+    """
+    candidates = Job.objects.filter(status=Job.STATUS_QUEUED).order_by('id').values_list('id', flat=True)[:10]
+    for job_id in candidates:
+        claimed = Job.objects.filter(pk=job_id, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            return job_id
+    return None
+
+
+def requeue_running_jobs():
+    """Return jobs left running by a killed worker to the queue."""
+    return Job.objects.filter(status=Job.STATUS_RUNNING).update(status=Job.STATUS_QUEUED, progress=0)
+
+
+def run_job(job_id):
+    """Execute a claimed job and record its outcome.
+
+    Args:
+        job_id: Primary key of a job in the running state
+
+    Returns:
+        str: Final job status
+    """
+    job = Job.objects.get(pk=job_id)
+    context = JobContext(job)
+    params = dict(job.params)
+    try:
+        handler = JOB_HANDLERS[job.kind]
+        with use_tenant(params.pop('tenant', None)):
+            message = handler(context, **params) or ''
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.kind)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.STATUS_FAILED,
+            error=traceback.format_exc(),
+            result_file=job.result_file,
+            finished_at=timezone.now(),
+        )
+        return Job.STATUS_FAILED
+
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.STATUS_DONE,
+        progress=100,
+        message=message[:255],
+        result_file=job.result_file,
+        finished_at=timezone.now(),
+    )
+    return Job.STATUS_DONE
+
+
+def _filtered_records(filters):
+    """Build the filtered record queryset from a serialized query dict."""
+    query = QueryDict(mutable=True)
+    for key, values in (filters or {}).items():
+        query.setlist(key, values if isinstance(values, list) else [values])
+    records = CashFlowRecord.objects.select_related(
+        'status', 'type', 'category', 'subcategory'
+    ).order_by('-date', '-id')
+    return CashFlowFilter(query, queryset=records).qs
+
+
+@register_job('export_records')
+def export_records(context, filters=None):
+    """Export the records matching ``filters`` to a CSV file."""
+    records = _filtered_records(filters)
+    total = records.count()
+    with open(context.result_path('records.csv'), 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow(EXPORT_COLUMNS)
+        for done, record in enumerate(records.iterator(chunk_size=2000), start=1):
+            writer.writerow([
+                record.date.isoformat(),
+                record.status.name,
+                record.type.name,
+                record.category.name,
+                record.subcategory.name,
+                record.amount,
+                record.comment or '',
+            ])
+            if done % 1000 == 0:
+                context.set_progress(done, total)
+    return f'Exported {total} records'
+
+
+@register_job('import_records')
+def import_records(context, path, batch_size=500, on_duplicate=None):
+    """Import records from a CSV file produced by ``export_records``.
+
+    Reference values are resolved by name. Rows with unknown references or
+    invalid values are skipped and listed in the ``errors.csv`` result, as
+    are rows duplicating an existing record or an earlier row; those are
+    handled by ``on_duplicate`` (``skip``, ``warn`` or ``merge``, default
+    ``CASHFLOW_DUPLICATE_POLICY``).
+    """
+    policy = on_duplicate or settings.CASHFLOW_DUPLICATE_POLICY
+    if policy not in duplicates.POLICIES:
+        raise ValueError(f'Unknown duplicate policy: {policy}')
+    lookups = {
+        'status': dict(Status.objects.values_list('name', 'id')),
+        'type': dict(Type.objects.values_list('name', 'id')),
+        'category': dict(Category.objects.values_list('name', 'id')),
+        'subcategory': dict(Subcategory.objects.values_list('name', 'id')),
+    }
+    with open(path, newline='', encoding='utf-8') as source:
+        rows = list(csv.DictReader(source))
+
+    total = len(rows)
+    counts = {'created': 0, 'duplicates': 0}
+    pending = []
+    dates = set()
+    # fingerprint -> (record, source line) for rows imported by this run
+    known = {}
+    merged = {}
+
+    def flush(errors):
+        existing = duplicates.existing_by_fingerprint(
+            record.fingerprint for _, record in pending if record.fingerprint not in known
+        )
+        to_create = []
+        for line, record in pending:
+            original, original_line = known.get(record.fingerprint) or (existing.get(record.fingerprint), None)
+            if original is None:
+                known[record.fingerprint] = (record, line)
+                to_create.append(record)
+                continue
+            counts['duplicates'] += 1
+            label = f'line {original_line}' if original_line else f'record #{original.pk}'
+            if policy == duplicates.POLICY_SKIP:
+                errors.writerow([line, f'Duplicate of {label}, skipped'])
+            elif policy == duplicates.POLICY_WARN:
+                errors.writerow([line, f'Duplicate of {label}, imported'])
+                to_create.append(record)
+            else:
+                duplicates.merge_record(original, record)
+                if original.pk:
+                    merged[original.pk] = original
+                errors.writerow([line, f'Duplicate of {label}, merged'])
+        CashFlowRecord.objects.bulk_create(to_create)
+        counts['created'] += len(to_create)
+        dates.update(record.date for record in to_create)
+        pending.clear()
+
+    with open(context.result_path('errors.csv'), 'w', newline='', encoding='utf-8') as report:
+        errors = csv.writer(report)
+        errors.writerow(['line', 'error'])
+        with transaction.atomic(using=db_alias()):
+            for line, row in enumerate(rows, start=2):
+                try:
+                    record = _record_from_row(row, lookups)
+                except ValueError as exc:
+                    errors.writerow([line, str(exc)])
+                else:
+                    record.fingerprint = record.compute_fingerprint()
+                    pending.append((line, record))
+                if len(pending) >= batch_size:
+                    flush(errors)
+                    context.set_progress(line - 1, total)
+            if pending:
+                flush(errors)
+            if merged:
+                CashFlowRecord.objects.bulk_update(merged.values(), [*duplicates.MERGE_FIELDS, 'updated_at'])
+                dates.update(record.date for record in merged.values())
+            # bulk_create sends no signals, so invalidate cached pages explicitly
+            transaction.on_commit(partial(bump_data_version, dates), using=db_alias())
+    message = f"Imported {counts['created']} of {total} rows"
+    if counts['duplicates']:
+        message += f", {counts['duplicates']} duplicate(s) handled by {policy}"
+    return message
+
+
+def _record_from_row(row, lookups):
+    """Build an unsaved CashFlowRecord from an import row.
+
+    Raises:
+        ValueError: If a value is missing, malformed or references an unknown name
+    """
+    fields = {}
+    for field, mapping in lookups.items():
+        name = (row.get(field) or '').strip()
+        if name not in mapping:
+            raise ValueError(f'Unknown {field}: {name!r}')
+        fields[f'{field}_id'] = mapping[name]
+    try:
+        amount = Decimal(row.get('amount') or '')
+        record_date = date.fromisoformat((row.get('date') or '').strip())
+    except (InvalidOperation, ValueError):
+        raise ValueError('Invalid date or amount')
+    if amount <= 0:
+        raise ValueError('Amount must be greater than zero')
+    return CashFlowRecord(date=record_date, amount=amount, comment=row.get('comment') or None, **fields)
+
+
+@register_job('monthly_report')
+def monthly_report(context, filters=None):
+    """Build a CSV of monthly totals per type and category."""
+    rows = (
+        _filtered_records(filters)
+        .order_by()
+        .annotate(month=TruncMonth('date'))
+        .values('month', 'type__name', 'category__name')
+        .annotate(total=Sum('amount'), records=Count('id'))
+        .order_by('month', 'type__name', 'category__name')
+    )
+    with open(context.result_path('monthly_report.csv'), 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow(['month', 'type', 'category', 'total', 'records'])
+        for row in rows:
+            writer.writerow([
+                row['month'].strftime('%Y-%m'),
+                row['type__name'],
+                row['category__name'],
+                row['total'],
+                row['records'],
+            ])
+    return 'Report built'
@@ -0,0 +1,264 @@
+"""
+Routine maintenance of the SQLite databases.
+
+The functions here are meant to run on a schedule while the app serves
+traffic, so each one only holds the write lock briefly:
+
+* ``analyze`` refreshes planner statistics (``sqlite_stat1``) of the tables
+  whose row count grew or shrank by ``growth`` times since the recorded
+  one, sampling about ``analysis_limit`` rows per index;
+* ``incremental_vacuum`` returns free pages to the file system a few pages
+  per transaction, pausing between steps and stopping after a time budget;
+* ``database_stats`` and ``object_stats`` report page counts, free pages,
+  unused space inside pages (``dbstat``) and index statistics.
+
+Incremental vacuum needs ``auto_vacuum = INCREMENTAL``, which an existing
+file only gets through one full ``VACUUM`` (``enable_incremental_vacuum``);
+tenant databases are created with it.
+"""
+import time
+from contextlib import contextmanager
+
+from django.db import OperationalError, connections
+
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
+
+class MaintenanceError(Exception):
+    """Raised when a database cannot be maintained."""
+
+
+def _connection(alias):
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        raise MaintenanceError(f'Maintenance needs SQLite, {alias!r} uses {connection.vendor}')
+    return connection
+
+
+def _pragma(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    return cursor.fetchone()[0]
+
+
+@contextmanager
+def _busy_timeout(cursor, milliseconds):
+    """Wait at most ``milliseconds`` for locks held by the app inside the block."""
+    previous = _pragma(cursor, 'busy_timeout')
+    cursor.execute(f'PRAGMA busy_timeout = {int(milliseconds)}')
+    try:
+        yield
+    finally:
+        cursor.execute(f'PRAGMA busy_timeout = {int(previous)}')
+
+
+def database_stats(alias='default'):
+    """Size and fragmentation of a database.
+
+    Returns:
+        dict: ``page_size``, ``page_count``, ``freelist_count``, ``free_ratio``
+        (share of pages on the free list), ``bytes``, ``auto_vacuum`` and
+        ``journal_mode``
+    """
+    connection = _connection(alias)
+    with connection.cursor() as cursor:
+        page_size = _pragma(cursor, 'page_size')
+        page_count = _pragma(cursor, 'page_count')
+        freelist_count = _pragma(cursor, 'freelist_count')
+        auto_vacuum = AUTO_VACUUM_MODES.get(_pragma(cursor, 'auto_vacuum'), 'unknown')
+        journal_mode = _pragma(cursor, 'journal_mode')
+    return {
+        'page_size': page_size,
+        'page_count': page_count,
+        'freelist_count': freelist_count,
+        'free_ratio': freelist_count / page_count if page_count else 0.0,
+        'bytes': page_size * page_count,
+        'auto_vacuum': auto_vacuum,
+        'journal_mode': journal_mode,
+    }
+
+
+def _index_statistics(cursor):
+    """``{index or table: (rows, rows per leading key)}`` from ``sqlite_stat1``."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+    if cursor.fetchone() is None:
+        return {}
+    cursor.execute('SELECT tbl, idx, stat FROM sqlite_stat1')
+    statistics = {}
+    for table, index, stat in cursor.fetchall():
+        numbers = [int(part) for part in stat.split() if part.isdigit()]
+        if numbers:
+            statistics[index or table] = (numbers[0], numbers[1] if len(numbers) > 1 else None)
+    return statistics
+
+
+def object_stats(alias='default'):
+    """Pages and space of every table and index, largest first.
+
+    Unused bytes are free space inside allocated pages (fragmentation that a
+    vacuum would compact). For indexes, ``rows_per_key`` is the average
+    number of rows sharing a value of the leading column after the last
+    ``ANALYZE``: close to ``rows`` means the index barely narrows a search.
+    SQLite keeps no per-index usage counters; ``manage.py bench_filters``
+    shows which indexes the record list filters use.
+
+    Returns:
+        list: Dicts with ``name``, ``type``, ``table``, ``pages``, ``bytes``,
+        ``unused_ratio``, ``rows`` and ``rows_per_key`` (None when unknown);
+        empty when SQLite is built without ``dbstat``
+    """
+    connection = _connection(alias)
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                'SELECT s.name, m.type, m.tbl_name, COUNT(*), SUM(s.pgsize), SUM(s.unused) '
+                'FROM dbstat AS s JOIN sqlite_master AS m ON m.name = s.name '
+                'GROUP BY s.name ORDER BY SUM(s.pgsize) DESC'
+            )
+        except OperationalError:
+            return []
+        rows = cursor.fetchall()
+        statistics = _index_statistics(cursor)
+
+    objects = []
+    for name, kind, table, pages, size, unused in rows:
+        row_count, rows_per_key = statistics.get(name, (None, None))
+        objects.append({
+            'name': name,
+            'type': kind,
+            'table': table,
+            'pages': pages,
+            'bytes': size,
+            'unused_ratio': unused / size if size else 0.0,
+            'rows': row_count,
+            'rows_per_key': rows_per_key,
+        })
+    return objects
+
+
+def stale_tables(alias='default', growth=2.0):
+    """Tables without statistics or whose row count changed by ``growth`` times or more.
+
+    Sampled statistics only estimate row counts, so small changes are not
+    a reliable signal.
+    """
+    connection = _connection(alias)
+    with connection.cursor() as cursor:
+        statistics = _index_statistics(cursor)
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )
+        tables = [row[0] for row in cursor.fetchall()]
+        indexed = {}
+        cursor.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'")
+        for index, table in cursor.fetchall():
+            if index in statistics:
+                indexed[table] = max(indexed.get(table, 0), statistics[index][0])
+
+        stale = []
+        for table in tables:
+            cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+            count = cursor.fetchone()[0]
+            recorded = indexed.get(table, statistics.get(table, (None,))[0])
+            if recorded is None:
+                if count:
+                    stale.append(table)
+            elif max(count, recorded) >= growth * max(min(count, recorded), 1):
+                stale.append(table)
+    return stale
+
+
+def analyze(alias='default', full=False, analysis_limit=1000, growth=2.0):
+    """Refresh planner statistics.
+
+    Args:
+        alias: Database alias
+        full: Analyze every table, not only stale ones
+        analysis_limit: Rows sampled per index (0: all rows); bounds the
+            time each ``ANALYZE`` holds the write lock
+        growth: Row count ratio (either way) that makes statistics stale
+
+    Returns:
+        dict: ``tables`` analyzed and ``seconds`` taken
+    """
+    tables = None if full else stale_tables(alias, growth)
+    connection = _connection(alias)
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA analysis_limit = {int(analysis_limit)}')
+        if tables is None:
+            cursor.execute('ANALYZE')
+        for table in tables or ():
+            cursor.execute(f'ANALYZE "{table}"')
+        # SQLite's own check, recommended at the end of a maintenance run
+        cursor.execute('PRAGMA optimize')
+    return {'tables': tables if tables is not None else ['*'], 'seconds': time.perf_counter() - start}
+
+
+def enable_incremental_vacuum(alias='default'):
+    """Switch the database to ``auto_vacuum = INCREMENTAL``.
+
+    Runs a full ``VACUUM``, which rewrites the file and blocks writers until
+    it finishes; run it once in a maintenance window.
+    """
+    connection = _connection(alias)
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+
+
+def incremental_vacuum(alias='default', pages=256, max_seconds=10.0, sleep=0.05, busy_timeout=1000):
+    """Return free pages to the file system in short steps.
+
+    Each step frees up to ``pages`` pages in its own transaction, then pauses
+    for ``sleep`` seconds so the app's writers can proceed. A step that
+    cannot get the write lock within ``busy_timeout`` milliseconds is
+    skipped. Stops when the free list is empty or ``max_seconds`` passed.
+
+    Returns:
+        dict: ``freed`` pages, ``steps``, ``busy`` (skipped steps),
+        ``max_step_ms`` and ``seconds``, or ``skipped`` with the reason
+    """
+    connection = _connection(alias)
+    start = time.perf_counter()
+    result = {'freed': 0, 'steps': 0, 'busy': 0, 'max_step_ms': 0.0}
+    with connection.cursor() as cursor:
+        if _pragma(cursor, 'auto_vacuum') != 2:
+            return {'skipped': 'auto_vacuum is not incremental (see --enable-incremental)'}
+        free = _pragma(cursor, 'freelist_count')
+        with _busy_timeout(cursor, busy_timeout):
+            while free and time.perf_counter() - start < max_seconds:
+                step_start = time.perf_counter()
+                try:
+                    cursor.execute(f'PRAGMA incremental_vacuum({int(pages)})')
+                    # The pragma frees one page per returned row
+                    cursor.fetchall()
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+                    result['busy'] += 1
+                else:
+                    result['steps'] += 1
+                    result['max_step_ms'] = max(result['max_step_ms'], (time.perf_counter() - step_start) * 1000)
+                    remaining = _pragma(cursor, 'freelist_count')
+                    result['freed'] += free - remaining
+                    free = remaining
+                if free:
+                    time.sleep(sleep)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def checkpoint(alias='default'):
+    """Copy the WAL back into the database without waiting for readers.
+
+    Returns:
+        tuple: ``(busy, wal pages, checkpointed pages)``, or None outside WAL mode
+    """
+    connection = _connection(alias)
+    with connection.cursor() as cursor:
+        if _pragma(cursor, 'journal_mode') != 'wal':
+            return None
+        cursor.execute('PRAGMA wal_checkpoint(PASSIVE)')
+        return tuple(cursor.fetchone())
+
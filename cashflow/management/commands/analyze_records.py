@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from cashflow.analytics import analyze
+from cashflow.filters import CashFlowFilter
+from cashflow.models import CashFlowRecord
+
+
+class Command(BaseCommand):
+    """Print statistics and outliers for a filtered record selection."""
+
+    help = 'Per-category statistics, rolling averages and outliers of record amounts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='NAME=VALUE',
+            help='record_list filter, e.g. --filter status=1 --filter date_min=2025-01-01 (repeatable).',
+        )
+        parser.add_argument('--window', type=int, default=7, help='Rolling average window in days.')
+        parser.add_argument('--z', type=float, default=3.0, help='Z-score threshold for outliers.')
+        parser.add_argument('--iqr', type=float, default=1.5, help='IQR fence factor for outliers.')
+        parser.add_argument('--outliers', type=int, default=20, help='Number of outliers to list.')
+        parser.add_argument('--json', action='store_true', help='Print the full result as JSON.')
+
+    def handle(self, *args, **options):
+        query = QueryDict(mutable=True)
+        for item in options['filter']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Filters must look like NAME=VALUE, got {item!r}')
+            query.appendlist(name, value)
+        record_filter = CashFlowFilter(query, queryset=CashFlowRecord.objects.all())
+        if not record_filter.is_valid():
+            raise CommandError(f'Invalid filters: {record_filter.errors.as_text()}')
+
+        result = analyze(record_filter.qs, options['window'], options['z'], options['iqr'], options['outliers'])
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2, ensure_ascii=False))
+            return
+
+        overall = result['overall']
+        if not overall['count']:
+            self.stdout.write('No records match.')
+            return
+        self.stdout.write(
+            f"{overall['count']} records, total {overall['total']:.2f}, mean {overall['mean']:.2f}, "
+            f"median {overall['median']:.2f}\n"
+        )
+        self.stdout.write(f"{'category':<24}{'count':>7}{'total':>14}{'mean':>11}{'median':>11}{'p90':>11}")
+        for row in result['categories']:
+            self.stdout.write(
+                f"{row['category'][:23]:<24}{row['count']:>7}{row['total']:>14.2f}{row['mean']:>11.2f}"
+                f"{row['median']:>11.2f}{row['percentiles']['p90']:>11.2f}"
+            )
+        self.stdout.write(f"\n{result['outlier_count']} outlier(s)")
+        for outlier in result['outliers']:
+            self.stdout.write(
+                f"  #{outlier['id']} {outlier['date']} {outlier['category']}: {outlier['amount']:.2f} "
+                f"(z={outlier['z_score']:+.2f}, {'+'.join(outlier['methods'])})"
+            )
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from cashflow.backup import BackupError, backup_database, rotate_backups
+
+
+class Command(BaseCommand):
+    """Back up the running SQLite database without blocking writers."""
+
+    help = 'Copy the database with the SQLite online backup API in small steps.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help='Destination directory (default: CASHFLOW_BACKUP_DIR).')
+        parser.add_argument('--database', default='default', help='Database alias to back up.')
+        parser.add_argument('--pages', type=int, default=256, help='Pages copied per step.')
+        parser.add_argument('--sleep', type=float, default=50, help='Pause between steps in milliseconds.')
+        parser.add_argument(
+            '--timeout', type=float, default=settings.CASHFLOW_BACKUP_TIMEOUT,
+            help='Seconds the copy may take before it is abandoned (writes restart it).',
+        )
+        parser.add_argument('--compress', action='store_true', help='Gzip the backup.')
+        parser.add_argument('--integrity-check', action='store_true', help='Verify the copy before keeping it.')
+        parser.add_argument(
+            '--keep', type=int, default=settings.CASHFLOW_BACKUP_KEEP,
+            help='Number of newest backups to keep; 0 keeps all.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            stats = backup_database(
+                directory=options['output_dir'],
+                alias=options['database'],
+                pages=options['pages'],
+                sleep=options['sleep'] / 1000,
+                compress=options['compress'],
+                integrity_check=options['integrity_check'],
+                timeout=options['timeout'],
+            )
+        except BackupError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            f"Backed up {stats['pages']} pages to {stats['path']} ({stats['bytes']} bytes) "
+            f"in {stats['seconds']:.2f} s, {stats['mb_per_second']:.2f} MB/s, "
+            f"{stats['steps']} steps ({stats['restarts']} restarts), longest step {stats['max_step_ms']:.1f} ms"
+        )
+        for path in rotate_backups(options['keep'], options['output_dir']):
+            self.stdout.write(f'Removed old backup {path}')
@@ -0,0 +1,153 @@
+import os
+import random
+import re
+import tempfile
+import time
+from datetime import date, timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.http import QueryDict
+from django.utils import timezone
+
+from cashflow.filters import CashFlowFilter
+from cashflow.models import CashFlowRecord, Category, Status, Subcategory, Type
+from cashflow.profiling import explain
+from cashflow.tenants import db_alias, use_tenant
+
+# Scratch tenant slug; its database is never added to the registry
+BENCH_TENANT = '_bench'
+START_DATE = date(2020, 1, 1)
+DAYS = 5 * 365
+
+
+def filter_cases(categories, subcategories):
+    """Common filter combinations of the record list, as query strings."""
+    last_month = (START_DATE + timedelta(days=DAYS - 30)).isoformat()
+    last_quarter = (START_DATE + timedelta(days=DAYS - 90)).isoformat()
+    return {
+        'date range': f'date_min={last_month}',
+        'category': f'category={categories[0]}',
+        'categories + date': f'category={categories[0]}&category={categories[1]}&date_min={last_quarter}',
+        'subcategories': '&'.join(f'subcategory={pk}' for pk in subcategories[:3]),
+        'amount range': 'amount_min=5000&amount_max=5100',
+        'amount + date': f'amount_min=1000&amount_max=2000&date_min={last_quarter}',
+        'amount + category': f'amount_min=1000&amount_max=2000&category={categories[2]}',
+        'commented + date': f'has_comment=true&date_min={last_month}',
+        'commented': 'has_comment=true',
+        'no comment + date': f'has_comment=false&date_min={last_month}',
+        'everything': (
+            f'date_min={last_quarter}&category={categories[0]}&category={categories[1]}'
+            f'&amount_min=100&amount_max=50000&has_comment=true'
+        ),
+    }
+
+
+class Command(BaseCommand):
+    """Benchmark record list filters on a large scratch database."""
+
+    help = 'Fill a scratch database and report the query plan and time of common filter combinations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of records to generate.')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per filter; the fastest is reported.')
+        parser.add_argument('--database', help='Scratch SQLite file (default: a temporary file).')
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch database afterwards.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the generated data.')
+
+    def handle(self, *args, **options):
+        path = options['database'] or os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+        if os.path.exists(path):
+            raise CommandError(f'Scratch database already exists: {path}')
+
+        try:
+            with use_tenant(BENCH_TENANT, path):
+                call_command('migrate', database=db_alias(), verbosity=0, interactive=False)
+                start = time.perf_counter()
+                categories, subcategories = self.fill(options['rows'], random.Random(options['seed']))
+                self.stdout.write(f"Generated {options['rows']} records in {time.perf_counter() - start:.1f} s")
+                failures = self.report(filter_cases(categories, subcategories), options['repeat'])
+                connections[db_alias()].close()
+        finally:
+            if not options['keep']:
+                for suffix in ('', '-wal', '-shm', '-journal'):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+        if options['keep']:
+            self.stdout.write(f'Scratch database kept at {path}')
+        if failures:
+            raise CommandError(f"Full table scan for: {', '.join(failures)}")
+
+    def fill(self, rows, rng, batch_size=50_000):
+        """Insert reference items and ``rows`` records; returns category and subcategory ids."""
+        Status.objects.bulk_create([Status(name=name) for name in ('Business', 'Personal', 'Tax')])
+        Type.objects.bulk_create([Type(name=name) for name in ('Income', 'Expense')])
+        Category.objects.bulk_create([Category(name=f'Category {i}') for i in range(20)])
+        categories = list(Category.objects.order_by('pk').values_list('pk', flat=True))
+        Subcategory.objects.bulk_create([
+            Subcategory(name=f'Subcategory {category}.{i}', category_id=category)
+            for category in categories for i in range(5)
+        ])
+        subcategories = list(Subcategory.objects.order_by('pk').values_list('pk', 'category_id'))
+        statuses = list(Status.objects.values_list('pk', flat=True))
+        types = list(Type.objects.values_list('pk', flat=True))
+
+        # Raw inserts: model instances would make generating 1M rows minutes slower
+        table = CashFlowRecord._meta.db_table
+        sql = (
+            f'INSERT INTO {table} '
+            '(date, status_id, type_id, category_id, subcategory_id, amount, comment, fingerprint, updated_at) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)'
+        )
+        connection = connections[db_alias()]
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with transaction.atomic(using=db_alias()), connection.cursor() as cursor:
+            for offset in range(0, rows, batch_size):
+                batch = []
+                for _ in range(min(batch_size, rows - offset)):
+                    subcategory, category = rng.choice(subcategories)
+                    batch.append((
+                        (START_DATE + timedelta(days=rng.randrange(DAYS))).isoformat(),
+                        rng.choice(statuses),
+                        rng.choice(types),
+                        category,
+                        subcategory,
+                        f'{rng.uniform(1, 100_000):.2f}',
+                        f'Note {rng.randrange(1000)}' if rng.random() < 0.3 else rng.choice((None, '')),
+                        '',
+                        now,
+                    ))
+                cursor.executemany(sql, batch)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return categories, [pk for pk, _ in subcategories]
+
+    def report(self, cases, repeat):
+        """Print plan and fastest time per filter; returns names of cases scanning the table."""
+        connection = connections[db_alias()]
+        full_scan = re.compile(rf'\bSCAN {CashFlowRecord._meta.db_table}\b(?! USING)')
+        records = CashFlowRecord.objects.order_by('-date', '-id')
+        failures = []
+
+        self.stdout.write(f"{'filter':<20}{'rows':>9}{'best ms':>10}  plan")
+        for name, query in cases.items():
+            record_filter = CashFlowFilter(QueryDict(query), queryset=records)
+            if not record_filter.is_valid():
+                raise CommandError(f'Invalid filter {name}: {record_filter.errors.as_json()}')
+            sql, params = record_filter.qs.values_list('id', flat=True).query.sql_with_params()
+            plan = explain(connection, sql, params)
+
+            timings = []
+            with connection.cursor() as cursor:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    cursor.execute(sql, params)
+                    matched = len(cursor.fetchall())
+                    timings.append((time.perf_counter() - start) * 1000)
+
+            if any(full_scan.search(line) for line in plan):
+                failures.append(name)
+            steps = '; '.join(line.split(' ', 3)[-1] for line in plan)
+            self.stdout.write(f'{name:<20}{matched:>9}{min(timings):>10.1f}  {steps}')
+        return failures
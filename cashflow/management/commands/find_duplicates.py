@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cashflow.duplicates import duplicate_groups
+from cashflow.models import CashFlowRecord
+from cashflow.tenants import db_alias
+
+
+class Command(BaseCommand):
+    """Report records sharing a content fingerprint."""
+
+    help = 'List groups of duplicate records found with one grouped query; optionally delete the copies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=50, help='Number of groups to list (0 for all).')
+        parser.add_argument('--delete', action='store_true', help='Delete every copy except the oldest record of each group.')
+
+    def handle(self, *args, **options):
+        groups = list(duplicate_groups())
+        if not groups:
+            self.stdout.write('No duplicate records found')
+            return
+
+        shown = groups[:options['limit']] if options['limit'] else groups
+        for group in shown:
+            self.stdout.write(f"{group['count']} records: {group['ids']}")
+        if len(shown) < len(groups):
+            self.stdout.write(f'... {len(groups) - len(shown)} more group(s)')
+
+        copies = sum(group['count'] - 1 for group in groups)
+        if not options['delete']:
+            self.stdout.write(f'{len(groups)} group(s), {copies} duplicate record(s)')
+            return
+
+        with transaction.atomic(using=db_alias()):
+            extra_ids = [
+                int(pk) for group in groups
+                for pk in group['ids'].split(',') if int(pk) != group['first_id']
+            ]
+            deleted, _ = CashFlowRecord.objects.filter(pk__in=extra_ids).delete()
+        self.stdout.write(f'Deleted {deleted} duplicate record(s) from {len(groups)} group(s)')
@@ -0,0 +1,52 @@
+import os
+import pstats
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cashflow.profiling import list_profiles, profile_dir
+
+
+class Command(BaseCommand):
+    """List request profiles saved by the profiling middleware."""
+
+    help = 'List saved request profiles, or show the details of one profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?', help='Show this profile in detail.')
+        parser.add_argument('--limit', type=int, default=20, help='Number of profiles to list.')
+        parser.add_argument('--top', type=int, default=25, help='Functions to show by cumulative time.')
+
+    def handle(self, *args, **options):
+        profiles = list_profiles()
+        if options['profile_id']:
+            matches = [profile for profile in profiles if profile['id'] == options['profile_id']]
+            if not matches:
+                raise CommandError(f"Profile {options['profile_id']} not found")
+            self.show(matches[0], options['top'])
+            return
+
+        if not profiles:
+            self.stdout.write('No profiles saved.')
+            return
+        for profile in profiles[:options['limit']]:
+            query = f"?{profile['query']}" if profile['query'] else ''
+            self.stdout.write(
+                f"{profile['id']}  {profile['status']}  {profile['duration_ms']:9.1f} ms  "
+                f"{profile['query_count']:4d} queries  {len(profile['slow_queries']):3d} slow  "
+                f"{profile['method']} {profile['path']}{query}"
+            )
+
+    def show(self, profile, top):
+        """Print slow queries and the hottest functions of a profile."""
+        self.stdout.write(
+            f"{profile['method']} {profile['path']} ({profile['view']}): "
+            f"{profile['duration_ms']} ms, {profile['query_count']} queries in {profile['query_ms']} ms"
+        )
+        for query in profile['slow_queries']:
+            self.stdout.write(f"\n-- {query['duration_ms']} ms\n{query['sql']}")
+            for line in query['plan']:
+                self.stdout.write(f'   plan: {line}')
+            self.stdout.write(''.join(query['stack']))
+
+        stats = pstats.Stats(os.path.join(profile_dir(), f"{profile['id']}.prof"), stream=self.stdout)
+        stats.sort_stats('cumulative').print_stats(top)
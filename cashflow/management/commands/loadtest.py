@@ -0,0 +1,384 @@
+import http.client
+import json
+import math
+import random
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import got_request_exception
+from django.db import OperationalError, transaction
+from django.test.utils import override_settings
+
+from cashflow.cache import bump_data_version
+from cashflow.models import CashFlowRecord, Status, Subcategory, Type
+
+# Comment that marks records created by a load test run
+LOADTEST_MARKER = '[loadtest]'
+
+DEFAULT_MIX = 'list=45,filter=20,add=15,subcategories=15,delete=5'
+# Deletes consume records seeded in the local database, so a remote server gets none
+REMOTE_MIX = 'list=45,filter=20,add=20,subcategories=15'
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def parse_mix(value):
+    """Parse ``name=weight,...`` into a list of (operation, weight)."""
+    mix = []
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in Workload.operations:
+            raise CommandError(f'Unknown operation {name!r}; choose from {", ".join(Workload.operations)}')
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+class Client:
+    """Minimal HTTP client keeping the CSRF cookie of one simulated user."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.cookies = SimpleCookie()
+        self.last_location = None
+
+    def request(self, method, path, data=None, headers=None):
+        """Send a request and return ``(status, body)``."""
+        headers = {**(headers or {})}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{key}={morsel.value}' for key, morsel in self.cookies.items())
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+            self.last_location = response.headers.get('Location')
+            for header in response.headers.get_all('Set-Cookie') or []:
+                self.cookies.load(header)
+            return response.status, content
+        finally:
+            connection.close()
+
+    @property
+    def csrf_token(self):
+        morsel = self.cookies.get(settings.CSRF_COOKIE_NAME)
+        return morsel.value if morsel else ''
+
+
+class Workload:
+    """The mix of operations a simulated user performs."""
+
+    operations = ('list', 'filter', 'add', 'subcategories', 'delete')
+
+    def __init__(self, references, delete_pool):
+        self.references = references
+        self.delete_pool = delete_pool
+        self.pool_lock = threading.Lock()
+
+    def run(self, name, client):
+        """Perform one operation; return ``(status, body)``."""
+        return getattr(self, f'op_{name}')(client)
+
+    def op_list(self, client):
+        return client.request('GET', '/')
+
+    def op_filter(self, client):
+        refs = self.references
+        query = {
+            'status': random.choice(refs['status']),
+            'type': random.choice(refs['type']),
+            'date_min': f'2025-{random.randint(1, 12):02d}-01',
+        }
+        return client.request('GET', '/?' + urlencode(query))
+
+    def op_subcategories(self, client):
+        category_id = random.choice(self.references['category'])
+        return client.request('GET', f'/get_subcategories/?category_id={category_id}')
+
+    def op_add(self, client):
+        if not client.csrf_token:
+            client.request('GET', '/add/')
+        category_id, subcategory_id = random.choice(self.references['pairs'])
+        data = {
+            'csrfmiddlewaretoken': client.csrf_token,
+            'date': f'2025-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}',
+            'amount': f'{random.uniform(1, 5000):.2f}',
+            'status': random.choice(self.references['status']),
+            'type': random.choice(self.references['type']),
+            'category': category_id,
+            'subcategory': subcategory_id,
+            'comment': LOADTEST_MARKER,
+        }
+        return client.request('POST', '/add/', data=data, headers={'X-CSRFToken': client.csrf_token})
+
+    def op_delete(self, client):
+        with self.pool_lock:
+            record_id = self.delete_pool.pop() if self.delete_pool else None
+        if record_id is None:
+            return self.op_list(client)
+        if not client.csrf_token:
+            client.request('GET', '/add/')
+        return client.request('POST', f'/delete/{record_id}/', headers={'X-CSRFToken': client.csrf_token})
+
+
+class Command(BaseCommand):
+    """Drive a concurrent HTTP workload against the cashflow endpoints."""
+
+    help = (
+        'Load test record_list, filters, add_record, get_subcategories and delete_record, '
+        'reporting throughput, latency percentiles and error rates.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server; by default the app is started in-process.')
+        parser.add_argument('--asgi', action='store_true', help='Serve the ASGI app in-process (requires uvicorn).')
+        parser.add_argument('--concurrency', type=int, default=8, help='Number of simulated concurrent users.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Test duration in seconds.')
+        parser.add_argument(
+            '--mix', help=f'Operation weights (default: {DEFAULT_MIX}; with --url: {REMOTE_MIX}).',
+        )
+        parser.add_argument('--seed-records', type=int, default=200, help='Records created up front for deletes.')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds.')
+        parser.add_argument('--keep', action='store_true', help='Keep records created by the run.')
+
+    def handle(self, *args, **options):
+        self.lock_errors = 0
+        if options['url']:
+            self.handle_remote(options)
+            return
+
+        mix = parse_mix(options['mix'] or DEFAULT_MIX)
+        references = self.load_references()
+        delete_pool = self.seed_records(references, options['seed_records'])
+        got_request_exception.connect(self.count_lock_error)
+
+        try:
+            # All simulated users share one address, so per-client throttling would reject most requests
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, '127.0.0.1'], CASHFLOW_THROTTLE=False):
+                with self.in_process_server(options['asgi']) as base_url:
+                    results, elapsed = self.run_workload(base_url, mix, references, delete_pool, options)
+        finally:
+            got_request_exception.disconnect(self.count_lock_error)
+            if not options['keep']:
+                self.cleanup()
+
+        self.report(results, elapsed, options)
+
+    def handle_remote(self, options):
+        """Load test a running server without touching the local database."""
+        mix = parse_mix(options['mix'] or REMOTE_MIX)
+        if any(name == 'delete' and weight for name, weight in mix):
+            raise CommandError('--url cannot run deletes: their records are seeded in the local database.')
+        references = self.fetch_references(options['url'], options['timeout'])
+        results, elapsed = self.run_workload(options['url'], mix, references, [], options)
+        self.report(results, elapsed, options)
+        if results.get('add'):
+            self.stdout.write(f'Records added on the server are commented {LOADTEST_MARKER!r}')
+
+    def count_lock_error(self, sender, request=None, **kwargs):
+        """Count in-process requests that failed on a locked SQLite database."""
+        exc = sys.exc_info()[1]
+        if isinstance(exc, OperationalError) and 'locked' in str(exc):
+            self.lock_errors += 1
+
+    def load_references(self):
+        """Collect reference ids the workload picks from."""
+        pairs = list(Subcategory.objects.values_list('category_id', 'id'))
+        references = {
+            'status': list(Status.objects.values_list('id', flat=True)),
+            'type': list(Type.objects.values_list('id', flat=True)),
+            'category': sorted({category_id for category_id, _ in pairs}),
+            'pairs': pairs,
+        }
+        if not all(references.values()):
+            raise CommandError('Load testing needs at least one status, type, category and subcategory.')
+        return references
+
+    def fetch_references(self, base_url, timeout):
+        """Collect reference ids from the server's bootstrap document."""
+        client = Client(base_url, timeout)
+        # Any digest redirects to the current document
+        status, _ = client.request('GET', '/references/current.json')
+        location = client.last_location
+        if status not in (301, 302) or not location:
+            raise CommandError(f'Could not load references from {base_url} (HTTP {status}).')
+        status, body = client.request('GET', urlsplit(location).path[len(client.prefix):])
+        if status != 200:
+            raise CommandError(f'Could not load references from {base_url} (HTTP {status}).')
+        document = json.loads(body)
+        pairs = [(category_id, subcategory_id) for subcategory_id, _, category_id in document['subcategories']]
+        references = {
+            'status': [item[0] for item in document['statuses']],
+            'type': [item[0] for item in document['types']],
+            'category': sorted({category_id for category_id, _ in pairs}),
+            'pairs': pairs,
+        }
+        if not all(references.values()):
+            raise CommandError('Load testing needs at least one status, type, category and subcategory.')
+        return references
+
+    def seed_records(self, references, count):
+        """Create marked records for the delete operation to consume."""
+        records = []
+        for _ in range(count):
+            category_id, subcategory_id = random.choice(references['pairs'])
+            records.append(CashFlowRecord(
+                date=f'2025-{random.randint(1, 12):02d}-01',
+                status_id=random.choice(references['status']),
+                type_id=random.choice(references['type']),
+                category_id=category_id,
+                subcategory_id=subcategory_id,
+                amount=f'{random.uniform(1, 5000):.2f}',
+                comment=LOADTEST_MARKER,
+            ))
+        with transaction.atomic():
+            CashFlowRecord.objects.bulk_create(records)
+            transaction.on_commit(bump_data_version)
+        return list(CashFlowRecord.objects.filter(comment=LOADTEST_MARKER).values_list('id', flat=True))
+
+    def cleanup(self):
+        """Remove records created by the run."""
+        deleted, _ = CashFlowRecord.objects.filter(comment=LOADTEST_MARKER).delete()
+        self.stdout.write(f'Removed {deleted} load test record(s)')
+
+    @contextmanager
+    def in_process_server(self, asgi):
+        """Serve the app on a free local port and yield its base URL."""
+        if asgi:
+            yield from self._serve_asgi()
+        else:
+            yield from self._serve_wsgi()
+
+    def _serve_wsgi(self):
+        from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+        from django.core.wsgi import get_wsgi_application
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+        server.set_app(get_wsgi_application())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f'http://127.0.0.1:{server.server_address[1]}'
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def _serve_asgi(self):
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError('ASGI mode requires uvicorn (pip install uvicorn).')
+        from django.core.asgi import get_asgi_application
+
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(get_asgi_application(), host='127.0.0.1', port=port, log_level='warning'))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        try:
+            yield f'http://127.0.0.1:{port}'
+        finally:
+            server.should_exit = True
+            thread.join()
+
+    def run_workload(self, base_url, mix, references, delete_pool, options):
+        """Run simulated users until the duration elapses."""
+        workload = Workload(references, delete_pool)
+        names = [name for name, _ in mix]
+        weights = [weight for _, weight in mix]
+        results = defaultdict(list)
+        results_lock = threading.Lock()
+        deadline = time.monotonic() + options['duration']
+
+        def user():
+            client = Client(base_url, options['timeout'])
+            local = defaultdict(list)
+            while time.monotonic() < deadline:
+                name = random.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    status, body = workload.run(name, client)
+                    error = None if status < 400 else f'HTTP {status}'
+                    if status >= 500 and b'locked' in body:
+                        error = 'database locked'
+                except (OSError, http.client.HTTPException) as exc:
+                    error = type(exc).__name__
+                local[name].append((time.perf_counter() - start, error))
+            with results_lock:
+                for name, samples in local.items():
+                    results[name].extend(samples)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=user) for _ in range(max(1, options['concurrency']))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - started
+
+    def report(self, results, elapsed, options):
+        """Print throughput, latency percentiles and error rates per operation."""
+        self.stdout.write(
+            f"\n{options['concurrency']} users for {elapsed:.1f}s\n"
+            f"{'operation':<14}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}"
+            f"{'p99 ms':>9}{'max ms':>9}{'errors':>8}{'err %':>7}"
+        )
+        all_samples = []
+        for name in Workload.operations:
+            samples = results.get(name, [])
+            if not samples:
+                continue
+            all_samples.extend(samples)
+            self.stdout.write(self.format_row(name, samples, elapsed))
+        if not all_samples:
+            self.stdout.write('No requests completed.')
+            return
+        self.stdout.write(self.format_row('total', all_samples, elapsed))
+
+        errors = defaultdict(int)
+        for _, error in all_samples:
+            if error:
+                errors[error] += 1
+        lock_errors = max(self.lock_errors, errors.get('database locked', 0))
+        self.stdout.write(f'\nSQLite lock errors: {lock_errors}')
+        for error, count in sorted(errors.items(), key=lambda item: -item[1]):
+            self.stdout.write(f'  {error}: {count}')
+
+    def format_row(self, name, samples, elapsed):
+        latencies = sorted(duration * 1000 for duration, _ in samples)
+        errors = sum(1 for _, error in samples if error)
+        return (
+            f'{name:<14}{len(samples):>9}{len(samples) / elapsed:>9.1f}'
+            f'{percentile(latencies, 0.50):>9.1f}{percentile(latencies, 0.90):>9.1f}'
+            f'{percentile(latencies, 0.99):>9.1f}{latencies[-1]:>9.1f}'
+            f'{errors:>8}{errors * 100 / len(samples):>7.1f}'
+        )
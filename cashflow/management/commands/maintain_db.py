@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cashflow.maintenance import (
+    MaintenanceError, analyze, checkpoint, database_stats, enable_incremental_vacuum, incremental_vacuum,
+    object_stats,
+)
+from cashflow.tenants import db_alias, registry, use_tenant
+
+
+class Command(BaseCommand):
+    """Refresh planner statistics and reclaim free pages while the app is running."""
+
+    help = 'Run ANALYZE and incremental vacuum in short steps and report fragmentation and index statistics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to maintain.')
+        parser.add_argument('--all-tenants', action='store_true', help='Also maintain every tenant database.')
+        parser.add_argument('--report-only', action='store_true', help='Only print statistics.')
+        parser.add_argument('--full-analyze', action='store_true', help='Analyze every table, not only stale ones.')
+        parser.add_argument('--analysis-limit', type=int, default=1000, help='Rows sampled per index (0: all).')
+        parser.add_argument('--pages', type=int, default=256, help='Pages freed per vacuum step.')
+        parser.add_argument('--max-seconds', type=float, default=10, help='Time budget of the vacuum.')
+        parser.add_argument('--sleep', type=float, default=50, help='Pause between vacuum steps in milliseconds.')
+        parser.add_argument(
+            '--enable-incremental', action='store_true',
+            help='Switch to incremental auto-vacuum first (one full VACUUM that blocks writers).',
+        )
+        parser.add_argument('--top', type=int, default=15, help='Number of tables and indexes listed.')
+
+    def handle(self, *args, **options):
+        targets = [(options['database'], None)]
+        if options['all_tenants']:
+            targets.extend((None, slug) for slug in sorted(registry()))
+        try:
+            for alias, slug in targets:
+                with use_tenant(slug):
+                    self.maintain(alias or db_alias(), options)
+        except MaintenanceError as exc:
+            raise CommandError(str(exc))
+
+    def maintain(self, alias, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Database {alias}'))
+        before = database_stats(alias)
+        self.write_stats(before)
+
+        if not options['report_only']:
+            if options['enable_incremental'] and before['auto_vacuum'] != 'incremental':
+                enable_incremental_vacuum(alias)
+                self.stdout.write('Enabled incremental auto-vacuum (full VACUUM)')
+
+            result = analyze(alias, full=options['full_analyze'], analysis_limit=options['analysis_limit'])
+            tables = ', '.join(result['tables']) or 'none stale'
+            self.stdout.write(f"Analyzed {tables} in {result['seconds'] * 1000:.0f} ms")
+
+            result = incremental_vacuum(
+                alias, pages=options['pages'], max_seconds=options['max_seconds'], sleep=options['sleep'] / 1000,
+            )
+            if 'skipped' in result:
+                self.stdout.write(f"Vacuum skipped: {result['skipped']}")
+            else:
+                self.stdout.write(
+                    f"Vacuum freed {result['freed']} pages in {result['steps']} steps "
+                    f"({result['busy']} busy, max step {result['max_step_ms']:.1f} ms, {result['seconds']:.1f} s)"
+                )
+
+            wal = checkpoint(alias)
+            if wal is not None:
+                self.stdout.write(f'WAL checkpoint: {wal[2]} of {wal[1]} pages' + (' (busy)' if wal[0] else ''))
+            self.write_stats(database_stats(alias))
+
+        self.write_objects(object_stats(alias)[:options['top']])
+
+    def write_stats(self, stats):
+        self.stdout.write(
+            f"{stats['bytes'] / 1024 / 1024:.1f} MB, {stats['page_count']} pages of {stats['page_size']} B, "
+            f"{stats['freelist_count']} free ({stats['free_ratio']:.1%}), "
+            f"auto_vacuum={stats['auto_vacuum']}, journal_mode={stats['journal_mode']}"
+        )
+
+    def write_objects(self, objects):
+        if not objects:
+            return
+        self.stdout.write(f"{'name':<48}{'type':<7}{'pages':>8}{'KB':>9}{'unused':>8}{'rows':>10}{'rows/key':>10}")
+        for item in objects:
+            rows = '' if item['rows'] is None else item['rows']
+            per_key = '' if item['rows_per_key'] is None else item['rows_per_key']
+            self.stdout.write(
+                f"{item['name'][:47]:<48}{item['type']:<7}{item['pages']:>8}{item['bytes'] / 1024:>9.0f}"
+                f"{item['unused_ratio']:>8.0%}{rows:>10}{per_key:>10}"
+            )
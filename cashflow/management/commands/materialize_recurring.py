@@ -0,0 +1,31 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cashflow.recurring import materialize
+
+
+class Command(BaseCommand):
+    """Create records for due occurrences of recurring templates."""
+
+    help = 'Materialize recurring transactions up to a date; safe to re-run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', help='Last occurrence date to create (YYYY-MM-DD, default: today).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT statement.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count due occurrences.')
+
+    def handle(self, *args, **options):
+        try:
+            until = date.fromisoformat(options['until']) if options['until'] else date.today()
+        except ValueError:
+            raise CommandError(f"Invalid date: {options['until']}")
+
+        summary = materialize(until, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f"{summary['due']} occurrence(s) due from {summary['templates']} template(s)")
+        else:
+            self.stdout.write(
+                f"Created {summary['created']} of {summary['due']} due occurrence(s) "
+                f"from {summary['templates']} template(s) up to {until}"
+            )
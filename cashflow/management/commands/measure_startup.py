@@ -0,0 +1,67 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Measure cold start time of manage.py and the WSGI application."""
+
+    help = 'Time `manage.py check` and importing the WSGI app in fresh interpreters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Number of fresh interpreters per target.')
+        parser.add_argument(
+            '--importtime', type=int, default=0, metavar='N',
+            help='Also list the N slowest imports of the WSGI app (python -X importtime).',
+        )
+
+    def handle(self, *args, **options):
+        manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+        targets = {
+            'manage.py check': [sys.executable, manage_py, 'check'],
+            'wsgi import (warm-up off)': [sys.executable, '-c', 'import cashflow_project.wsgi'],
+            'wsgi import (warm-up on)': [sys.executable, '-c', 'import cashflow_project.wsgi'],
+        }
+        overrides = {
+            'wsgi import (warm-up off)': {'CASHFLOW_WARMUP': 'false'},
+            'wsgi import (warm-up on)': {'CASHFLOW_WARMUP': 'true'},
+        }
+
+        self.stdout.write(f"{'target':<28}{'min ms':>10}{'median ms':>11}{'max ms':>10}")
+        for name, command in targets.items():
+            env = {**os.environ, **overrides.get(name, {})}
+            durations = [self.run(command, env) for _ in range(options['runs'])]
+            self.stdout.write(
+                f'{name:<28}{min(durations):>10.1f}{statistics.median(durations):>11.1f}{max(durations):>10.1f}'
+            )
+
+        if options['importtime']:
+            self.report_imports(targets['wsgi import (warm-up off)'], options['importtime'])
+
+    def run(self, command, env):
+        """Run a command in a fresh interpreter and return its wall time in ms."""
+        start = time.perf_counter()
+        subprocess.run(command, env=env, cwd=settings.BASE_DIR, check=True, capture_output=True)
+        return (time.perf_counter() - start) * 1000
+
+    def report_imports(self, command, limit):
+        """Print the slowest modules by cumulative import time."""
+        result = subprocess.run(
+            [command[0], '-X', 'importtime', *command[1:]],
+            env={**os.environ, 'CASHFLOW_WARMUP': 'false'},
+            cwd=settings.BASE_DIR, check=True, capture_output=True, text=True,
+        )
+        imports = []
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            parts = line.removeprefix('import time:').split('|')
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                imports.append((int(parts[1]), parts[2].strip()))
+        self.stdout.write('\nSlowest imports (cumulative):')
+        for cumulative_us, module in sorted(imports, reverse=True)[:limit]:
+            self.stdout.write(f'{cumulative_us / 1000:>10.1f} ms  {module}')
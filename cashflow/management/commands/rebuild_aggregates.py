@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cashflow.budgets import ensure_triggers, expected_aggregates, rebuild_aggregates, stored_aggregates
+from cashflow.tenants import db_alias, registry, use_tenant
+
+
+class Command(BaseCommand):
+    """Recompute or verify the monthly aggregates behind budgets."""
+
+    help = 'Recompute the period aggregates from the records, or check them with --check.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only compare the aggregates with the records.')
+        parser.add_argument('--all-tenants', action='store_true', help='Also process every tenant database.')
+
+    def handle(self, *args, **options):
+        slugs = [None]
+        if options['all_tenants']:
+            slugs.extend(sorted(registry()))
+        drifted = []
+        for slug in slugs:
+            with use_tenant(slug):
+                alias = db_alias()
+                if options['check']:
+                    expected, stored = expected_aggregates(alias), stored_aggregates(alias)
+                    wrong = [key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key)]
+                    self.stdout.write(f'{alias}: {len(stored)} aggregates, {len(wrong)} differ from the records')
+                    if wrong:
+                        drifted.append(alias)
+                    continue
+                created = ensure_triggers(alias)
+                if created:
+                    self.stdout.write(f"{alias}: created triggers {', '.join(created)}")
+                self.stdout.write(f'{alias}: rebuilt {rebuild_aggregates(alias)} aggregates')
+        if drifted:
+            raise CommandError(f"Aggregates out of date in {', '.join(drifted)}; run without --check")
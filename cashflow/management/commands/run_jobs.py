@@ -0,0 +1,91 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from cashflow import jobs
+from cashflow.models import Job
+
+
+def _init_worker():
+    """Prepare a pool process: set up Django and drop inherited DB connections."""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _execute(job_id):
+    """Run a single job inside a pool process."""
+    try:
+        return jobs.run_job(job_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """Run queued background jobs in a local process pool."""
+
+    help = 'Process queued cashflow background jobs (exports, imports, reports).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.CASHFLOW_JOB_WORKERS,
+            help='Number of pool processes running jobs concurrently.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait between queue polls when idle.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is drained instead of polling forever.',
+        )
+        parser.add_argument(
+            '--requeue-running', action='store_true',
+            help='Return jobs left running by a killed worker to the queue first.',
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_running']:
+            count = jobs.requeue_running_jobs()
+            self.stdout.write(f'Requeued {count} running job(s)')
+
+        workers = max(1, options['workers'])
+        # Forked pool processes must not share the parent's DB connections
+        connections.close_all()
+        running = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            while True:
+                while len(running) < workers:
+                    job_id = jobs.claim_next_job()
+                    if job_id is None:
+                        break
+                    running[pool.submit(_execute, job_id)] = job_id
+                    self.stdout.write(f'Started job {job_id}')
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        status = future.result()
+                    except Exception as exc:
+                        # The pool process died before the job could record its outcome
+                        Job.objects.filter(pk=job_id).update(
+                            status=Job.STATUS_FAILED,
+                            error=repr(exc),
+                            finished_at=timezone.now(),
+                        )
+                        status = Job.STATUS_FAILED
+                    self.stdout.write(f'Job {job_id} {status}')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from cashflow.snapshot import refresh_snapshot, snapshot_dir
+from cashflow.tenants import registry, use_tenant
+
+
+class Command(BaseCommand):
+    """Write or refresh the columnar record snapshot used by analytics."""
+
+    help = 'Refresh the memory-mapped columnar snapshot of the records (only changes since the last run).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild from all records.')
+        parser.add_argument('--all-tenants', action='store_true', help='Also refresh every tenant snapshot.')
+
+    def handle(self, *args, **options):
+        slugs = [None]
+        if options['all_tenants']:
+            slugs.extend(sorted(registry()))
+        for slug in slugs:
+            with use_tenant(slug):
+                result = refresh_snapshot(full=options['full'])
+                kind = 'Built' if result['full'] else 'Refreshed'
+                self.stdout.write(
+                    f"{kind} {snapshot_dir()}: {result['rows']} rows ({result['read']} read, "
+                    f"{result['deleted']} deleted), {result['bytes'] / 1024 / 1024:.1f} MB "
+                    f"in {result['seconds']:.2f} s"
+                )
@@ -0,0 +1,70 @@
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from cashflow.models import Tenant
+from cashflow.tenants import create_tenant, migrate_tenant, move_tenant, registry, use_tenant
+
+
+class Command(BaseCommand):
+    """List, create, migrate and move tenant databases."""
+
+    help = 'Manage the per-tenant ledger databases.'
+
+    def add_arguments(self, parser):
+        subcommands = parser.add_subparsers(dest='action', required=True)
+
+        subcommands.add_parser('list', help='List registered tenants.')
+
+        create = subcommands.add_parser('create', help='Register a tenant and create its database.')
+        create.add_argument('slug')
+        create.add_argument('--name', help='Display name (default: the slug).')
+        create.add_argument('--database', help='SQLite file (default: CASHFLOW_TENANT_DIR/<slug>.sqlite3).')
+
+        migrate = subcommands.add_parser('migrate', help='Apply migrations to tenant databases.')
+        migrate.add_argument('slugs', nargs='*', help='Tenants to migrate (default: all).')
+
+        move = subcommands.add_parser('move', help='Copy a tenant database to a new file.')
+        move.add_argument('slug')
+        move.add_argument('destination')
+        move.add_argument('--keep-old', action='store_true', help='Leave the old file in place.')
+
+        run = subcommands.add_parser('exec', help='Run another management command for one tenant.')
+        run.add_argument('slug')
+        run.add_argument('command_name')
+        run.add_argument('command_args', nargs='...')
+
+    def handle(self, *args, **options):
+        action = options['action']
+        if action == 'list':
+            for tenant in Tenant.objects.order_by('slug'):
+                self.stdout.write(f'{tenant.slug}\t{tenant.name}\t{tenant.database}')
+            return
+
+        if action == 'create':
+            try:
+                tenant = create_tenant(options['slug'], options['name'], options['database'])
+            except (ValidationError, IntegrityError) as exc:
+                raise CommandError(f"Cannot create tenant {options['slug']}: {exc}")
+            self.stdout.write(self.style.SUCCESS(f'Created tenant {tenant.slug} in {tenant.database}'))
+            return
+
+        slugs = options['slugs'] if action == 'migrate' else [options['slug']]
+        unknown = set(slugs) - set(registry())
+        if unknown:
+            raise CommandError(f"Unknown tenant: {', '.join(sorted(unknown))}")
+
+        if action == 'migrate':
+            for slug in slugs or sorted(registry()):
+                migrate_tenant(slug, verbosity=options['verbosity'])
+                self.stdout.write(f'Migrated {slug}')
+        elif action == 'move':
+            try:
+                destination = move_tenant(options['slug'], options['destination'], options['keep_old'])
+            except FileExistsError as exc:
+                raise CommandError(f'Destination already exists: {exc}')
+            self.stdout.write(self.style.SUCCESS(f"Moved tenant {options['slug']} to {destination}"))
+        else:
+            with use_tenant(options['slug']):
+                call_command(options['command_name'], *options['command_args'])
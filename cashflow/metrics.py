@@ -0,0 +1,58 @@
+"""
+Process-shared counters stored in Django's cache backend.
+
+Counters live in the configured cache, so every worker increments and reads
+the same values when a shared backend (file, memcached, redis) is used.
+Feature modules declare their counters at import time so the metrics
+endpoint can report them even before they are first incremented.
+
+Gauges are per-process values (e.g. queue depths) read on demand from a
+registered callable.
+"""
+from django.core.cache import cache
+
+KEY_PREFIX = 'cashflow:metrics:'
+
+# Names of all declared counters
+COUNTERS = set()
+
+# Gauge name -> callable returning its current value in this process
+GAUGES = {}
+
+
+def declare(*names):
+    """Register counter names reported by ``snapshot``."""
+    COUNTERS.update(names)
+
+
+def incr(name, delta=1):
+    """Increment a counter, creating it on first use."""
+    COUNTERS.add(name)
+    key = KEY_PREFIX + name
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout=None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def snapshot():
+    """Return the current value of every declared counter."""
+    values = cache.get_many([KEY_PREFIX + name for name in COUNTERS])
+    return {name: values.get(KEY_PREFIX + name, 0) for name in sorted(COUNTERS)}
+
+
+def register_gauge(name, read):
+    """Register a per-process gauge reported by ``gauges``."""
+    GAUGES[name] = read
+
+
+def gauges():
+    """Return the current value of every registered gauge."""
+    return {name: read() for name, read in sorted(GAUGES.items())}
+
+
+def reset():
+    """Drop all declared counters."""
+    cache.delete_many([KEY_PREFIX + name for name in COUNTERS])
@@ -0,0 +1,159 @@
+import mimetypes
+import os
+import re
+import secrets
+import struct
+import zlib
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.middleware.gzip import GZipMiddleware
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.utils.regex_helper import _lazy_re_compile
+
+re_accepts_gzip = _lazy_re_compile(r'\bgzip\b')
+
+
+class StaticAssetMiddleware:
+    """
+    Serve collected static files directly from STATIC_ROOT.
+
+    Features:
+    - Content negotiation between brotli, gzip and identity variants
+    - Immutable one-year caching for fingerprinted (hashed) file names
+    - ETag revalidation for files without a fingerprint
+    """
+
+    # ManifestStaticFilesStorage inserts a 12 hex digit hash before the extension
+    hashed_name_re = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        if not settings.CASHFLOW_SERVE_STATIC:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        prefix = urlparse(settings.STATIC_URL).path
+        if request.method in ('GET', 'HEAD') and request.path.startswith(prefix):
+            response = self.serve(request, request.path[len(prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        """Build the response for a static file, or None when it does not exist."""
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except (SuspiciousFileOperation, ValueError):
+            return None
+        if not name or not os.path.isfile(path):
+            return None
+
+        immutable = bool(self.hashed_name_re.search(name))
+        encoding, file_path = self._negotiate(request, path)
+        stat = os.stat(file_path)
+        etag = f'"{int(stat.st_mtime)}-{stat.st_size}-{encoding or "identity"}"'
+        headers = {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': (
+                'public, max-age=31536000, immutable' if immutable else 'public, max-age=0, must-revalidate'
+            ),
+        }
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+            for header, value in headers.items():
+                response[header] = value
+            return response
+
+        content_type, _ = mimetypes.guess_type(path)
+        response = FileResponse(open(file_path, 'rb'), content_type=content_type or 'application/octet-stream')
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def _negotiate(self, request, path):
+        """Pick the best precompressed variant the client accepts."""
+        accepted = set()
+        for part in request.headers.get('Accept-Encoding', '').split(','):
+            token, _, params = part.strip().partition(';')
+            if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                continue
+            accepted.add(token.strip().lower())
+
+        for encoding, suffix in self.encodings:
+            if encoding in accepted and os.path.isfile(path + suffix):
+                return encoding, path + suffix
+        return None, path
+
+
+def compress_sequence_flushing(sequence, max_random_bytes=0):
+    """
+    Gzip a sequence of byte strings, flushing the compressor after every item.
+
+    Unlike ``django.utils.text.compress_sequence`` each input chunk produces
+    output immediately (Z_SYNC_FLUSH), so streamed pages reach the client as
+    they are generated. A random-length file name is written into the gzip
+    header, mirroring Django's BREACH mitigation.
+    """
+    filename = b'a' * secrets.randbelow(max_random_bytes) if max_random_bytes else b''
+    flags = 0x08 if filename else 0
+    header = struct.pack('<BBBBLBB', 0x1f, 0x8b, 8, flags, 0, 0, 255)
+    if filename:
+        header += filename + b'\0'
+    yield header
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    crc = 0
+    size = 0
+    for item in sequence:
+        if isinstance(item, str):
+            item = item.encode()
+        crc = zlib.crc32(item, crc)
+        size += len(item)
+        data = compressor.compress(item) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush() + struct.pack('<LL', crc & 0xffffffff, size & 0xffffffff)
+
+
+class StreamingGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that keeps streamed responses incremental.
+
+    Buffered responses are compressed by Django's implementation; streaming
+    responses are compressed chunk by chunk with an explicit flush so the
+    first bytes are sent as soon as the view yields them. Event streams
+    are left uncompressed.
+    """
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            # Compressing would buffer live events
+            return response
+        if not response.streaming or response.is_async:
+            return super().process_response(request, response)
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return response
+
+        response.streaming_content = compress_sequence_flushing(
+            response.streaming_content, max_random_bytes=self.max_random_bytes
+        )
+        del response.headers['Content-Length']
+        if response.has_header('ETag'):
+            response.headers['ETag'] = re.sub(r'^(W/)?"', 'W/"', response.headers['ETag'])
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:06
+
+from django.db import migrations, models
+
+from cashflow.fingerprint import record_fingerprint
+
+
+def backfill_fingerprints(apps, schema_editor):
+    """Compute fingerprints of existing records in batches."""
+    CashFlowRecord = apps.get_model('cashflow', 'CashFlowRecord')
+    records = CashFlowRecord.objects.using(schema_editor.connection.alias).order_by('pk')
+    batch = []
+    for record in records.iterator(chunk_size=2000):
+        record.fingerprint = record_fingerprint(
+            record.date, record.amount, record.type_id, record.category_id,
+            record.subcategory_id, record.comment,
+        )
+        batch.append(record)
+        if len(batch) >= 2000:
+            CashFlowRecord.objects.using(schema_editor.connection.alias).bulk_update(batch, ['fingerprint'])
+            batch = []
+    if batch:
+        CashFlowRecord.objects.using(schema_editor.connection.alias).bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0004_recurring'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cashflowrecord',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
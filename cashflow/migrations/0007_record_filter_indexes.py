@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0006_tenant'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cashflowrecord',
+            name='category',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='cashflow.category'),
+        ),
+        migrations.AlterField(
+            model_name='cashflowrecord',
+            name='subcategory',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='cashflow.subcategory'),
+        ),
+        migrations.AddIndex(
+            model_name='cashflowrecord',
+            index=models.Index(fields=['date'], name='record_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cashflowrecord',
+            index=models.Index(fields=['amount', 'date'], name='record_amount_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cashflowrecord',
+            index=models.Index(fields=['category', 'date'], name='record_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cashflowrecord',
+            index=models.Index(fields=['subcategory', 'date'], name='record_subcategory_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cashflowrecord',
+            index=models.Index(condition=models.Q(('comment__gt', '')), fields=['date'], name='record_commented_date_idx'),
+        ),
+    ]
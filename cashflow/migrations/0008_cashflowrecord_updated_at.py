@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0007_record_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cashflowrecord',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
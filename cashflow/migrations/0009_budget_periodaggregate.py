@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0008_cashflowrecord_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Budget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('month', 'Monthly'), ('quarter', 'Quarterly'), ('year', 'Yearly')], default='month', max_length=10)),
+                ('limit', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cashflow.category')),
+                ('subcategory', models.ForeignKey(blank=True, help_text='Leave empty to limit the whole category', null=True, on_delete=django.db.models.deletion.CASCADE, to='cashflow.subcategory')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('subcategory__isnull', True)), fields=('category', 'period'), name='budget_category_period_unique'), models.UniqueConstraint(fields=('subcategory', 'period'), name='budget_subcategory_period_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PeriodAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('amount_minor', models.BigIntegerField(default=0)),
+                ('records', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cashflow.category')),
+                ('subcategory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cashflow.subcategory')),
+                ('type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cashflow.type')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('category', 'month', 'subcategory', 'type'), name='aggregate_period_key')],
+            },
+        ),
+    ]
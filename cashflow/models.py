@@ -1,6 +1,9 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
 
+from .fingerprint import record_fingerprint
+
 
 class Status(models.Model):
     """
@@ -47,18 +50,230 @@ class Subcategory(models.Model):
         return self.name
 
 
+class CashFlowRecordQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # save() is bypassed, so fingerprints are filled in here
+        objs = list(objs)
+        for obj in objs:
+            obj.fingerprint = obj.compute_fingerprint()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class CashFlowRecord(models.Model):
     """
     Core financial transaction record tracking all monetary movements.
     Contains complete details including date, classification, and amount.
     """
+    # Fields covered by the content fingerprint
+    FINGERPRINT_FIELDS = ('date', 'amount', 'type', 'category', 'subcategory', 'comment')
+
     date = models.DateField(default=timezone.now)
     status = models.ForeignKey(Status, on_delete=models.PROTECT)
     type = models.ForeignKey(Type, on_delete=models.PROTECT)
+    # Indexed through the (category, date) and (subcategory, date) indexes in Meta
+    category = models.ForeignKey(Category, on_delete=models.PROTECT, db_index=False)
+    subcategory = models.ForeignKey(Subcategory, on_delete=models.PROTECT, db_index=False)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    comment = models.TextField(blank=True, null=True)
+    # "<template id>:<occurrence date>" for records generated from a
+    # RecurringTemplate; unique so repeated materialization cannot duplicate
+    recurrence_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    # SHA-256 of the FINGERPRINT_FIELDS, used to detect duplicate records
+    fingerprint = models.CharField(max_length=64, db_index=True, blank=True, editable=False)
+    # Last write; the watermark of incremental analytics snapshots (see snapshot.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = CashFlowRecordQuerySet.as_manager()
+
+    class Meta:
+        # Back the record list filters (see filters.CashFlowFilter and
+        # ``manage.py bench_filters``). Status and type keep Django's foreign
+        # key indexes; the (category, date) and (subcategory, date) indexes
+        # lead with their key and replace the dropped category/subcategory ones
+        indexes = [
+            models.Index(fields=['date'], name='record_date_idx'),
+            models.Index(fields=['amount', 'date'], name='record_amount_date_idx'),
+            models.Index(fields=['category', 'date'], name='record_category_date_idx'),
+            models.Index(fields=['subcategory', 'date'], name='record_subcategory_date_idx'),
+            models.Index(fields=['date'], condition=models.Q(comment__gt=''), name='record_commented_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.amount}"
+
+    def compute_fingerprint(self):
+        """Return the content fingerprint of the current field values."""
+        return record_fingerprint(
+            self._meta.get_field('date').to_python(self.date),
+            self._meta.get_field('amount').to_python(self.amount),
+            self.type_id,
+            self.category_id,
+            self.subcategory_id,
+            self.comment,
+        )
+
+    def save(self, *args, **kwargs):
+        self.fingerprint = self.compute_fingerprint()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # auto_now only reaches the database when listed
+            extra = {'updated_at'}
+            if {self._meta.get_field(name).attname for name in self.FINGERPRINT_FIELDS} & {
+                self._meta.get_field(name).attname for name in update_fields
+            }:
+                extra.add('fingerprint')
+            kwargs['update_fields'] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored date so a later write can report the months it moved
+        instance._loaded_date = instance.__dict__.get('date')
+        return instance
+
+
+class RecurringTemplate(models.Model):
+    """
+    Schedule for a transaction that repeats (rent, salary, taxes).
+    ``manage.py materialize_recurring`` turns due occurrences into records.
+    """
+    FREQUENCY_WEEKLY = 'weekly'
+    FREQUENCY_MONTHLY = 'monthly'
+    FREQUENCY_QUARTERLY = 'quarterly'
+    FREQUENCY_YEARLY = 'yearly'
+    FREQUENCY_CHOICES = [
+        (FREQUENCY_WEEKLY, 'Weekly'),
+        (FREQUENCY_MONTHLY, 'Monthly'),
+        (FREQUENCY_QUARTERLY, 'Quarterly'),
+        (FREQUENCY_YEARLY, 'Yearly'),
+    ]
+
+    name = models.CharField(max_length=100)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=FREQUENCY_MONTHLY)
+    interval = models.PositiveSmallIntegerField(default=1, help_text='Repeat every N periods')
+    start_date = models.DateField(help_text='First occurrence; monthly dates keep its day of month')
+    end_date = models.DateField(null=True, blank=True)
+    status = models.ForeignKey(Status, on_delete=models.PROTECT)
+    type = models.ForeignKey(Type, on_delete=models.PROTECT)
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
     subcategory = models.ForeignKey(Subcategory, on_delete=models.PROTECT)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     comment = models.TextField(blank=True, null=True)
+    active = models.BooleanField(default=True)
+    # Last occurrence already materialized; later runs start after it
+    materialized_until = models.DateField(null=True, blank=True, editable=False)
+
+    def __str__(self):
+        return f"{self.name} ({self.get_frequency_display()})"
+
+
+class PeriodAggregate(models.Model):
+    """
+    Monthly total and count of records per type, category and subcategory.
+    Kept current by database triggers inside the transaction of every record
+    write (see budgets.py); ``manage.py rebuild_aggregates`` recomputes them.
+    """
+    month = models.DateField(help_text='First day of the month')
+    type = models.ForeignKey(Type, on_delete=models.CASCADE, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    subcategory = models.ForeignKey(Subcategory, on_delete=models.CASCADE, related_name='+')
+    # Sum in minor units (kopecks), so incremental updates add up exactly
+    amount_minor = models.BigIntegerField(default=0)
+    records = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the lookup index of budgets: category, then a range of months
+            models.UniqueConstraint(
+                fields=['category', 'month', 'subcategory', 'type'], name='aggregate_period_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.category_id}/{self.subcategory_id}: {self.amount_minor / 100:.2f}"
+
+
+class Budget(models.Model):
+    """
+    Spending limit of a category, or of one of its subcategories, for every
+    month, quarter or year. Compared with actual spending on ``/budgets/``.
+    """
+    PERIOD_MONTH = 'month'
+    PERIOD_QUARTER = 'quarter'
+    PERIOD_YEAR = 'year'
+    PERIOD_CHOICES = [
+        (PERIOD_MONTH, 'Monthly'),
+        (PERIOD_QUARTER, 'Quarterly'),
+        (PERIOD_YEAR, 'Yearly'),
+    ]
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    subcategory = models.ForeignKey(
+        Subcategory, on_delete=models.CASCADE, null=True, blank=True,
+        help_text='Leave empty to limit the whole category',
+    )
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES, default=PERIOD_MONTH)
+    limit = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category', 'period'], condition=models.Q(subcategory__isnull=True),
+                name='budget_category_period_unique',
+            ),
+            models.UniqueConstraint(fields=['subcategory', 'period'], name='budget_subcategory_period_unique'),
+        ]
+
+    def __str__(self):
+        target = self.subcategory or self.category
+        return f"{target} ({self.get_period_display()}): {self.limit}"
+
+    def clean(self):
+        if self.subcategory_id and self.category_id and self.subcategory.category_id != self.category_id:
+            raise ValidationError({'subcategory': 'The subcategory must belong to the category.'})
+
+
+class Tenant(models.Model):
+    """
+    Company whose ledger (records and reference lists) lives in its own
+    SQLite file. The registry itself is stored in the default database.
+    """
+    slug = models.SlugField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+    database = models.CharField(max_length=500, help_text='Path of the SQLite file')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Job(models.Model):
+    """
+    Background job executed off the request path by ``manage.py run_jobs``.
+    Tracks the job lifecycle, its progress and the file holding its result.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    progress = models.PositiveSmallIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    result_file = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
-        return f"{self.date} - {self.amount}"
\ No newline at end of file
+        return f"{self.kind} #{self.pk} ({self.status})"
@@ -0,0 +1,210 @@
+"""
+Opt-in request profiling for diagnosing slow pages in production.
+
+Staff users enable it per request with the ``X-Cashflow-Profile: 1`` header
+or the ``_profile=1`` query parameter. The request then runs under cProfile
+and every SQL statement slower than ``CASHFLOW_SLOW_QUERY_MS`` is logged
+together with its query plan and the Python stack that issued it, on the
+shared and the active tenant database alike. Results are
+written to ``CASHFLOW_PROFILE_DIR`` as a ``.prof`` file (loadable with
+``pstats``/snakeviz) plus a ``.json`` summary; ``manage.py list_profiles``
+lists them.
+"""
+import cProfile
+import json
+import logging
+import os
+import time
+import traceback
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from .querybudget import collecting
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Cashflow-Profile'
+PROFILE_PARAM = '_profile'
+
+
+def profile_dir():
+    """Return the directory that holds saved profiles."""
+    return os.fspath(settings.CASHFLOW_PROFILE_DIR)
+
+
+def explain(connection, sql, params):
+    """Return the query plan of ``sql`` as a list of text lines."""
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+
+def project_stack(limit=8):
+    """Return the innermost stack frames that belong to project code."""
+    base_dir = os.fspath(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename
+    ]
+    return traceback.format_list(frames[-limit:])
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that times every statement.
+
+    Statements slower than ``threshold_ms`` are logged and kept with their
+    query plan and the project stack that issued them.
+    """
+
+    def __init__(self, threshold_ms):
+        self.threshold_ms = threshold_ms
+        self.count = 0
+        self.total_ms = 0.0
+        self.slow_queries = []
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._explaining:
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.total_ms += duration_ms
+            if duration_ms >= self.threshold_ms:
+                self._record_slow(sql, params, many, context['connection'], duration_ms)
+
+    def _record_slow(self, sql, params, many, connection, duration_ms):
+        plan = []
+        if not many:
+            self._explaining = True
+            try:
+                plan = explain(connection, sql, params)
+            except Exception as exc:
+                plan = [f'EXPLAIN failed: {exc}']
+            finally:
+                self._explaining = False
+
+        stack = project_stack()
+        self.slow_queries.append({
+            'sql': sql,
+            'params': [str(param) for param in params or []] if not many else [],
+            'duration_ms': round(duration_ms, 3),
+            'plan': plan,
+            'stack': stack,
+        })
+        logger.warning(
+            'Slow query (%.1f ms): %s\nPlan:\n  %s\nStack:\n%s',
+            duration_ms, sql, '\n  '.join(plan), ''.join(stack),
+        )
+
+
+def is_profiling_requested(request):
+    """Whether the request opts into profiling and the user may use it."""
+    if not settings.CASHFLOW_PROFILING:
+        return False
+    requested = (
+        request.headers.get(PROFILE_HEADER) == '1'
+        or request.GET.get(PROFILE_PARAM) == '1'
+    )
+    user = getattr(request, 'user', None)
+    return requested and user is not None and user.is_staff
+
+
+def new_profile_id():
+    return f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def save_profile(profiler, summary, profile_id=None):
+    """Write the profile and its JSON summary; return the profile id."""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    profile_id = profile_id or new_profile_id()
+    profiler.dump_stats(os.path.join(directory, f'{profile_id}.prof'))
+    with open(os.path.join(directory, f'{profile_id}.json'), 'w', encoding='utf-8') as output:
+        json.dump({'id': profile_id, **summary}, output, indent=2)
+    return profile_id
+
+
+def list_profiles():
+    """Return the saved profile summaries, newest first."""
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name), encoding='utf-8') as summary:
+                summaries.append(json.load(summary))
+    return summaries
+
+
+class ProfilerMiddleware:
+    """Run opted-in staff requests under cProfile with slow-query capture."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_profiling_requested(request):
+            return self.get_response(request)
+
+        # Profiled requests must exercise the real code path, not a cached page
+        request.cashflow_profiling = True
+        recorder = QueryRecorder(settings.CASHFLOW_SLOW_QUERY_MS)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with collecting(recorder):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+
+        # Streamed bodies run their queries while being consumed, so the
+        # profile is saved once the last chunk has been produced
+        profile_id = new_profile_id()
+        response['X-Profile-Id'] = profile_id
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._profile_streamed(
+                request, response, iter(response.streaming_content), profiler, recorder, start, profile_id,
+            )
+        else:
+            self.save(request, response, profiler, recorder, start, profile_id)
+        return response
+
+    def _profile_streamed(self, request, response, content, profiler, recorder, start, profile_id):
+        with collecting(recorder):
+            while True:
+                profiler.enable()
+                try:
+                    chunk = next(content, None)
+                finally:
+                    profiler.disable()
+                if chunk is None:
+                    break
+                yield chunk
+        self.save(request, response, profiler, recorder, start, profile_id)
+
+    def save(self, request, response, profiler, recorder, start, profile_id):
+        """Write the profile of a finished request."""
+        match = getattr(request, 'resolver_match', None)
+        save_profile(profiler, {
+            'created': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'view': match.view_name if match else '',
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+            'query_count': recorder.count,
+            'query_ms': round(recorder.total_ms, 3),
+            'slow_queries': recorder.slow_queries,
+        }, profile_id)
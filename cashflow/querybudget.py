@@ -0,0 +1,143 @@
+"""
+Per-view query budgets and N+1 detection.
+
+Views declare the maximum number of SQL queries they may run with the
+``@query_budget`` decorator; ``settings.CASHFLOW_QUERY_BUDGETS`` can override
+a budget by URL name. ``QueryBudgetMiddleware`` (enabled in development and
+tests) counts the queries of every request, logs structurally identical
+queries repeated ``CASHFLOW_NPLUSONE_THRESHOLD`` times or more together with
+the stack that issued them, and reports requests that exceed their budget;
+with ``CASHFLOW_QUERY_BUDGET_RAISE`` it raises so tests fail.
+"""
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .tenants import db_alias
+
+logger = logging.getLogger(__name__)
+
+# "IN (%s, %s, %s)" and "VALUES (...), (...)" differ only in arity
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_VALUES_LIST_RE = re.compile(r'(\(%s\.\.\.\))(?:\s*,\s*\(%s\.\.\.\))+')
+# Statements Django sends for atomic blocks; they depend on whether a request
+# already runs in a transaction (as under TestCase), not on what the view does
+_TRANSACTION_RE = re.compile(r'\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.IGNORECASE)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a request runs more queries than its view's budget."""
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of queries a view may run per request."""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def get_budget(resolver_match):
+    """Return the query budget for a resolved view, or None if undeclared."""
+    if resolver_match is None:
+        return None
+    overrides = settings.CASHFLOW_QUERY_BUDGETS
+    if resolver_match.url_name in overrides:
+        return overrides[resolver_match.url_name]
+    return getattr(resolver_match.func, 'query_budget', None)
+
+
+def query_shape(sql):
+    """Normalize SQL so queries differing only in parameter arity compare equal."""
+    shape = _PLACEHOLDER_LIST_RE.sub('(%s...)', sql)
+    return _VALUES_LIST_RE.sub(r'\1', shape)
+
+
+class QueryCollector:
+    """
+    Execute wrapper that counts queries by shape.
+
+    The stack is captured when a shape reaches the repetition threshold, which
+    points at the loop issuing the repeated query. Transaction control
+    statements are passed through without being counted.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.count = 0
+        self.shapes = Counter()
+        self.stacks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if _TRANSACTION_RE.match(sql):
+            return execute(sql, params, many, context)
+        self.count += 1
+        shape = query_shape(sql)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == self.threshold:
+            self.stacks[shape] = ''.join(traceback.format_stack()[:-1])
+        return execute(sql, params, many, context)
+
+    def repeated(self):
+        """Return ``{shape: count}`` for queries repeated past the threshold."""
+        return {shape: count for shape, count in self.shapes.items() if count >= self.threshold}
+
+
+@contextmanager
+def collecting(collector):
+    """Count queries on the default database and the active tenant's database."""
+    with ExitStack() as stack:
+        for alias in {DEFAULT_DB_ALIAS, db_alias()}:
+            stack.enter_context(connections[alias].execute_wrapper(collector))
+        yield
+
+
+class QueryBudgetMiddleware:
+    """Enforce declared query budgets and report N+1 query patterns."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.CASHFLOW_QUERY_BUDGETS_ENABLED:
+            return self.get_response(request)
+
+        collector = QueryCollector(settings.CASHFLOW_NPLUSONE_THRESHOLD)
+        with collecting(collector):
+            response = self.get_response(request)
+
+        if response.streaming and not response.is_async:
+            # Rows of streamed pages are queried while the body is consumed
+            response.streaming_content = self._check_streamed(request, response.streaming_content, collector)
+        else:
+            self.check(request, collector)
+        return response
+
+    def _check_streamed(self, request, content, collector):
+        with collecting(collector):
+            yield from content
+        self.check(request, collector)
+
+    def check(self, request, collector):
+        """Log N+1 patterns and enforce the budget of the resolved view."""
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.url_name if match else request.path
+
+        for shape, count in collector.repeated().items():
+            logger.warning(
+                'Possible N+1 in %s: query repeated %d times: %s\n%s',
+                view_name, count, shape, collector.stacks.get(shape, ''),
+            )
+
+        budget = get_budget(match)
+        if budget is None or collector.count <= budget:
+            return
+        message = f'{view_name} ran {collector.count} queries, budget is {budget}'
+        if settings.CASHFLOW_QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.error(message)
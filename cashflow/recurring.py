@@ -0,0 +1,108 @@
+"""
+Materialization of recurring transactions.
+
+Each ``RecurringTemplate`` occurrence becomes a ``CashFlowRecord`` whose
+``recurrence_key`` is ``"<template id>:<date>"``. The key is unique, so
+records are inserted with ``bulk_create(ignore_conflicts=True)`` and a
+re-run, an overlapping run or a run after a crash never duplicates an
+occurrence. All due occurrences of all templates are written in one
+transaction.
+"""
+import calendar
+from datetime import date, timedelta
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+
+from .cache import bump_data_version
+from .models import CashFlowRecord, RecurringTemplate
+from .tenants import db_alias
+
+MONTHS_PER_PERIOD = {
+    RecurringTemplate.FREQUENCY_MONTHLY: 1,
+    RecurringTemplate.FREQUENCY_QUARTERLY: 3,
+    RecurringTemplate.FREQUENCY_YEARLY: 12,
+}
+
+
+def add_months(start, months):
+    """Shift a date by whole months, clamping the day to the month's length."""
+    index = start.year * 12 + start.month - 1 + months
+    year, month = divmod(index, 12)
+    day = min(start.day, calendar.monthrange(year, month + 1)[1])
+    return date(year, month + 1, day)
+
+
+def occurrences(template, until, after=None):
+    """Yield the template's occurrence dates up to ``until``.
+
+    Args:
+        template: RecurringTemplate
+        until: Last date to include
+        after: Only yield dates later than this one
+    """
+    last = min(until, template.end_date) if template.end_date else until
+    step = 0
+    while True:
+        if template.frequency == RecurringTemplate.FREQUENCY_WEEKLY:
+            current = template.start_date + timedelta(weeks=step * template.interval)
+        else:
+            months = MONTHS_PER_PERIOD[template.frequency] * template.interval
+            current = add_months(template.start_date, step * months)
+        if current > last:
+            return
+        if after is None or current > after:
+            yield current
+        step += 1
+
+
+def recurrence_key(template, occurrence):
+    """Idempotency key of one occurrence."""
+    return f'{template.pk}:{occurrence.isoformat()}'
+
+
+def materialize(until, batch_size=1000, dry_run=False):
+    """Create records for every due occurrence of the active templates.
+
+    Args:
+        until: Materialize occurrences up to and including this date
+        batch_size: Rows per INSERT statement
+        dry_run: Count due occurrences without writing
+
+    Returns:
+        dict: ``templates`` processed, ``due`` occurrences and ``created``
+        records (occurrences that already existed are skipped)
+    """
+    templates = list(
+        RecurringTemplate.objects.filter(active=True, start_date__lte=until)
+        .filter(Q(materialized_until__isnull=True) | Q(materialized_until__lt=until))
+    )
+    records = []
+    for template in templates:
+        for occurrence in occurrences(template, until, after=template.materialized_until):
+            records.append(CashFlowRecord(
+                date=occurrence,
+                status_id=template.status_id,
+                type_id=template.type_id,
+                category_id=template.category_id,
+                subcategory_id=template.subcategory_id,
+                amount=template.amount,
+                comment=template.comment,
+                recurrence_key=recurrence_key(template, occurrence),
+            ))
+        template.materialized_until = until
+
+    summary = {'templates': len(templates), 'due': len(records), 'created': 0}
+    if dry_run or not templates:
+        return summary
+
+    existing = CashFlowRecord.objects.filter(recurrence_key__isnull=False)
+    with transaction.atomic(using=db_alias()):
+        before = existing.count()
+        CashFlowRecord.objects.bulk_create(records, batch_size=batch_size, ignore_conflicts=True)
+        RecurringTemplate.objects.bulk_update(templates, ['materialized_until'], batch_size=batch_size)
+        summary['created'] = existing.count() - before
+        # bulk_create sends no signals, so invalidate cached data explicitly
+        transaction.on_commit(partial(bump_data_version, {record.date for record in records}), using=db_alias())
+    return summary
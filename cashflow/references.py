@@ -0,0 +1,192 @@
+"""
+Cached reference lists for the record forms.
+
+Statuses, types, categories and subcategories change rarely but are read on
+every add/edit page. They are loaded with one query per table and stored as
+plain dicts under the current data version, so any committed write to a
+reference table makes the next read reload them.
+
+``get_bootstrap`` serializes the same lists into one compact JSON document
+named by its content hash, so browsers can cache it forever and the form
+script filters subcategories locally.
+
+``upsert_references`` creates a whole tree of reference data at once with
+conflict-ignoring bulk inserts followed by a lookup by name, so concurrent
+clients creating the same names end up with the same ids instead of errors.
+"""
+import hashlib
+import json
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import bump_data_version, can_cache, get_data_version, make_key
+from .models import Category, Status, Subcategory, Type
+from .tenants import db_alias
+
+
+def load_references():
+    """Query the reference tables and return them as lists of dicts."""
+    return {
+        'statuses': list(Status.objects.values('id', 'name')),
+        'types': list(Type.objects.values('id', 'name')),
+        'categories': list(Category.objects.values('id', 'name')),
+        'subcategories': list(Subcategory.objects.values('id', 'name', 'category_id')),
+    }
+
+
+def get_references():
+    """Return the reference lists, served from the cache when possible.
+
+    Returns:
+        dict: ``statuses``, ``types``, ``categories`` and ``subcategories``,
+        each a list of ``{'id', 'name'}`` dicts (subcategories also carry
+        ``category_id``)
+    """
+    if not can_cache():
+        return load_references()
+    key = make_key('references', get_data_version())
+    references = cache.get(key)
+    if references is None:
+        references = load_references()
+        # Every record write changes the key too, so entries must expire
+        cache.set(key, references, settings.CASHFLOW_PAGE_CACHE_TIMEOUT)
+    return references
+
+
+def get_bootstrap(references=None):
+    """Return the form bootstrap document and its content hash.
+
+    The document holds ``[id, name]`` pairs for statuses, types and
+    categories and ``[id, name, category_id]`` triples for subcategories.
+
+    Args:
+        references: Result of ``get_references`` when the caller already has it
+
+    Returns:
+        tuple: ``(digest, body)`` with a 16 hex digit digest and UTF-8 JSON bytes
+    """
+    key = make_key('bootstrap', get_data_version()) if can_cache() else None
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    references = references or get_references()
+    document = {
+        'statuses': [[item['id'], item['name']] for item in references['statuses']],
+        'types': [[item['id'], item['name']] for item in references['types']],
+        'categories': [[item['id'], item['name']] for item in references['categories']],
+        'subcategories': [
+            [item['id'], item['name'], item['category_id']] for item in references['subcategories']
+        ],
+    }
+    body = json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode()
+    bootstrap = (hashlib.sha256(body).hexdigest()[:16], body)
+    if key is not None:
+        cache.set(key, bootstrap, settings.CASHFLOW_PAGE_CACHE_TIMEOUT)
+    return bootstrap
+
+
+def _clean_names(values, label):
+    """Return stripped, de-duplicated names in input order."""
+    if not isinstance(values, list):
+        raise ValueError(f'{label} must be a list')
+    names = []
+    for value in values:
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f'{label} must contain non-empty names')
+        name = value.strip()
+        if len(name) > Status._meta.get_field('name').max_length:
+            raise ValueError(f'Name is too long: {name[:20]}...')
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def parse_reference_tree(data):
+    """Validate an upsert payload.
+
+    Args:
+        data: ``{"statuses": [...], "types": [...], "categories": [...]}``
+            where categories are names or ``{"name": ..., "subcategories":
+            [...]}`` objects; every key is optional
+
+    Returns:
+        dict: ``statuses``, ``types`` and ``categories`` name lists and
+        ``subcategories`` as a ``{name: category name}`` dict
+
+    Raises:
+        ValueError: If the payload is malformed
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Payload must be a JSON object')
+    tree = {
+        'statuses': _clean_names(data.get('statuses', []), 'statuses'),
+        'types': _clean_names(data.get('types', []), 'types'),
+        'categories': [],
+        'subcategories': {},
+    }
+    categories = data.get('categories', [])
+    if not isinstance(categories, list):
+        raise ValueError('categories must be a list')
+    for entry in categories:
+        if isinstance(entry, str):
+            entry = {'name': entry}
+        if not isinstance(entry, dict):
+            raise ValueError('categories must contain names or objects')
+        category, = _clean_names([entry.get('name')], 'category name')
+        if category not in tree['categories']:
+            tree['categories'].append(category)
+        for subcategory in _clean_names(entry.get('subcategories', []), 'subcategories'):
+            tree['subcategories'].setdefault(subcategory, category)
+    return tree
+
+
+def upsert_references(tree):
+    """Create missing reference rows of a parsed tree and return their ids.
+
+    Each table takes one ``INSERT ... ON CONFLICT DO NOTHING`` and one
+    ``SELECT`` by name, all in one transaction.
+
+    Args:
+        tree: Result of ``parse_reference_tree``
+
+    Returns:
+        dict: ``statuses``, ``types``, ``categories`` and ``subcategories``
+        name -> id maps, plus ``conflicts``: subcategory names that already
+        belong to another category (left unchanged and not in the map)
+    """
+    with transaction.atomic(using=db_alias()):
+        result = {
+            'statuses': _upsert_names(Status, tree['statuses']),
+            'types': _upsert_names(Type, tree['types']),
+            'categories': _upsert_names(Category, tree['categories']),
+            'subcategories': {},
+            'conflicts': [],
+        }
+        requested = tree['subcategories']
+        if requested:
+            category_ids = result['categories']
+            Subcategory.objects.bulk_create(
+                [Subcategory(name=name, category_id=category_ids[category]) for name, category in requested.items()],
+                ignore_conflicts=True,
+            )
+            rows = Subcategory.objects.filter(name__in=requested).values_list('name', 'id', 'category_id')
+            for name, pk, category_id in rows:
+                if category_id == category_ids[requested[name]]:
+                    result['subcategories'][name] = pk
+                else:
+                    result['conflicts'].append(name)
+        # bulk_create sends no signals, so invalidate cached references explicitly
+        transaction.on_commit(partial(bump_data_version, ()), using=db_alias())
+    return result
+
+
+def _upsert_names(model, names):
+    if not names:
+        return {}
+    model.objects.bulk_create([model(name=name) for name in names], ignore_conflicts=True)
+    return dict(model.objects.filter(name__in=names).values_list('name', 'id'))
@@ -0,0 +1,71 @@
+from functools import partial
+
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import events
+from .budgets import ensure_triggers
+from .cache import bump_data_version
+from .models import CashFlowRecord, Category, PeriodAggregate, Status, Subcategory, Tenant, Type
+from .tenants import invalidate_registry
+
+# Models whose writes invalidate versioned caches
+VERSIONED_MODELS = (Status, Type, Category, Subcategory, CashFlowRecord)
+
+
+@receiver(post_save, dispatch_uid='cashflow_bump_version_on_save')
+@receiver(post_delete, dispatch_uid='cashflow_bump_version_on_delete')
+def bump_version_on_write(sender, instance=None, using=None, **kwargs):
+    """Bump the data version once the writing transaction commits.
+
+    Record writes also report their old and new dates, so incremental
+    consumers (the forecast) only recompute the affected months.
+    """
+    if sender not in VERSIONED_MODELS:
+        return
+    changed_dates = ()
+    if sender is CashFlowRecord:
+        field = sender._meta.get_field('date')
+        values = (instance.date, getattr(instance, '_loaded_date', None))
+        changed_dates = {field.to_python(value) for value in values if value}
+    transaction.on_commit(partial(bump_data_version, changed_dates), using=using)
+
+
+@receiver(post_save, dispatch_uid='cashflow_publish_event_on_save')
+@receiver(post_delete, dispatch_uid='cashflow_publish_event_on_delete')
+def publish_event_on_write(sender, instance=None, using=None, **kwargs):
+    """Publish a live change event once the writing transaction commits.
+
+    Connected after ``bump_version_on_write``, so the event is published
+    after the version bump and the new version counts as announced.
+    """
+    if sender not in VERSIONED_MODELS:
+        return
+    deleted = 'created' not in kwargs
+    if sender is CashFlowRecord:
+        kind, data = 'record', events.record_event(instance, deleted)
+    else:
+        kind, data = 'reference', events.reference_event(sender, instance, deleted)
+    transaction.on_commit(partial(events.publish, kind, data), using=using)
+
+
+@receiver(post_save, sender=Tenant, dispatch_uid='cashflow_invalidate_registry_on_save')
+@receiver(post_delete, sender=Tenant, dispatch_uid='cashflow_invalidate_registry_on_delete')
+def invalidate_registry_on_write(sender, using=None, **kwargs):
+    """Drop the cached tenant registry once a tenant edit or delete commits."""
+    transaction.on_commit(invalidate_registry, using=using)
+
+
+@receiver(post_migrate, dispatch_uid='cashflow_install_aggregate_triggers')
+def install_aggregate_triggers(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Create the triggers maintaining the period aggregates after ``migrate``.
+
+    Also restores them after a migration rebuilt the records table, which
+    drops its triggers on SQLite.
+    """
+    if sender.label != 'cashflow' or not router.allow_migrate_model(using, PeriodAggregate):
+        return
+    if PeriodAggregate._meta.db_table not in connections[using].introspection.table_names():
+        return
+    ensure_triggers(using)
@@ -0,0 +1,291 @@
+"""
+Columnar snapshot of the records for analytics.
+
+``refresh_snapshot`` writes every record as one row across NumPy ``.npy``
+column files:
+
+* ``ids`` (int64) in ascending order
+* ``dates`` (int32): days since 1970-01-01
+* ``amounts`` (int64): minor units (kopecks)
+* ``status``, ``type``, ``category``, ``subcategory`` (int32): ids, named
+  by ``dictionaries.json``
+* ``has_comment`` (bool)
+
+Every refresh writes a new generation directory and then atomically
+replaces ``manifest.json``, which names the current generation, so readers
+never see a half-written snapshot; the generation it replaces is removed by
+the refresh after it. After the first build, a refresh only
+reads the records with a higher id than the last one seen or an
+``updated_at`` at or after the watermark (minus ``WATERMARK_OVERLAP`` for
+writes that committed late). Deleted records are dropped by comparing the
+ids, one index-only query.
+
+``load_snapshot`` maps the columns with ``mmap_mode='r'``, so loading costs
+no copy and every process shares the pages through the OS cache; the
+analytics endpoint runs on them with ``?source=snapshot`` without touching
+the database. Each tenant has its own snapshot directory.
+"""
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db.models import BigIntegerField, BooleanField, ExpressionWrapper, F, Q
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from .models import CashFlowRecord, Category, Status, Subcategory, Type
+from .tenants import current_tenant
+
+MANIFEST = 'manifest.json'
+DICTIONARIES = 'dictionaries.json'
+COLUMNS = {
+    'ids': np.int64,
+    'dates': np.int32,
+    'amounts': np.int64,
+    'status': np.int32,
+    'type': np.int32,
+    'category': np.int32,
+    'subcategory': np.int32,
+    'has_comment': np.bool_,
+}
+REFERENCE_MODELS = {'status': Status, 'type': Type, 'category': Category, 'subcategory': Subcategory}
+WATERMARK_OVERLAP = timedelta(minutes=1)
+CHUNK_SIZE = 10000
+EPOCH = np.datetime64('1970-01-01', 'D')
+EPOCH_DATE = date(1970, 1, 1)
+INT64 = np.iinfo(np.int64)
+
+# (directory, generation) -> Snapshot, so requests reuse the mapped files
+_loaded = {}
+
+
+class Snapshot:
+    """Memory-mapped columns and dictionaries of one snapshot generation."""
+
+    def __init__(self, directory, manifest):
+        self.manifest = manifest
+        path = os.path.join(directory, manifest['generation'])
+        self.columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in COLUMNS}
+        with open(os.path.join(path, DICTIONARIES), encoding='utf-8') as source:
+            self.dictionaries = {
+                field: {int(pk): name for pk, name in names.items()}
+                for field, names in json.load(source).items()
+            }
+
+    def __len__(self):
+        return len(self.columns['ids'])
+
+
+def snapshot_dir():
+    """Snapshot directory of the active tenant."""
+    return os.path.join(settings.CASHFLOW_SNAPSHOT_DIR, current_tenant() or 'default')
+
+
+def read_manifest(directory=None):
+    """Manifest of the current generation, or None before the first build."""
+    try:
+        with open(os.path.join(directory or snapshot_dir(), MANIFEST), encoding='utf-8') as source:
+            return json.load(source)
+    except FileNotFoundError:
+        return None
+
+
+def load_snapshot(directory=None):
+    """Map the current snapshot; returns None before the first build."""
+    directory = directory or snapshot_dir()
+    for attempt in range(2):
+        manifest = read_manifest(directory)
+        if manifest is None:
+            return None
+        key = (directory, manifest['generation'])
+        snapshot = _loaded.get(key)
+        if snapshot is not None:
+            return snapshot
+        try:
+            snapshot = Snapshot(directory, manifest)
+        except FileNotFoundError:
+            # A refresh published a newer generation and removed this one meanwhile
+            if attempt:
+                raise
+            continue
+        # Older generations of this directory are no longer needed
+        for stale in [cached for cached in _loaded if cached[0] == directory]:
+            del _loaded[stale]
+        _loaded[key] = snapshot
+        return snapshot
+
+
+def _empty_columns():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+def read_columns(queryset):
+    """Read records into column arrays in chunks, without model instances."""
+    rows = queryset.order_by().annotate(
+        minor=Cast(Round(F('amount') * 100), BigIntegerField()),
+        commented=ExpressionWrapper(Q(comment__gt=''), output_field=BooleanField()),
+    ).values_list(
+        'id', 'date', 'minor', 'status_id', 'type_id', 'category_id', 'subcategory_id', 'commented',
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    chunks = []
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+        ids, dates, amounts, statuses, types, categories, subcategories, commented = zip(*chunk)
+        chunks.append({
+            'ids': np.array(ids, dtype=np.int64),
+            'dates': (np.array(dates, dtype='datetime64[D]') - EPOCH).astype(np.int32),
+            'amounts': np.array(amounts, dtype=np.int64),
+            'status': np.array(statuses, dtype=np.int32),
+            'type': np.array(types, dtype=np.int32),
+            'category': np.array(categories, dtype=np.int32),
+            'subcategory': np.array(subcategories, dtype=np.int32),
+            'has_comment': np.array(commented, dtype=np.bool_),
+        })
+    if not chunks:
+        return _empty_columns()
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in COLUMNS}
+
+
+def _write_generation(directory, columns, dictionaries, manifest):
+    # Sortable by time; the process id keeps concurrent refreshes apart
+    generation = f"{timezone.now().strftime('%Y%m%d%H%M%S%f')}-{os.getpid()}"
+    path = os.path.join(directory, generation)
+    os.makedirs(path)
+    for name, values in columns.items():
+        np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(values, dtype=COLUMNS[name]))
+    with open(os.path.join(path, DICTIONARIES), 'w', encoding='utf-8') as target:
+        json.dump(dictionaries, target, ensure_ascii=False)
+
+    manifest = {**manifest, 'generation': generation}
+    previous = read_manifest(directory)
+    partial = os.path.join(directory, f'{MANIFEST}.{generation}.part')
+    with open(partial, 'w', encoding='utf-8') as target:
+        json.dump(manifest, target)
+    os.replace(partial, os.path.join(directory, MANIFEST))
+
+    # Keep the previous generation for readers that loaded its manifest just
+    # before the replace, and anything a concurrent refresh published since
+    keep = min(generation, previous['generation']) if previous else generation
+    for entry in os.listdir(directory):
+        if entry < keep and os.path.isdir(os.path.join(directory, entry)):
+            # Open memory maps stay valid on POSIX; elsewhere the next refresh retries
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    return manifest
+
+
+def refresh_snapshot(full=False, directory=None):
+    """Bring the snapshot up to date with the records.
+
+    Args:
+        full: Rebuild from all records instead of applying the changes
+        directory: Snapshot directory (defaults to ``snapshot_dir()``)
+
+    Returns:
+        dict: ``rows``, ``read`` (records fetched), ``deleted``, ``full``,
+        ``bytes`` and ``seconds``
+    """
+    start = time.perf_counter()
+    directory = directory or snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    started_at = timezone.now()
+    previous = None if full else load_snapshot(directory)
+
+    records = CashFlowRecord.objects.all()
+    if previous is None:
+        columns = read_columns(records)
+        read, deleted = len(columns['ids']), 0
+    else:
+        watermark = datetime.fromisoformat(previous.manifest['watermark']) - WATERMARK_OVERLAP
+        changed = read_columns(records.filter(Q(id__gt=previous.manifest['max_id']) | Q(updated_at__gte=watermark)))
+        current_ids = np.fromiter(records.order_by().values_list('id', flat=True).iterator(), dtype=np.int64)
+        old = previous.columns
+        alive = np.isin(old['ids'], current_ids, assume_unique=True)
+        deleted = len(alive) - int(np.count_nonzero(alive))
+        # Changed rows replace their old version
+        keep = alive & ~np.isin(old['ids'], changed['ids'], assume_unique=True)
+        columns = {name: np.concatenate((old[name][keep], changed[name])) for name in COLUMNS}
+        read = len(changed['ids'])
+
+    order = np.argsort(columns['ids'], kind='stable')
+    columns = {name: values[order] for name, values in columns.items()}
+    dictionaries = {
+        field: {str(pk): name for pk, name in model.objects.values_list('pk', 'name')}
+        for field, model in REFERENCE_MODELS.items()
+    }
+    manifest = _write_generation(directory, columns, dictionaries, {
+        'rows': len(columns['ids']),
+        'max_id': int(columns['ids'][-1]) if len(columns['ids']) else 0,
+        'watermark': started_at.isoformat(),
+        'created_at': timezone.now().isoformat(),
+    })
+    return {
+        'rows': manifest['rows'],
+        'read': read,
+        'deleted': deleted,
+        'full': previous is None,
+        'bytes': sum(values.nbytes for values in columns.values()),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def _ints(query_dict, name):
+    return [int(value) for value in query_dict.getlist(name) if value != '']
+
+
+def filter_mask(snapshot, query_dict):
+    """Boolean mask of the snapshot rows matching the record list filters.
+
+    Supports ``date_min``/``date_max``, ``amount_min``/``amount_max``, the
+    multi-value reference filters and ``has_comment``.
+
+    Raises:
+        ValueError: If a parameter is malformed
+    """
+    columns = snapshot.columns
+    mask = np.ones(len(snapshot), dtype=np.bool_)
+    for name, compare in (('date_min', np.greater_equal), ('date_max', np.less_equal)):
+        if query_dict.get(name):
+            day = (date.fromisoformat(query_dict[name]) - EPOCH_DATE).days
+            mask &= compare(columns['dates'], day)
+    for name, compare in (('amount_min', np.greater_equal), ('amount_max', np.less_equal)):
+        if query_dict.get(name):
+            try:
+                amount = Decimal(query_dict[name])
+            except InvalidOperation:
+                raise ValueError(f'{name} must be a number') from None
+            if not amount.is_finite():
+                raise ValueError(f'{name} must be finite')
+            minor = int((amount * 100).to_integral_value())
+            # Beyond the int64 range every amount is on the same side
+            mask &= compare(columns['amounts'], min(max(minor, INT64.min), INT64.max))
+    for field in REFERENCE_MODELS:
+        values = _ints(query_dict, field)
+        if values:
+            mask &= np.isin(columns[field], values)
+    has_comment = query_dict.get('has_comment')
+    if has_comment in ('true', 'false'):
+        mask &= columns['has_comment'] == (has_comment == 'true')
+    elif has_comment:
+        raise ValueError(f'has_comment must be true or false, not {has_comment!r}')
+    return mask
+
+
+def analytics_arrays(snapshot, query_dict):
+    """Arrays in the format of ``analytics.load_arrays`` for the matching rows."""
+    mask = filter_mask(snapshot, query_dict)
+    columns = snapshot.columns
+    return {
+        'ids': columns['ids'][mask],
+        'dates': EPOCH + columns['dates'][mask].astype('timedelta64[D]'),
+        'amounts': columns['amounts'][mask] / 100,
+        'categories': columns['category'][mask].astype(np.int64),
+    }
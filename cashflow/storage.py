@@ -0,0 +1,72 @@
+"""
+Static file storage that fingerprints and precompresses assets.
+
+``collectstatic`` writes content-hashed copies of every asset together with a
+manifest, then stores ``.gz`` (and ``.br`` when the optional ``brotli``
+package is installed) variants next to each compressible file. The variants
+are picked by ``cashflow.middleware.StaticAssetMiddleware`` at request time.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes gzip/brotli variants of assets."""
+
+    # Rewrite ES module imports between our scripts to their hashed names
+    support_js_module_import_aggregation = True
+    # Templates still render when collectstatic has not run (development, tests)
+    manifest_strict = False
+
+    compress_extensions = ('.js', '.css', '.html', '.json', '.svg', '.txt', '.map')
+    min_compress_size = 256
+
+    def stored_name(self, name):
+        """Return the hashed name, falling back to ``name`` for uncollected files."""
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        """Hash files as usual, then write compressed variants of the results."""
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        names = set(self.hashed_files.values()) | set(self.hashed_files)
+        for name in sorted(names):
+            if not name.endswith(self.compress_extensions) or not self.exists(name):
+                continue
+            for compressed_name in self._compress(name):
+                yield name, compressed_name, True
+
+    def _compress(self, name):
+        """Write compressed variants of ``name`` and return their names."""
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            content = source.read()
+        if len(content) < self.min_compress_size:
+            return []
+
+        written = []
+        variants = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+        for suffix, compress in variants:
+            compressed = compress(content)
+            # Skip variants that do not save anything worth the extra lookup
+            if len(compressed) >= len(content) * 0.95:
+                continue
+            with open(path + suffix, 'wb') as output:
+                output.write(compressed)
+            os.utime(path + suffix, (os.path.getatime(path), os.path.getmtime(path)))
+            written.append(name + suffix)
+        return written
@@ -0,0 +1,251 @@
+"""
+Per-tenant ledgers in separate SQLite databases.
+
+Each ``Tenant`` (registered in the default database) owns one SQLite file
+holding its records and reference lists. The current tenant lives in a
+context variable set by ``TenantMiddleware`` (from the
+``CASHFLOW_TENANT_HEADER`` header or the ``cashflow_tenant`` cookie) or by
+``use_tenant``. ``TenantRouter`` sends the ledger models to that tenant's
+connection. Connections are registered on first use, so adding a tenant
+needs no settings change or restart. Requests without a tenant keep using
+the default database.
+
+Writes, locks and cache keys (see ``cache.make_key``) are therefore
+isolated per tenant: a heavy import in one file never blocks another.
+"""
+import contextvars
+import copy
+import os
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.validators import validate_slug
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import Http404
+
+from .models import Tenant
+
+# Models stored in tenant databases (everything else stays in default)
+TENANT_MODELS = {
+    'status', 'type', 'category', 'subcategory', 'cashflowrecord', 'recurringtemplate', 'periodaggregate', 'budget',
+}
+REGISTRY_KEY = 'cashflow:tenants'
+COOKIE_NAME = 'cashflow_tenant'
+
+_current = contextvars.ContextVar('cashflow_tenant', default=None)
+_register_lock = threading.Lock()
+
+
+class UnknownTenant(LookupError):
+    """Raised for a tenant slug missing from the registry."""
+
+
+def current_tenant():
+    """Slug of the active tenant, or None for the default database."""
+    return _current.get()
+
+
+def alias_for(slug):
+    """Database alias of a tenant."""
+    return f'tenant_{slug}'
+
+
+def db_alias():
+    """Database alias holding the ledger of the active tenant."""
+    slug = _current.get()
+    return alias_for(slug) if slug else DEFAULT_DB_ALIAS
+
+
+def registry():
+    """Map every tenant slug to its database file (cached in the shared cache)."""
+    tenants = cache.get(REGISTRY_KEY)
+    if tenants is None:
+        tenants = dict(Tenant.objects.using(DEFAULT_DB_ALIAS).values_list('slug', 'database'))
+        cache.set(REGISTRY_KEY, tenants, None)
+    return tenants
+
+
+def invalidate_registry():
+    cache.delete(REGISTRY_KEY)
+
+
+def tenant_database_path(slug):
+    """Default database file of a new tenant."""
+    return os.path.join(settings.CASHFLOW_TENANT_DIR, f'{slug}.sqlite3')
+
+
+def register_connection(slug, database=None):
+    """Make the tenant's database alias available, (re)pointing it at its file.
+
+    Returns:
+        str: The database alias
+
+    Raises:
+        UnknownTenant: If ``database`` is not given and the slug is not registered
+    """
+    if database is None:
+        database = registry().get(slug)
+        if database is None:
+            raise UnknownTenant(slug)
+    alias = alias_for(slug)
+    configured = connections.settings.get(alias)
+    if configured is None or configured['NAME'] != database:
+        with _register_lock:
+            configured = connections.settings.get(alias)
+            if configured is None or configured['NAME'] != database:
+                settings_dict = copy.deepcopy(connections.settings[DEFAULT_DB_ALIAS])
+                settings_dict['NAME'] = database
+                settings_dict['TEST'] = {**settings_dict.get('TEST', {}), 'NAME': database}
+                connections.settings[alias] = settings_dict
+    if connections[alias].settings_dict['NAME'] != database:
+        # The tenant moved: drop this thread's connection to the old file
+        connections[alias].close()
+        del connections[alias]
+    return alias
+
+
+@contextmanager
+def use_tenant(slug, database=None):
+    """Route ledger queries to ``slug``'s database (None: default) inside the block.
+
+    ``database`` points the tenant at another file in this process, e.g. a
+    scratch database that is not in the registry.
+    """
+    if slug:
+        register_connection(slug, database)
+    token = _current.set(slug or None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def create_tenant(slug, name=None, database=None):
+    """Register a tenant and create its migrated database.
+
+    Args:
+        slug: Identifier used in requests (letters, digits, ``-`` and ``_``)
+        name: Display name (defaults to the slug)
+        database: SQLite file (defaults to ``CASHFLOW_TENANT_DIR/<slug>.sqlite3``)
+
+    Returns:
+        Tenant: The registered tenant
+    """
+    validate_slug(slug)
+    database = os.path.abspath(database or tenant_database_path(slug))
+    os.makedirs(os.path.dirname(database), exist_ok=True)
+    if not os.path.exists(database):
+        # Only settable before the first table; lets maintain_db free pages in steps
+        with closing(sqlite3.connect(database)) as db:
+            db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            db.execute('VACUUM')
+    tenant = Tenant.objects.using(DEFAULT_DB_ALIAS).create(slug=slug, name=name or slug, database=database)
+    invalidate_registry()
+    migrate_tenant(slug)
+    return tenant
+
+
+def migrate_tenant(slug, verbosity=0):
+    """Apply pending migrations to a tenant's database."""
+    call_command('migrate', database=register_connection(slug), verbosity=verbosity, interactive=False)
+
+
+def move_tenant(slug, destination, keep_old=False):
+    """Copy a tenant's database to ``destination`` and point the registry at it.
+
+    The copy is taken with SQLite's backup API while holding the write lock
+    of the old file, so it is consistent. Writers already waiting on that
+    lock when the move finishes still write to the old file, so move a
+    tenant while it is idle; the old file is kept as ``<name>.moved`` unless
+    ``keep_old`` keeps it in place.
+
+    Returns:
+        str: Absolute path of the new database file
+    """
+    tenant = Tenant.objects.using(DEFAULT_DB_ALIAS).get(slug=slug)
+    destination = os.path.abspath(destination)
+    if os.path.exists(destination):
+        raise FileExistsError(destination)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    connections[register_connection(slug)].close()
+
+    # One connection holds the write lock, the other reads the copy
+    writer = sqlite3.connect(tenant.database, isolation_level=None)
+    try:
+        writer.execute('BEGIN IMMEDIATE')
+        with closing(sqlite3.connect(tenant.database)) as source, closing(sqlite3.connect(destination)) as target:
+            source.backup(target)
+        Tenant.objects.using(DEFAULT_DB_ALIAS).filter(pk=tenant.pk).update(database=destination)
+        invalidate_registry()
+        writer.execute('COMMIT')
+    finally:
+        writer.close()
+
+    register_connection(slug, destination)
+    if not keep_old:
+        os.replace(tenant.database, f'{tenant.database}.moved')
+    return destination
+
+
+class TenantRouter:
+    """Route ledger models to the active tenant's database."""
+
+    def _route(self, model):
+        if model._meta.app_label == 'cashflow' and model._meta.model_name in TENANT_MODELS:
+            slug = _current.get()
+            if slug:
+                return alias_for(slug)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not db.startswith('tenant_'):
+            return None
+        if app_label != 'cashflow':
+            return False
+        # Data migrations (no model name) run too; their tables exist here
+        return model_name is None or model_name in TENANT_MODELS
+
+
+class TenantMiddleware:
+    """
+    Activate the tenant named by the request for the rest of the request.
+
+    Streamed bodies are produced after the view returns, so their iteration
+    runs with the tenant active as well; async streams (live events) receive
+    the tenant from their view instead.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        slug = request.headers.get(settings.CASHFLOW_TENANT_HEADER) or request.COOKIES.get(COOKIE_NAME)
+        if slug and slug not in registry():
+            raise Http404(f'Unknown tenant: {slug}')
+        request.tenant = slug or None
+        with use_tenant(slug):
+            response = self.get_response(request)
+        if slug and response.streaming and not response.is_async:
+            response.streaming_content = _stream_as(slug, response.streaming_content)
+        return response
+
+
+def _stream_as(slug, content):
+    # Chunks may be produced in different contexts (ASGI runs each in a
+    # thread), so restore the previous value instead of resetting a token
+    previous = _current.get()
+    _current.set(slug)
+    try:
+        yield from content
+    finally:
+        _current.set(previous)
@@ -0,0 +1,107 @@
+from datetime import date
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import activate
+
+from cashflow.analytics import analyze, group_stats, rolling_daily
+from cashflow.models import CashFlowRecord, Category, Status, Subcategory, Type
+
+
+class AnalyticsTests(TestCase):
+    """Tests for vectorized record statistics and outlier detection."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create two categories, one with an obvious outlier."""
+        status = Status.objects.create(name="Business")
+        type = Type.objects.create(name="Expense")
+        cls.rent = Category.objects.create(name="Rent")
+        cls.food = Category.objects.create(name="Food")
+        rent_sub = Subcategory.objects.create(name="Office", category=cls.rent)
+        food_sub = Subcategory.objects.create(name="Lunch", category=cls.food)
+        records = [
+            CashFlowRecord(
+                date=date(2025, 1, day), status=status, type=type,
+                category=cls.food, subcategory=food_sub, amount=amount,
+            )
+            for day, amount in enumerate([10, 12, 11, 9, 10, 11, 500], start=1)
+        ]
+        records.append(CashFlowRecord(
+            date=date(2025, 1, 3), status=status, type=type,
+            category=cls.rent, subcategory=rent_sub, amount=1000,
+        ))
+        CashFlowRecord.objects.bulk_create(records)
+        cls.outlier = CashFlowRecord.objects.get(amount=500)
+
+    def test_per_category_statistics(self):
+        """Verify counts, totals and medians per category."""
+        result = analyze(CashFlowRecord.objects.all())
+        categories = {row['category']: row for row in result['categories']}
+
+        self.assertEqual(result['overall']['count'], 8)
+        self.assertEqual(categories['Food']['count'], 7)
+        self.assertEqual(categories['Food']['total'], 563.0)
+        self.assertEqual(categories['Food']['median'], 11.0)
+        self.assertEqual(categories['Rent']['percentiles']['p90'], 1000.0)
+
+    def test_iqr_flags_outlier_within_category(self):
+        """Verify an amount far outside its category's quartiles is flagged."""
+        result = analyze(CashFlowRecord.objects.all())
+
+        self.assertEqual(result['outlier_count'], 1)
+        self.assertEqual(result['outliers'][0]['id'], self.outlier.id)
+        self.assertIn('iqr', result['outliers'][0]['methods'])
+
+    def test_small_chunks_give_same_result(self):
+        """Verify chunked loading does not change the result."""
+        self.assertEqual(analyze(CashFlowRecord.objects.all(), chunk_size=3), analyze(CashFlowRecord.objects.all()))
+
+    def test_empty_selection(self):
+        """Verify an empty selection returns an empty summary."""
+        result = analyze(CashFlowRecord.objects.none())
+        self.assertEqual(result['overall'], {'count': 0})
+        self.assertEqual(result['outliers'], [])
+
+    def test_endpoint_applies_filters(self):
+        """Verify the endpoint analyzes only the filtered records."""
+        activate('en')
+        response = self.client.get(reverse('record_analytics'), {'category': self.rent.id})
+        self.assertEqual(response.json()['overall']['total'], 1000.0)
+        self.assertEqual(self.client.get(reverse('record_analytics'), {'window': 'x'}).status_code, 400)
+
+    def test_endpoint_rejects_invalid_filters(self):
+        """Verify invalid filters give 400 instead of unfiltered totals."""
+        for field, params in (('category', {'category': 999999}), ('date', {'date_min': 'soon'})):
+            response = self.client.get(reverse('record_analytics'), params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(field, response.json()['errors'])
+
+    def test_command_prints_outliers(self):
+        """Verify the management command lists outliers."""
+        output = StringIO()
+        call_command('analyze_records', '--filter', f'category={self.food.id}', stdout=output)
+        self.assertIn('1 outlier(s)', output.getvalue())
+
+
+class ArrayHelperTests(TestCase):
+    """Tests for the array-level helpers."""
+
+    def test_rolling_average_fills_missing_days(self):
+        """Verify days without records count as zero in the rolling window."""
+        dates = np.array(['2025-01-01', '2025-01-03'], dtype='datetime64[D]')
+        daily = rolling_daily(dates, np.array([30.0, 60.0]), window=3)
+
+        self.assertEqual([day['total'] for day in daily], [30.0, 0.0, 60.0])
+        self.assertEqual([day['rolling_mean'] for day in daily], [30.0, 15.0, 30.0])
+
+    def test_group_stats_aligns_rows(self):
+        """Verify per-row group means line up with the input order."""
+        keys, stats, row_stats = group_stats(np.array([1.0, 10.0, 3.0]), np.array([2, 1, 2]))
+
+        self.assertEqual(keys.tolist(), [1, 2])
+        self.assertEqual(row_stats['mean'].tolist(), [2.0, 10.0, 2.0])
+        self.assertEqual(stats[2]['mean'], 2.0)
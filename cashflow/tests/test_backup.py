@@ -0,0 +1,63 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from cashflow.backup import BackupError, backup_database, list_backups, rotate_backups
+from cashflow.models import Status
+
+
+class BackupCommandTests(TransactionTestCase):
+    """Tests for the online backup command."""
+
+    def setUp(self):
+        """Back up into a temporary directory."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        Status.objects.create(name="Business")
+
+    def test_compressed_backup_is_a_valid_copy(self):
+        """Verify a checked, compressed backup restores the data."""
+        output = StringIO()
+        call_command(
+            'backup_cashflow', output_dir=self.directory, compress=True,
+            integrity_check=True, pages=1, sleep=0, stdout=output,
+        )
+        self.assertIn('longest step', output.getvalue())
+
+        [path] = list_backups(self.directory)
+        self.assertTrue(path.endswith('.sqlite3.gz'))
+        restored = os.path.join(self.directory, 'restored.sqlite3')
+        with gzip.open(path) as packed, open(restored, 'wb') as raw:
+            raw.write(packed.read())
+        with sqlite3.connect(restored) as copy:
+            names = copy.execute('SELECT name FROM cashflow_status').fetchall()
+        self.assertEqual(names, [("Business",)])
+
+    def test_backups_in_the_same_second_are_kept(self):
+        """Verify back-to-back backups get distinct files."""
+        first = backup_database(self.directory, sleep=0)
+        second = backup_database(self.directory, sleep=0)
+
+        self.assertNotEqual(first['path'], second['path'])
+        self.assertEqual(list_backups(self.directory), [first['path'], second['path']])
+
+    def test_unfinished_backup_times_out(self):
+        """Verify a copy exceeding its timeout fails and leaves no file behind."""
+        with self.assertRaisesMessage(BackupError, 'did not finish within 0 s'):
+            backup_database(self.directory, pages=1, sleep=0, timeout=0)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_rotation_keeps_newest(self):
+        """Verify only the newest backups survive rotation."""
+        for stamp in ('20250101-000000', '20250102-000000', '20250103-000000'):
+            open(os.path.join(self.directory, f'cashflow-{stamp}.sqlite3'), 'w').close()
+
+        removed = rotate_backups(2, self.directory)
+        self.assertEqual([os.path.basename(path) for path in removed], ['cashflow-20250101-000000.sqlite3'])
+        self.assertEqual(len(list_backups(self.directory)), 2)
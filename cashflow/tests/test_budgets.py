@@ -0,0 +1,146 @@
+from datetime import date
+from io import StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import activate
+
+from cashflow.budgets import budget_report, ensure_triggers, expected_aggregates, period_bounds, stored_aggregates
+from cashflow.models import Budget, CashFlowRecord, Category, PeriodAggregate, Status, Subcategory, Type
+
+
+class BudgetTests(TestCase):
+    """Tests for trigger-maintained period aggregates and the budget report."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create expense and income records in March 2025."""
+        cls.status = Status.objects.create(name='Business')
+        cls.expense = Type.objects.create(name='Expense')
+        cls.income = Type.objects.create(name='Income')
+        cls.food = Category.objects.create(name='Food')
+        cls.rent = Category.objects.create(name='Rent')
+        cls.lunch = Subcategory.objects.create(name='Lunch', category=cls.food)
+        cls.groceries = Subcategory.objects.create(name='Groceries', category=cls.food)
+        cls.office = Subcategory.objects.create(name='Office', category=cls.rent)
+        cls.record(date(2025, 3, 2), cls.lunch, '20.10')
+        cls.record(date(2025, 3, 10), cls.groceries, '39.90')
+        cls.record(date(2025, 3, 12), cls.lunch, '500.00', type=cls.income)
+        cls.record(date(2025, 2, 27), cls.lunch, '70.00')
+
+    @classmethod
+    def record(cls, day, subcategory, amount, type=None):
+        return CashFlowRecord.objects.create(
+            date=day, status=cls.status, type=type or cls.expense,
+            category=subcategory.category, subcategory=subcategory, amount=amount,
+        )
+
+    def assertAggregatesCurrent(self):
+        self.assertEqual(stored_aggregates(), expected_aggregates())
+
+    def test_writes_keep_aggregates_current(self):
+        """Verify inserts, edits, moves, bulk writes and deletes update the aggregates."""
+        self.assertEqual(stored_aggregates()[self.food.id, date(2025, 3, 1), self.lunch.id, self.expense.id], (2010, 1))
+
+        record = self.record(date(2025, 3, 20), self.lunch, '0.29')
+        record.amount = '0.30'
+        record.save()
+        self.assertAggregatesCurrent()
+        record.date = date(2025, 4, 1)
+        record.subcategory, record.category = self.office, self.rent
+        record.save(update_fields=['date', 'subcategory', 'category'])
+        self.assertAggregatesCurrent()
+
+        CashFlowRecord.objects.bulk_create([
+            CashFlowRecord(date=date(2025, 3, day), status=self.status, type=self.expense,
+                           category=self.food, subcategory=self.groceries, amount='1.11')
+            for day in range(1, 11)
+        ])
+        CashFlowRecord.objects.filter(amount='1.11').update(amount='2.22')
+        self.assertAggregatesCurrent()
+        CashFlowRecord.objects.filter(subcategory=self.groceries).delete()
+        record.delete()
+        self.assertAggregatesCurrent()
+        self.assertFalse(PeriodAggregate.objects.filter(subcategory=self.groceries).exists())
+
+    def test_rolled_back_write_leaves_aggregates(self):
+        """Verify the aggregates roll back with the record write."""
+        before = stored_aggregates()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.record(date(2025, 3, 5), self.lunch, '999.00')
+            raise RuntimeError
+        self.assertEqual(stored_aggregates(), before)
+
+    def test_report_compares_spending_with_limits(self):
+        """Verify spent, remaining, burn rate and status per budget; income is ignored."""
+        Budget.objects.create(category=self.food, limit='100.00')
+        Budget.objects.create(category=self.food, subcategory=self.lunch, limit='20.00')
+        Budget.objects.create(category=self.food, period=Budget.PERIOD_QUARTER, limit='1000.00')
+        Budget.objects.create(category=self.rent, limit='50.00')
+
+        with self.assertNumQueries(3):
+            report = budget_report(date(2025, 3, 15))
+        rows = {(row['category'], row['subcategory'], row['period']): row for row in report['budgets']}
+
+        monthly = rows['Food', None, 'month']
+        self.assertEqual(monthly['spent'], 60.0)
+        self.assertEqual(monthly['remaining'], 40.0)
+        self.assertEqual(monthly['burn_rate'], 4.0)
+        self.assertEqual(monthly['projected'], 124.0)
+        self.assertEqual(monthly['status'], 'at_risk')
+        self.assertEqual(monthly['daily_allowance'], 2.5)
+        self.assertEqual(rows['Food', 'Lunch', 'month']['status'], 'over')
+        quarterly = rows['Food', None, 'quarter']
+        self.assertEqual((quarterly['start'], quarterly['end']), ('2025-01-01', '2025-03-31'))
+        self.assertEqual(quarterly['spent'], 130.0)
+        self.assertEqual(rows['Rent', None, 'month']['status'], 'ok')
+
+    def test_period_bounds(self):
+        """Verify month, quarter and year periods around a day."""
+        day = date(2024, 11, 30)
+        self.assertEqual(period_bounds(Budget.PERIOD_MONTH, day), (date(2024, 11, 1), date(2024, 12, 1)))
+        self.assertEqual(period_bounds(Budget.PERIOD_QUARTER, day), (date(2024, 10, 1), date(2025, 1, 1)))
+        self.assertEqual(period_bounds(Budget.PERIOD_YEAR, day), (date(2024, 1, 1), date(2025, 1, 1)))
+
+    def test_subcategory_must_belong_to_category(self):
+        """Verify a budget cannot pair a category with another's subcategory."""
+        with self.assertRaises(ValidationError):
+            Budget(category=self.rent, subcategory=self.lunch, limit='1.00').full_clean()
+
+    def test_endpoint(self):
+        """Verify the JSON and HTML reports and date validation."""
+        activate('en')
+        Budget.objects.create(category=self.food, limit='100.00')
+        url = reverse('budget_report')
+
+        result = self.client.get(url, {'date': '2025-03-15', 'format': 'json'}).json()
+        self.assertEqual(result['budgets'][0]['spent'], 60.0)
+        response = self.client.get(url, {'date': '2025-03-15'})
+        self.assertContains(response, '60.00')
+        self.assertEqual(self.client.get(url, {'date': 'March'}).status_code, 400)
+
+    def test_missing_trigger_is_restored(self):
+        """Verify ensure_triggers recreates a dropped trigger and rebuilds the aggregates."""
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER cashflow_aggregate_insert')
+        self.record(date(2025, 3, 3), self.lunch, '5.00')
+        self.assertNotEqual(stored_aggregates(), expected_aggregates())
+
+        self.assertEqual(ensure_triggers(), ['cashflow_aggregate_insert'])
+        self.assertAggregatesCurrent()
+        self.record(date(2025, 3, 4), self.lunch, '5.00')
+        self.assertAggregatesCurrent()
+
+    def test_command_checks_and_rebuilds(self):
+        """Verify --check reports drift and a rebuild fixes it."""
+        PeriodAggregate.objects.filter(subcategory=self.groceries).update(amount_minor=1)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_aggregates', '--check', stdout=StringIO())
+
+        output = StringIO()
+        call_command('rebuild_aggregates', stdout=output)
+        self.assertIn('rebuilt 4 aggregates', output.getvalue())
+        self.assertAggregatesCurrent()
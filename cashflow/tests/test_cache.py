@@ -0,0 +1,189 @@
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils.translation import activate
+
+from cashflow import metrics
+from cashflow.cache import (
+    LRUCache, bump_data_version, cached_filter_result, filter_results, get_data_version, normalized_query,
+)
+from cashflow.models import CashFlowRecord, Category, Status, Subcategory, Type
+
+
+class PageCacheTests(TransactionTestCase):
+    """Tests for the versioned record_list page cache.
+
+    Runs outside a wrapping transaction because pages read inside an open
+    transaction are deliberately never cached.
+    """
+
+    def setUp(self):
+        """Start from an empty cache with one record."""
+        activate('en')
+        cache.clear()
+        self.status = Status.objects.create(name="Business")
+        self.type = Type.objects.create(name="Expense")
+        self.category = Category.objects.create(name="Rent")
+        self.subcategory = Subcategory.objects.create(name="Office", category=self.category)
+        self.record = CashFlowRecord.objects.create(
+            date="2025-01-01",
+            status=self.status,
+            type=self.type,
+            category=self.category,
+            subcategory=self.subcategory,
+            amount=100,
+        )
+
+    def test_second_request_served_from_cache(self):
+        """Verify a repeated request renders without database queries."""
+        first = self.client.get(reverse('record_list'))
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('record_list'))
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertContains(second, "100.00")
+
+    def test_equivalent_queries_share_entry(self):
+        """Verify parameter order and blank values do not fragment the cache."""
+        self.client.get(reverse('record_list'), {'status': self.status.id, 'type': ''})
+        response = self.client.get(f"{reverse('record_list')}?type=&status={self.status.id}")
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_languages_cached_separately(self):
+        """Verify each language gets its own cached page."""
+        self.client.get('/', HTTP_ACCEPT_LANGUAGE='en')
+        response = self.client.get('/', HTTP_ACCEPT_LANGUAGE='ru')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Денежный поток')
+
+    def test_writes_invalidate_cached_page(self):
+        """Verify add, edit, delete and quick-add all invalidate the page."""
+        data = {
+            'date': '2025-02-01',
+            'amount': '55.00',
+            'status': self.status.id,
+            'type': self.type.id,
+            'category': self.category.id,
+            'subcategory': self.subcategory.id,
+        }
+        self.client.get(reverse('record_list'))
+        self.client.post(reverse('add_record'), data)
+        self.assertContains(self.client.get(reverse('record_list')), "55.00")
+
+        self.client.post(reverse('edit_record', args=[self.record.id]), {**data, 'amount': '77.00'})
+        self.assertContains(self.client.get(reverse('record_list')), "77.00")
+
+        self.client.post(reverse('delete_record', args=[self.record.id]))
+        self.assertNotContains(self.client.get(reverse('record_list')), "77.00")
+
+        version = get_data_version()
+        self.client.post(reverse('quick_add_status'), {'name': 'Personal'})
+        self.assertGreater(get_data_version(), version)
+
+    def test_csrf_token_is_per_client(self):
+        """Verify cached pages carry each client's own CSRF token."""
+        self.client.get(reverse('record_list'))
+        other = self.client_class()
+        response = other.get(reverse('record_list'))
+
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertNotContains(response, '__cashflow_csrf_token__')
+        self.assertIn('csrftoken', response.cookies)
+
+    def test_hit_and_miss_counters_exposed(self):
+        """Verify the metrics endpoint reports page cache counters."""
+        metrics.reset()
+        self.client.get(reverse('record_list'))
+        self.client.get(reverse('record_list'))
+
+        counters = self.client.get(reverse('metrics')).json()['counters']
+        self.assertEqual(counters['page_cache.hits'], 1)
+        self.assertEqual(counters['page_cache.misses'], 1)
+
+
+class FilterCacheTests(TransactionTestCase):
+    """Tests for cached filter results shared across requests."""
+
+    def setUp(self):
+        """Start from empty caches with one record."""
+        cache.clear()
+        filter_results.clear()
+        self.status = Status.objects.create(name="Business")
+        category = Category.objects.create(name="Rent")
+        self.record = CashFlowRecord.objects.create(
+            date="2025-01-01",
+            status=self.status,
+            type=Type.objects.create(name="Expense"),
+            category=category,
+            subcategory=Subcategory.objects.create(name="Office", category=category),
+            amount=100,
+        )
+        self.calls = 0
+
+    def compute(self):
+        """Count how often the result is computed."""
+        self.calls += 1
+        return list(CashFlowRecord.objects.values_list('id', flat=True))
+
+    def test_equivalent_filters_reuse_result(self):
+        """Verify parameter order, blanks and the page number share one entry."""
+        cached_filter_result('ids', QueryDict(f'status={self.status.id}&type='), self.compute)
+        result = cached_filter_result('ids', QueryDict(f'page=2&status={self.status.id}'), self.compute)
+        self.assertEqual(result, [self.record.id])
+        self.assertEqual(self.calls, 1)
+
+    def test_shared_cache_used_when_local_entry_missing(self):
+        """Verify another worker's result is reused from the shared cache."""
+        cached_filter_result('ids', QueryDict(), self.compute)
+        filter_results.clear()
+        cached_filter_result('ids', QueryDict(), self.compute)
+        self.assertEqual(self.calls, 1)
+
+    def test_record_write_invalidates_result(self):
+        """Verify a committed record write makes the next read recompute."""
+        cached_filter_result('ids', QueryDict(), self.compute)
+        self.record.delete()
+        self.assertEqual(cached_filter_result('ids', QueryDict(), self.compute), [])
+
+    @override_settings(CASHFLOW_FILTER_CACHE=False)
+    def test_disabled_cache_always_computes(self):
+        """Verify the cache can be switched off."""
+        cached_filter_result('ids', QueryDict(), self.compute)
+        cached_filter_result('ids', QueryDict(), self.compute)
+        self.assertEqual(self.calls, 2)
+
+
+class LRUCacheTests(TestCase):
+    """Tests for the process-local LRU."""
+
+    def test_evicts_least_recently_used(self):
+        """Verify reading an entry protects it from eviction."""
+        lru = LRUCache(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+        self.assertEqual(len(lru), 2)
+
+
+class DataVersionTests(TestCase):
+    """Tests for data version helpers."""
+
+    def test_bump_survives_eviction(self):
+        """Verify bumping works when the version key was evicted."""
+        cache.delete('cashflow:data-version')
+        first = bump_data_version()
+        self.assertEqual(bump_data_version(), first + 1)
+
+    def test_pages_not_cached_inside_transaction(self):
+        """Verify pages read inside an open transaction bypass the cache."""
+        response = self.client.get(reverse('record_list'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_normalized_query(self):
+        """Verify query normalization sorts keys and values and drops blanks."""
+        query = QueryDict('type=2&status=&category=3&category=1')
+        self.assertEqual(normalized_query(query), 'category=1&category=3&type=2')
@@ -0,0 +1,210 @@
+import csv
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from cashflow import jobs
+from cashflow.duplicates import duplicate_groups
+from cashflow.fingerprint import normalize_comment, record_fingerprint
+from cashflow.forms import CashFlowForm
+from cashflow.models import CashFlowRecord, Category, Job, Status, Subcategory, Type
+
+
+class FingerprintTests(TestCase):
+    """Tests for the record content fingerprint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create shared reference data."""
+        cls.status = Status.objects.create(name="Business")
+        cls.type = Type.objects.create(name="Expense")
+        cls.category = Category.objects.create(name="Office")
+        cls.subcategory = Subcategory.objects.create(name="Paper", category=cls.category)
+
+    def make_record(self, **overrides):
+        values = {
+            'date': '2025-04-01',
+            'status': self.status,
+            'type': self.type,
+            'category': self.category,
+            'subcategory': self.subcategory,
+            'amount': '12.50',
+            'comment': 'A4 paper',
+        }
+        values.update(overrides)
+        return CashFlowRecord.objects.create(**values)
+
+    def test_comment_normalization(self):
+        """Verify case and whitespace differences do not change the fingerprint."""
+        self.assertEqual(normalize_comment('  A4   Paper '), 'a4 paper')
+        self.assertEqual(normalize_comment(None), '')
+        first = self.make_record()
+        second = self.make_record(comment='a4  PAPER', amount='12.5')
+        self.assertEqual(first.fingerprint, second.fingerprint)
+        self.assertEqual(len(first.fingerprint), 64)
+
+    def test_fingerprint_follows_updates(self):
+        """Verify saving with update_fields keeps the fingerprint current."""
+        record = self.make_record()
+        record.amount = '13.00'
+        record.save(update_fields=['amount'])
+        record.refresh_from_db()
+        self.assertEqual(record.fingerprint, record_fingerprint(
+            record.date, record.amount, self.type.pk, self.category.pk, self.subcategory.pk, 'A4 paper',
+        ))
+
+    def test_status_not_part_of_fingerprint(self):
+        """Verify records differing only in status are duplicates."""
+        other = Status.objects.create(name="Personal")
+        self.assertEqual(self.make_record().fingerprint, self.make_record(status=other).fingerprint)
+
+    def test_bulk_create_fills_fingerprint(self):
+        """Verify fingerprints are set when save() is bypassed."""
+        record, = CashFlowRecord.objects.bulk_create([CashFlowRecord(
+            date='2025-04-01', status=self.status, type=self.type, category=self.category,
+            subcategory=self.subcategory, amount='12.50', comment='A4 paper',
+        )])
+        self.assertEqual(record.fingerprint, self.make_record().fingerprint)
+
+    def test_find_duplicates_command(self):
+        """Verify duplicate groups are reported and copies deleted."""
+        first = self.make_record()
+        self.make_record(comment='a4 paper')
+        self.make_record(amount='99.00')
+
+        self.assertEqual([group['count'] for group in duplicate_groups()], [2])
+        output = StringIO()
+        call_command('find_duplicates', stdout=output)
+        self.assertIn('1 group(s), 1 duplicate record(s)', output.getvalue())
+
+        call_command('find_duplicates', '--delete', stdout=StringIO())
+        self.assertEqual(CashFlowRecord.objects.count(), 2)
+        self.assertTrue(CashFlowRecord.objects.filter(pk=first.pk).exists())
+
+
+class DuplicatePolicyTests(TestCase):
+    """Tests for duplicate handling on form submission and import."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create shared reference data and one existing record."""
+        cls.business = Status.objects.create(name="Business")
+        cls.personal = Status.objects.create(name="Personal")
+        cls.type = Type.objects.create(name="Expense")
+        cls.category = Category.objects.create(name="Office")
+        cls.subcategory = Subcategory.objects.create(name="Paper", category=cls.category)
+        cls.existing = CashFlowRecord.objects.create(
+            date='2025-04-01', status=cls.business, type=cls.type, category=cls.category,
+            subcategory=cls.subcategory, amount='12.50', comment='A4 paper',
+        )
+
+    def setUp(self):
+        """Store job files in a throwaway directory."""
+        self.jobs_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.jobs_root, ignore_errors=True)
+        settings_override = override_settings(CASHFLOW_JOBS_ROOT=self.jobs_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def form_data(self, **overrides):
+        data = {
+            'date': '2025-04-01',
+            'status': self.personal.pk,
+            'type': self.type.pk,
+            'category': self.category.pk,
+            'subcategory': self.subcategory.pk,
+            'amount': '12.50',
+            'comment': 'a4 paper ',
+        }
+        data.update(overrides)
+        return data
+
+    @override_settings(CASHFLOW_DUPLICATE_POLICY='warn')
+    def test_form_warns_until_confirmed(self):
+        """Verify a duplicate needs confirmation under the warn policy."""
+        form = CashFlowForm(data=self.form_data())
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.duplicate_of.pk, self.existing.pk)
+        self.assertTrue(form.duplicate_needs_confirmation)
+
+        form = CashFlowForm(data=self.form_data(confirm_duplicate='on'))
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.assertEqual(CashFlowRecord.objects.count(), 2)
+
+    @override_settings(CASHFLOW_DUPLICATE_POLICY='skip')
+    def test_form_rejects_under_skip(self):
+        """Verify confirmation does not help under the skip policy."""
+        form = CashFlowForm(data=self.form_data(confirm_duplicate='on'))
+        self.assertFalse(form.is_valid())
+        self.assertFalse(form.duplicate_needs_confirmation)
+
+    @override_settings(CASHFLOW_DUPLICATE_POLICY='merge')
+    def test_form_merges_into_existing(self):
+        """Verify the merge policy updates the existing record instead."""
+        form = CashFlowForm(data=self.form_data(comment='A4 Paper'))
+        self.assertTrue(form.is_valid(), form.errors)
+        record = form.save()
+
+        self.assertEqual(record.pk, self.existing.pk)
+        self.assertEqual(CashFlowRecord.objects.count(), 1)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.status, self.personal)
+        self.assertEqual(self.existing.comment, 'A4 Paper')
+
+    def test_editing_record_is_not_a_duplicate_of_itself(self):
+        """Verify the record being edited is excluded from the lookup."""
+        form = CashFlowForm(data=self.form_data(), instance=self.existing)
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def import_csv(self, rows, on_duplicate):
+        path = os.path.join(self.jobs_root, 'records.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as target:
+            writer = csv.writer(target)
+            writer.writerow(['date', 'status', 'type', 'category', 'subcategory', 'amount', 'comment'])
+            writer.writerows(rows)
+        job = jobs.submit_job('import_records', {'path': path, 'on_duplicate': on_duplicate, 'batch_size': 2})
+        jobs.run_job(jobs.claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE, job.error)
+        with open(os.path.join(self.jobs_root, job.result_file), encoding='utf-8') as report:
+            return job, list(csv.reader(report))[1:]
+
+    def duplicate_rows(self):
+        return [
+            ['2025-04-01', 'Personal', 'Expense', 'Office', 'Paper', '12.50', 'A4 PAPER'],
+            ['2025-04-02', 'Business', 'Expense', 'Office', 'Paper', '5.00', 'Pens'],
+            ['2025-04-03', 'Business', 'Expense', 'Office', 'Paper', '7.00', ''],
+            ['2025-04-02', 'Personal', 'Expense', 'Office', 'Paper', '5.00', 'pens'],
+        ]
+
+    def test_import_skips_duplicates(self):
+        """Verify existing and in-file duplicates are skipped and reported."""
+        job, errors = self.import_csv(self.duplicate_rows(), 'skip')
+
+        self.assertEqual(CashFlowRecord.objects.count(), 3)
+        self.assertEqual(errors, [
+            ['2', f'Duplicate of record #{self.existing.pk}, skipped'],
+            ['5', 'Duplicate of line 3, skipped'],
+        ])
+        self.assertEqual(job.message, 'Imported 2 of 4 rows, 2 duplicate(s) handled by skip')
+
+    def test_import_warns_and_imports(self):
+        """Verify the warn policy imports duplicates and lists them."""
+        _, errors = self.import_csv(self.duplicate_rows(), 'warn')
+        self.assertEqual(CashFlowRecord.objects.count(), 5)
+        self.assertEqual(len(errors), 2)
+
+    def test_import_merges_duplicates(self):
+        """Verify the merge policy updates earlier records instead of inserting."""
+        self.import_csv(self.duplicate_rows(), 'merge')
+
+        self.assertEqual(CashFlowRecord.objects.count(), 3)
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.status, self.existing.comment), (self.personal, 'A4 PAPER'))
+        pens = CashFlowRecord.objects.get(date='2025-04-02')
+        self.assertEqual((pens.status, pens.comment), (self.personal, 'pens'))
@@ -0,0 +1,144 @@
+import asyncio
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from cashflow import events
+from cashflow.cache import bump_data_version
+from cashflow.events import Broker
+from cashflow.models import CashFlowRecord, Category, Status, Subcategory, Type
+
+
+class BrokerTests(TestCase):
+    """Tests for the in-process event ring buffer."""
+
+    def test_resume_from_last_event_id(self):
+        """Verify clients resume after the id they last received."""
+        broker = Broker(buffer_size=10)
+        first = broker.publish('record', {'id': 1})
+        broker.publish('record', {'id': 2})
+
+        sequence = broker.resume_point(broker.event_id(first))
+        self.assertEqual([data for _, _, data in broker.events_after(sequence)], [{'id': 2}])
+        self.assertEqual(broker.resume_point(None), broker.last)
+
+    def test_unresumable_ids(self):
+        """Verify ids of another process or beyond the buffer cannot be resumed."""
+        broker = Broker(buffer_size=2)
+        first = broker.publish('record', {'id': 1})
+        for index in range(3):
+            broker.publish('record', {'id': index})
+
+        self.assertIsNone(broker.resume_point(broker.event_id(first)))
+        self.assertIsNone(broker.resume_point(f'other-{broker.last}'))
+        self.assertIsNone(broker.resume_point('garbage'))
+
+
+class EventPublishingTests(TestCase):
+    """Tests for events published by model writes and the events endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create reference data."""
+        cls.status = Status.objects.create(name="Business")
+        cls.type = Type.objects.create(name="Expense")
+        cls.category = Category.objects.create(name="Office")
+        cls.subcategory = Subcategory.objects.create(name="Paper", category=cls.category)
+
+    def published_since(self, sequence):
+        return [(kind, data) for _, kind, data in events.broker.events_after(sequence)]
+
+    def create_record(self):
+        return CashFlowRecord.objects.create(
+            date='2025-07-01', status=self.status, type=self.type, category=self.category,
+            subcategory=self.subcategory, amount='4.20', comment='Ink',
+        )
+
+    def test_record_writes_publish_on_commit(self):
+        """Verify saves and deletes publish compact events after commit."""
+        start = events.broker.last
+        with self.captureOnCommitCallbacks(execute=True):
+            record = self.create_record()
+        record_id = record.id
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delete()
+
+        self.assertEqual(self.published_since(start), [
+            ('record', {
+                'op': 'saved', 'id': record_id, 'date': '2025-07-01', 'amount': '4.20', 'comment': 'Ink',
+                'status': [self.status.id, 'Business'], 'type': [self.type.id, 'Expense'],
+                'category': [self.category.id, 'Office'], 'subcategory': [self.subcategory.id, 'Paper'],
+            }),
+            ('record', {'op': 'deleted', 'id': record_id}),
+        ])
+
+    def test_unloaded_relations_are_not_queried(self):
+        """Verify names missing from the instance are sent as null without queries."""
+        record = CashFlowRecord.objects.get(pk=self.create_record().pk)
+        with self.assertNumQueries(0):
+            data = events.record_event(record)
+        self.assertEqual(data['status'], [self.status.id, None])
+
+    def test_reference_rename_publishes(self):
+        """Verify reference item writes publish their new name."""
+        start = events.broker.last
+        self.category.name = 'Stationery'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertEqual(self.published_since(start), [
+            ('reference', {'op': 'saved', 'model': 'category', 'id': self.category.id, 'name': 'Stationery'}),
+        ])
+
+    def poll(self, last_id=None):
+        headers = {'Last-Event-ID': last_id} if last_id else {}
+        response = self.client.get(reverse('record_events'), headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = response.content.decode()
+        ids = [line[4:] for line in body.splitlines() if line.startswith('id: ')]
+        return body, ids[-1]
+
+    def test_wsgi_polls_get_missed_events(self):
+        """Verify a first WSGI request returns an id the next poll resumes from."""
+        body, last_id = self.poll()
+        self.assertTrue(body.startswith('retry: '))
+        self.assertNotIn('event:', body)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record = self.create_record()
+        body, last_id = self.poll(last_id)
+        self.assertIn('event: record', body)
+        self.assertIn(f'"id":{record.id}', body)
+
+        body, _ = self.poll(last_id)
+        self.assertNotIn('event:', body)
+
+    def test_wsgi_polls_across_workers(self):
+        """Verify another worker's id only asks for a refresh after a write elsewhere."""
+        body, last_id = self.poll()
+        version, _, _ = last_id.partition('/')
+        other_worker_id = f'{version}/other-1'
+
+        body, _ = self.poll(other_worker_id)
+        self.assertNotIn('event:', body)
+
+        # A write in another worker bumps the shared version without a local event
+        bump_data_version()
+        body, _ = self.poll(other_worker_id)
+        self.assertIn('event: refresh', body)
+        body, _ = self.poll(last_id)
+        self.assertIn('event: refresh', body)
+
+    @override_settings(CASHFLOW_EVENTS_POLL=0.05, CASHFLOW_EVENTS_HEARTBEAT=0)
+    async def test_asgi_stream_pushes_events(self):
+        """Verify an ASGI connection stays open, receives events and heartbeats."""
+        response = await self.async_client.get(reverse('record_events'))
+        chunks = aiter(response.streaming_content)
+        try:
+            self.assertTrue((await anext(chunks)).decode().startswith('retry: '))
+            self.assertEqual(await asyncio.wait_for(anext(chunks), 2), b': ping\n\n')
+            events.broker.publish('record', {'op': 'deleted', 'id': 42})
+            message = (await asyncio.wait_for(anext(chunks), 2)).decode()
+        finally:
+            await chunks.aclose()
+        self.assertIn('event: record', message)
+        self.assertIn('"id":42', message)
@@ -0,0 +1,126 @@
+from datetime import date
+
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils.translation import activate
+
+from cashflow.forecast import fit_and_project, forecast, load_rollup, month_index
+from cashflow.models import CashFlowRecord, Category, Status, Subcategory, Type
+
+
+def create_record(day, type, category, amount):
+    """Create a record in the category's first subcategory."""
+    return CashFlowRecord.objects.create(
+        date=day,
+        status=Status.objects.get_or_create(name="Business")[0],
+        type=type,
+        category=category,
+        subcategory=category.subcategory_set.first(),
+        amount=amount,
+    )
+
+
+class ProjectionTests(TestCase):
+    """Tests for the vectorized trend and seasonal model."""
+
+    def test_linear_trend_is_extended(self):
+        """Verify a perfectly linear series is projected exactly."""
+        history = np.array([[100 + 5 * t for t in range(6)], [50.0] * 6])
+        projection = fit_and_project(history, start=0, horizon=2)
+        np.testing.assert_allclose(projection, [[130, 135], [50, 50]])
+
+    def test_seasonal_index_after_two_years(self):
+        """Verify a repeating December peak is projected once two years exist."""
+        months = 24
+        history = np.array([[200.0 if month % 12 == 11 else 100.0 for month in range(months)]])
+        projection = fit_and_project(history, start=0, horizon=12)
+        self.assertGreater(projection[0, 11], projection[0, 10] + 50)
+
+    def test_projection_is_never_negative(self):
+        """Verify a falling trend is clipped at zero."""
+        projection = fit_and_project(np.array([[30.0, 20.0, 10.0]]), start=0, horizon=3)
+        self.assertEqual(projection.min(), 0)
+
+
+class ForecastTests(TestCase):
+    """Tests for per-category forecasts and the report view."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create constant monthly income and a growing monthly expense."""
+        cls.income = Type.objects.create(name="Income")
+        cls.expense = Type.objects.create(name="Expense")
+        cls.salary = Category.objects.create(name="Salary")
+        cls.rent = Category.objects.create(name="Rent")
+        Subcategory.objects.create(name="Main job", category=cls.salary)
+        Subcategory.objects.create(name="Office", category=cls.rent)
+        for month in range(1, 7):
+            create_record(date(2025, month, 5), cls.income, cls.salary, 1000)
+            create_record(date(2025, month, 10), cls.expense, cls.rent, 100 * month)
+
+    def test_income_expense_and_net(self):
+        """Verify totals, net and running balance of the projection."""
+        result = forecast(horizon=2, today=date(2025, 7, 15))
+
+        self.assertEqual(result['history_start'], '2025-01')
+        self.assertEqual(result['months'], ['2025-07', '2025-08'])
+        self.assertEqual(result['totals']['income'], [1000.0, 1000.0])
+        self.assertEqual(result['totals']['expense'], [700.0, 800.0])
+        self.assertEqual(result['totals']['net'], [300.0, 200.0])
+        # 6000 income - 2100 expense of history, then the projected net
+        self.assertEqual(result['totals']['balance'], [4200.0, 4400.0])
+        rent = next(row for row in result['categories'] if row['category'] == "Rent")
+        self.assertEqual(rent['net'], [-700.0, -800.0])
+
+    def test_report_view(self):
+        """Verify the report renders and serves JSON."""
+        activate('en')
+        response = self.client.get(reverse('forecast_report'), {'months': '3'})
+        self.assertContains(response, 'Cash Flow Forecast')
+        self.assertEqual(len(response.context['totals']), 3)
+
+        data = self.client.get(reverse('forecast_report'), {'format': 'json'}).json()
+        self.assertEqual(len(data['months']), 6)
+
+
+class IncrementalRollupTests(TransactionTestCase):
+    """Tests for refreshing only the months touched by writes."""
+
+    def setUp(self):
+        """Create a year of history and build the cached rollup."""
+        cache.clear()
+        self.type = Type.objects.create(name="Expense")
+        self.category = Category.objects.create(name="Rent")
+        Subcategory.objects.create(name="Office", category=self.category)
+        for month in range(1, 13):
+            create_record(date(2024, month, 1), self.type, self.category, 100)
+        self.end = month_index(date(2024, 12, 1))
+        load_rollup(self.end)
+
+    def test_recent_write_reaggregates_only_its_months(self):
+        """Verify a write in the last month refreshes one month."""
+        create_record(date(2024, 12, 20), self.type, self.category, 50)
+
+        rollup = load_rollup(self.end)
+        self.assertEqual(rollup['months_aggregated'], 1)
+        self.assertEqual(rollup['matrix'][0, -1], 150)
+
+    def test_moved_record_refreshes_old_and_new_month(self):
+        """Verify editing a date refreshes from the earlier of both months."""
+        record = CashFlowRecord.objects.get(date=date(2024, 11, 1))
+        record.date = date(2024, 12, 2)
+        record.save()
+
+        rollup = load_rollup(self.end)
+        self.assertEqual(rollup['months_aggregated'], 2)
+        self.assertEqual(rollup['matrix'][0, -2:].tolist(), [0, 200])
+
+    def test_write_after_history_end_keeps_rollup(self):
+        """Verify writes in the current month do not re-aggregate history."""
+        create_record(date(2025, 1, 3), self.type, self.category, 50)
+
+        with self.assertNumQueries(0):
+            rollup = load_rollup(self.end)
+        self.assertEqual(rollup['matrix'].sum(), 1200)
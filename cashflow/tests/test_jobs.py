@@ -0,0 +1,113 @@
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from cashflow import jobs
+from cashflow.models import CashFlowRecord, Category, Job, Status, Subcategory, Type
+
+
+class JobTests(TestCase):
+    """Tests for the background job queue, handlers and endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create shared reference data and one record."""
+        cls.status = Status.objects.create(name="Business")
+        cls.type = Type.objects.create(name="Income")
+        cls.category = Category.objects.create(name="Sales")
+        cls.subcategory = Subcategory.objects.create(name="Online", category=cls.category)
+        CashFlowRecord.objects.create(
+            date="2025-01-15",
+            status=cls.status,
+            type=cls.type,
+            category=cls.category,
+            subcategory=cls.subcategory,
+            amount=250.00,
+            comment="January sale",
+        )
+
+    def setUp(self):
+        """Store job files in a throwaway directory."""
+        self.jobs_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.jobs_root, ignore_errors=True)
+        settings_override = override_settings(CASHFLOW_JOBS_ROOT=self.jobs_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def run_queue(self):
+        """Drain the queue synchronously, as the worker would."""
+        while (job_id := jobs.claim_next_job()) is not None:
+            jobs.run_job(job_id)
+
+    def test_export_job_round_trip(self):
+        """Verify an export can be submitted, polled and downloaded."""
+        response = self.client.post(reverse('submit_job', args=['export_records']))
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()['status_url']
+        self.assertEqual(self.client.get(status_url).json()['status'], Job.STATUS_QUEUED)
+
+        self.run_queue()
+
+        payload = self.client.get(status_url).json()
+        self.assertEqual(payload['status'], Job.STATUS_DONE)
+        self.assertEqual(payload['progress'], 100)
+        download = self.client.get(payload['download_url'])
+        content = b''.join(download.streaming_content).decode()
+        self.assertIn('2025-01-15,Business,Income,Sales,Online,250.00,January sale', content)
+
+    def test_export_respects_filters(self):
+        """Verify export parameters are applied as record filters."""
+        self.client.post(reverse('submit_job', args=['export_records']), {'date_min': '2025-02-01'})
+        self.run_queue()
+
+        job = Job.objects.get()
+        download = self.client.get(reverse('job_download', args=[job.id]))
+        lines = b''.join(download.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+
+    def test_import_job_creates_records(self):
+        """Verify imported rows are created and invalid rows are reported."""
+        upload = SimpleUploadedFile('records.csv', (
+            "date,status,type,category,subcategory,amount,comment\n"
+            "2025-03-01,Business,Income,Sales,Online,99.50,Imported\n"
+            "2025-03-02,Unknown,Income,Sales,Online,10.00,\n"
+        ).encode())
+        response = self.client.post(reverse('submit_job', args=['import_records']), {'file': upload})
+        self.assertEqual(response.status_code, 202)
+
+        self.run_queue()
+
+        self.assertTrue(CashFlowRecord.objects.filter(comment='Imported', amount='99.50').exists())
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(job.message, 'Imported 1 of 2 rows')
+
+    def test_unknown_job_kind(self):
+        """Verify unknown job kinds are rejected."""
+        response = self.client.post(reverse('submit_job', args=['nope']))
+        self.assertEqual(response.status_code, 400)
+
+    def test_download_before_finish(self):
+        """Verify results cannot be downloaded while a job is queued."""
+        job = jobs.submit_job('monthly_report')
+        response = self.client.get(reverse('job_download', args=[job.id]))
+        self.assertEqual(response.status_code, 409)
+
+    def test_failed_job_records_error(self):
+        """Verify handler exceptions mark the job as failed."""
+        job = jobs.submit_job('import_records', {'path': '/nonexistent.csv'})
+        with self.assertLogs('cashflow.jobs', 'ERROR'):
+            self.run_queue()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn('FileNotFoundError', job.error)
+
+    def test_job_claimed_once(self):
+        """Verify a queued job can only be claimed by one worker."""
+        job = jobs.submit_job('monthly_report')
+        self.assertEqual(jobs.claim_next_job(), job.id)
+        self.assertIsNone(jobs.claim_next_job())
@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+from datetime import date
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from cashflow.maintenance import analyze, database_stats, incremental_vacuum, object_stats, stale_tables
+from cashflow.models import CashFlowRecord, Category, Status, Subcategory, Type
+from cashflow.tenants import alias_for, create_tenant, use_tenant
+
+
+class MaintenanceTests(TransactionTestCase):
+    """Tests for statistics refresh, incremental vacuum and reports.
+
+    Runs on a tenant database file, which is created with incremental
+    auto-vacuum.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.alias = alias_for('maint')
+        # Added after validation: the alias is only registered by setUp
+        cls.databases = cls.databases | {cls.alias}
+        cls.directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.directory, ignore_errors=True)
+        cls.enterClassContext(override_settings(CASHFLOW_TENANT_DIR=cls.directory))
+
+    def setUp(self):
+        """Create the tenant and fill it with records."""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        create_tenant('maint')
+        with use_tenant('maint'):
+            category = Category.objects.create(name='Office')
+            references = {
+                'status': Status.objects.create(name='Business'),
+                'type': Type.objects.create(name='Expense'),
+                'category': category,
+                'subcategory': Subcategory.objects.create(name='Rent', category=category),
+            }
+            CashFlowRecord.objects.bulk_create([
+                CashFlowRecord(date=date(2025, 1, 1), amount=i, comment='x' * 500, **references)
+                for i in range(1, 401)
+            ])
+
+    def test_incremental_vacuum_frees_pages_in_steps(self):
+        """Verify deleted space is returned in several bounded steps."""
+        with use_tenant('maint'):
+            CashFlowRecord.objects.all().delete()
+        before = database_stats(self.alias)
+        self.assertEqual(before['auto_vacuum'], 'incremental')
+        self.assertGreater(before['freelist_count'], 10)
+
+        self.assertEqual(incremental_vacuum(self.alias, max_seconds=0)['steps'], 0)
+        result = incremental_vacuum(self.alias, pages=10, sleep=0)
+        self.assertEqual(result['freed'], before['freelist_count'])
+        self.assertGreater(result['steps'], 1)
+        after = database_stats(self.alias)
+        self.assertEqual(after['freelist_count'], 0)
+        self.assertLess(after['page_count'], before['page_count'])
+
+    def test_analyze_refreshes_only_stale_tables(self):
+        """Verify tables are analyzed once and again only after their size changes a lot."""
+        self.assertIn('cashflow_cashflowrecord', stale_tables(self.alias))
+        self.assertIn('cashflow_cashflowrecord', analyze(self.alias, analysis_limit=0)['tables'])
+        self.assertEqual(stale_tables(self.alias), [])
+
+        with use_tenant('maint'):
+            CashFlowRecord.objects.filter(amount__gt=100).delete()
+        self.assertEqual(stale_tables(self.alias), ['cashflow_cashflowrecord'])
+
+    def test_object_stats_include_index_statistics(self):
+        """Verify indexes are listed with their analyzed selectivity."""
+        analyze(self.alias, full=True, analysis_limit=0)
+        objects = {item['name']: item for item in object_stats(self.alias)}
+        self.assertEqual(objects['record_date_idx']['rows'], 400)
+        self.assertEqual(objects['record_date_idx']['rows_per_key'], 400)
+        self.assertEqual(objects['cashflow_cashflowrecord']['type'], 'table')
+
+    def test_command_maintains_tenants(self):
+        """Verify the command reports each database it maintained."""
+        output = StringIO()
+        call_command('maintain_db', '--all-tenants', '--sleep', '0', stdout=output)
+        self.assertIn('Database default', output.getvalue())
+        self.assertIn(f'Database {self.alias}', output.getvalue())
+        self.assertIn('record_date_idx', output.getvalue())
@@ -1,5 +1,16 @@
-from django.test import TestCase
-from django.urls import reverse
+import shutil
+import tempfile
+from io import StringIO
+
+from django.db import connection
+from django.core.management import CommandError, call_command
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import URLPattern, reverse
+
+from cashflow import jobs, urls
+from cashflow.management.commands.loadtest import LOADTEST_MARKER, percentile
+from cashflow.models import CashFlowRecord, Category, Status, Subcategory, Type
+from cashflow.querybudget import QueryBudgetExceeded, QueryCollector, query_shape
 
 
 class PerformanceTests(TestCase):
@@ -11,4 +22,254 @@ class PerformanceTests(TestCase):
         
         with self.assertNumQueries(expected_query_count):
             response = self.client.get(reverse('record_list'))
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(
+    CASHFLOW_QUERY_BUDGETS_ENABLED=True,
+    CASHFLOW_QUERY_BUDGET_RAISE=True,
+)
+class QueryBudgetTests(TransactionTestCase):
+    """Tests that every view stays within its declared query budget on seeded data.
+
+    Views run in autocommit like in production, so the budgets account for
+    the transactions they open themselves.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        jobs_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, jobs_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(CASHFLOW_JOBS_ROOT=jobs_root))
+
+    def setUp(self):
+        """Seed several reference rows and records so N+1 patterns would show."""
+        self.statuses = [Status.objects.create(name=f"Status {i}") for i in range(3)]
+        self.types = [Type.objects.create(name=f"Type {i}") for i in range(2)]
+        self.categories = [Category.objects.create(name=f"Category {i}") for i in range(4)]
+        self.subcategories = [
+            Subcategory.objects.create(name=f"Subcategory {i}", category=self.categories[i % 4])
+            for i in range(8)
+        ]
+        self.records = [
+            CashFlowRecord.objects.create(
+                date=f"2025-01-{i + 1:02d}",
+                status=self.statuses[i % 3],
+                type=self.types[i % 2],
+                category=self.subcategories[i % 8].category,
+                subcategory=self.subcategories[i % 8],
+                amount=10 + i,
+            )
+            for i in range(20)
+        ]
+
+    def record_data(self, **overrides):
+        """Return valid add/edit form data."""
+        return {
+            'date': '2025-02-01',
+            'amount': '42.00',
+            'status': self.statuses[0].id,
+            'type': self.types[0].id,
+            'category': self.categories[0].id,
+            'subcategory': self.subcategories[0].id,
+            **overrides,
+        }
+
+    def test_every_view_declares_budget(self):
+        """Verify each cashflow URL resolves to a view with a query budget."""
+        for pattern in urls.urlpatterns:
+            if isinstance(pattern, URLPattern):
+                with self.subTest(view=pattern.name):
+                    self.assertIsNotNone(getattr(pattern.callback, 'query_budget', None))
+
+    def test_record_list_within_budget(self):
+        """Verify listing stays within budget with and without every filter."""
+        self.assertEqual(self.client.get(reverse('record_list')).status_code, 200)
+        response = self.client.get(reverse('record_list'), {
+            'status': self.statuses[0].id,
+            'type': self.types[0].id,
+            'category': self.categories[0].id,
+            'subcategory': self.subcategories[0].id,
+            'date_min': '2025-01-01',
+        })
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('record_list'), {
+            'status': [status.id for status in self.statuses],
+            'category': [self.categories[0].id, self.categories[1].id],
+            'amount_min': '12',
+            'amount_max': '25',
+            'has_comment': 'false',
+        })
+        self.assertEqual(response.status_code, 200)
+        streamed = self.client.get(reverse('record_list'), {'stream': '1'})
+        self.assertTrue(b''.join(streamed.streaming_content))
+
+    def test_add_record_within_budget(self):
+        """Verify the add form, invalid and valid submissions stay within budget."""
+        self.assertEqual(self.client.get(reverse('add_record')).status_code, 200)
+        invalid = self.client.post(reverse('add_record'), self.record_data(amount='-1'))
+        self.assertEqual(invalid.status_code, 200)
+        self.assertEqual(self.client.post(reverse('add_record'), self.record_data()).status_code, 302)
+
+    def test_edit_record_within_budget(self):
+        """Verify the edit form, invalid and valid submissions stay within budget."""
+        url = reverse('edit_record', args=[self.records[0].id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.post(url, self.record_data(amount='-1')).status_code, 200)
+        self.assertEqual(self.client.post(url, self.record_data()).status_code, 302)
+        response = self.client.patch(
+            reverse('patch_record', args=[self.records[0].id]), {'amount': '7.00'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_ajax_views_within_budget(self):
+        """Verify delete, lookup and quick-add endpoints stay within budget."""
+        self.assertEqual(self.client.post(reverse('delete_record', args=[self.records[1].id])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('get_categories')).status_code, 200)
+        references_url = self.client.get(reverse('add_record')).context['references_url']
+        self.assertEqual(self.client.get(references_url).status_code, 200)
+        response = self.client.get(reverse('get_subcategories'), {'category_id': self.categories[0].id})
+        self.assertEqual(response.status_code, 200)
+        for name in ('quick_add_status', 'quick_add_type', 'quick_add_category'):
+            self.assertEqual(self.client.post(reverse(name), {'name': 'New'}).status_code, 200)
+        response = self.client.post(
+            reverse('quick_add_subcategory'), {'name': 'New sub', 'category_id': self.categories[0].id}
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            reverse('bulk_upsert_references'),
+            {'statuses': ['New'], 'types': ['New'], 'categories': [{'name': 'Bulk', 'subcategories': ['A', 'B']}]},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('record_events')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_job_views_within_budget(self):
+        """Verify job submission, status and download stay within budget."""
+        response = self.client.post(reverse('submit_job', args=['monthly_report']))
+        job_id = response.json()['id']
+        jobs.run_job(jobs.claim_next_job())
+        self.assertEqual(self.client.get(reverse('job_status', args=[job_id])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('job_download', args=[job_id])).status_code, 200)
+
+    def test_analytics_within_budget(self):
+        """Verify the analytics endpoint stays within budget with every filter."""
+        self.assertEqual(self.client.get(reverse('record_analytics')).status_code, 200)
+        response = self.client.get(reverse('record_analytics'), {
+            'status': self.statuses[0].id,
+            'type': self.types[0].id,
+            'category': self.categories[0].id,
+            'subcategory': self.subcategories[0].id,
+            'window': '3',
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_forecast_within_budget(self):
+        """Verify the forecast report stays within budget."""
+        self.assertEqual(self.client.get(reverse('forecast_report')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('forecast_report'), {'format': 'json'}).status_code, 200)
+
+    @override_settings(CASHFLOW_QUERY_BUDGETS={'record_list': 1})
+    def test_exceeding_budget_fails(self):
+        """Verify a request over its budget raises in test mode."""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('record_list'))
+
+
+class QueryCollectorTests(TestCase):
+    """Tests for structural query comparison and N+1 detection."""
+
+    def test_repeated_queries_detected(self):
+        """Verify identical query shapes are grouped and reported past the threshold."""
+        category = Category.objects.create(name="Food")
+        subcategories = [Subcategory.objects.create(name=f"Sub {i}", category=category) for i in range(4)]
+        collector = QueryCollector(threshold=3)
+        with connection.execute_wrapper(collector):
+            for subcategory in Subcategory.objects.filter(pk__in=[s.pk for s in subcategories]):
+                subcategory.category.name
+
+        repeated = collector.repeated()
+        self.assertEqual(list(repeated.values()), [4])
+        self.assertIn('test_performance.py', next(iter(collector.stacks.values())))
+
+    def test_transaction_statements_not_counted(self):
+        """Verify BEGIN and savepoint statements do not count against a budget."""
+        def execute(sql, params, many, context):
+            return None
+
+        collector = QueryCollector(threshold=3)
+        for sql in ('BEGIN', 'SAVEPOINT "s1"', 'RELEASE SAVEPOINT "s1"', 'ROLLBACK TO SAVEPOINT "s1"'):
+            collector(execute, sql, None, False, {})
+        collector(execute, 'DELETE FROM cashflow_cashflowrecord WHERE id = %s', [1], False, {})
+        self.assertEqual(collector.count, 1)
+
+    def test_in_lists_share_shape(self):
+        """Verify IN lists of different lengths normalize to the same shape."""
+        self.assertEqual(
+            query_shape('SELECT 1 WHERE id IN (%s, %s)'),
+            query_shape('SELECT 1 WHERE id IN (%s, %s, %s, %s)'),
+        )
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    """Tests for the loadtest management command."""
+
+    def setUp(self):
+        """Create the reference rows the workload picks from."""
+        category = Category.objects.create(name="Category")
+        Subcategory.objects.create(name="Subcategory", category=category)
+        Status.objects.create(name="Status")
+        Type.objects.create(name="Type")
+
+    def test_percentile_uses_nearest_rank(self):
+        """Percentiles pick an observed value without interpolation."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.50), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.9), 7)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    @override_settings(CASHFLOW_THROTTLE_RATES={'write': '1/h', 'ajax': '1/h'})
+    def test_in_process_run_reports_and_cleans_up(self):
+        """A short in-process run prints a report and removes its records."""
+        output = StringIO()
+        call_command(
+            'loadtest', duration=0.5, concurrency=1, seed_records=5,
+            mix='list=1,add=1,delete=1', stdout=output,
+        )
+        report = output.getvalue()
+        self.assertIn('total', report)
+        self.assertIn('SQLite lock errors', report)
+        self.assertNotIn('HTTP 429', report)
+        self.assertFalse(CashFlowRecord.objects.filter(comment=LOADTEST_MARKER).exists())
+
+
+@override_settings(CASHFLOW_THROTTLE=False)
+class RemoteLoadTestCommandTests(LiveServerTestCase):
+    """Tests for load testing a running server with ``--url``."""
+
+    def setUp(self):
+        """Create the reference rows the workload picks from."""
+        category = Category.objects.create(name="Category")
+        Subcategory.objects.create(name="Subcategory", category=category)
+        Status.objects.create(name="Status")
+        Type.objects.create(name="Type")
+
+    def test_remote_run_uses_server_references_only(self):
+        """A remote run reads references over HTTP and seeds nothing locally."""
+        output = StringIO()
+        call_command(
+            'loadtest', url=self.live_server_url, duration=0.3, concurrency=1,
+            mix='list=1,subcategories=1', stdout=output,
+        )
+        self.assertIn('total', output.getvalue())
+        self.assertNotIn('HTTP', output.getvalue())
+        self.assertNotIn('Removed', output.getvalue())
+        self.assertFalse(CashFlowRecord.objects.exists())
+
+    def test_remote_run_refuses_deletes(self):
+        """Deletes need locally seeded records, so ``--url`` rejects them."""
+        with self.assertRaisesMessage(CommandError, 'cannot run deletes'):
+            call_command('loadtest', url=self.live_server_url, mix='list=1,delete=1', stdout=StringIO())
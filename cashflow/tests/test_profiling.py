@@ -0,0 +1,126 @@
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from cashflow.profiling import list_profiles
+from cashflow.tenants import alias_for, create_tenant
+
+
+class ProfilingTests(TestCase):
+    """Tests for the opt-in request profiler and slow-query capture."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a staff and a regular user."""
+        cls.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        cls.user = User.objects.create_user('user', password='pw')
+
+    def setUp(self):
+        """Write profiles to a throwaway directory and log every query as slow."""
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+        settings_override = override_settings(CASHFLOW_PROFILE_DIR=self.profile_dir, CASHFLOW_SLOW_QUERY_MS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_staff_request_is_profiled(self):
+        """Verify a staff request with the header saves a profile and query plans."""
+        self.client.force_login(self.staff)
+        with self.assertLogs('cashflow.profiling', 'WARNING'):
+            response = self.client.get(reverse('record_list'), HTTP_X_CASHFLOW_PROFILE='1')
+
+        profiles = list_profiles()
+        self.assertEqual(len(profiles), 1)
+        profile = profiles[0]
+        self.assertEqual(response['X-Profile-Id'], profile['id'])
+        self.assertEqual(profile['view'], 'record_list')
+        self.assertGreater(profile['query_count'], 0)
+        record_query = next(q for q in profile['slow_queries'] if 'cashflow_cashflowrecord' in q['sql'])
+        self.assertTrue(record_query['plan'])
+        self.assertTrue(any('views.py' in frame for frame in record_query['stack']))
+
+    def test_streamed_response_is_profiled(self):
+        """Verify queries of a streamed body are recorded and saved once it is consumed."""
+        self.client.force_login(self.staff)
+        with self.assertLogs('cashflow.profiling', 'WARNING'):
+            response = self.client.get(reverse('record_list'), {'stream': '1', '_profile': '1'})
+            self.assertEqual(list_profiles(), [])
+            b''.join(response.streaming_content)
+
+        profile = list_profiles()[0]
+        self.assertEqual(response['X-Profile-Id'], profile['id'])
+        self.assertTrue(any('cashflow_cashflowrecord' in query['sql'] for query in profile['slow_queries']))
+
+    def test_query_parameter_trigger(self):
+        """Verify the _profile query parameter also enables profiling."""
+        self.client.force_login(self.staff)
+        with self.assertLogs('cashflow.profiling', 'WARNING'):
+            response = self.client.get(reverse('record_list'), {'_profile': '1'})
+        self.assertTrue(response.has_header('X-Profile-Id'))
+
+    def test_non_staff_not_profiled(self):
+        """Verify regular users cannot trigger profiling."""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('record_list'), HTTP_X_CASHFLOW_PROFILE='1')
+
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertEqual(list_profiles(), [])
+
+    def test_list_profiles_command(self):
+        """Verify saved profiles are listed and shown by the management command."""
+        self.client.force_login(self.staff)
+        with self.assertLogs('cashflow.profiling', 'WARNING'):
+            profile_id = self.client.get(reverse('record_list'), HTTP_X_CASHFLOW_PROFILE='1')['X-Profile-Id']
+
+        output = io.StringIO()
+        call_command('list_profiles', stdout=output)
+        self.assertIn(profile_id, output.getvalue())
+
+        output = io.StringIO()
+        call_command('list_profiles', profile_id, stdout=output)
+        self.assertIn('plan:', output.getvalue())
+        self.assertIn('cumulative', output.getvalue())
+
+
+class TenantProfilingTests(TransactionTestCase):
+    """Tests for profiling requests served from a tenant database."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after validation: the alias is only registered by setUp
+        cls.databases = cls.databases | {alias_for('acme')}
+        cls.directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.directory, ignore_errors=True)
+        cls.enterClassContext(override_settings(
+            CASHFLOW_TENANT_DIR=cls.directory,
+            CASHFLOW_PROFILE_DIR=cls.directory,
+            CASHFLOW_SLOW_QUERY_MS=0,
+        ))
+
+    def setUp(self):
+        """Create tenant ``acme`` and log in a staff user."""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        create_tenant('acme')
+        self.client.force_login(User.objects.create_user('staff', password='pw', is_staff=True))
+
+    def test_streamed_tenant_queries_are_recorded(self):
+        """Verify queries on the tenant database while streaming end up in the profile."""
+        with self.assertLogs('cashflow.profiling', 'WARNING'):
+            response = self.client.get(
+                reverse('record_list'), {'stream': '1'},
+                headers={'X-Cashflow-Tenant': 'acme', 'X-Cashflow-Profile': '1'},
+            )
+            self.assertEqual(list_profiles(), [])
+            b''.join(response.streaming_content)
+
+        profile = list_profiles()[0]
+        self.assertEqual(response['X-Profile-Id'], profile['id'])
+        self.assertTrue(any('cashflow_cashflowrecord' in query['sql'] for query in profile['slow_queries']))
@@ -0,0 +1,73 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from cashflow.models import CashFlowRecord, Category, RecurringTemplate, Status, Subcategory, Type
+from cashflow.recurring import add_months, materialize, occurrences
+
+
+class RecurringTests(TestCase):
+    """Tests for recurring templates and their materialization."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a monthly rent template starting on the 31st."""
+        category = Category.objects.create(name="Rent")
+        cls.template = RecurringTemplate.objects.create(
+            name="Office rent",
+            start_date=date(2025, 1, 31),
+            status=Status.objects.create(name="Business"),
+            type=Type.objects.create(name="Expense"),
+            category=category,
+            subcategory=Subcategory.objects.create(name="Office", category=category),
+            amount=1000,
+        )
+
+    def test_monthly_dates_clamp_to_month_end(self):
+        """Verify day 31 falls on the last day of shorter months."""
+        dates = list(occurrences(self.template, date(2025, 4, 30)))
+        self.assertEqual(dates, [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)])
+        self.assertEqual(add_months(date(2024, 1, 31), 1), date(2024, 2, 29))
+
+    def test_weekly_interval_and_end_date(self):
+        """Verify intervals and the end date bound the schedule."""
+        self.template.frequency = RecurringTemplate.FREQUENCY_WEEKLY
+        self.template.interval = 2
+        self.template.end_date = date(2025, 3, 1)
+        dates = list(occurrences(self.template, date(2025, 12, 31)))
+        self.assertEqual(dates, [date(2025, 1, 31), date(2025, 2, 14), date(2025, 2, 28)])
+
+    def test_materialize_is_idempotent(self):
+        """Verify re-runs and overlapping runs never duplicate occurrences."""
+        self.assertEqual(materialize(date(2025, 6, 30))['created'], 6)
+        self.assertEqual(materialize(date(2025, 6, 30))['created'], 0)
+
+        # Forget progress so the next run regenerates the same keys
+        RecurringTemplate.objects.update(materialized_until=None)
+        summary = materialize(date(2025, 12, 31))
+        self.assertEqual((summary['due'], summary['created']), (12, 6))
+        self.assertEqual(CashFlowRecord.objects.count(), 12)
+
+    def test_year_of_templates_in_one_batch(self):
+        """Verify many templates are written in batches, not per template."""
+        for index in range(20):
+            self.template.pk = None
+            self.template.name = f"Template {index}"
+            self.template.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            summary = materialize(date(2025, 12, 31), batch_size=1000)
+        self.assertEqual(summary['created'], 21 * 12)
+        self.assertLess(len(queries), 21)
+        self.assertEqual(sum('SAVEPOINT' in query['sql'] and 'RELEASE' not in query['sql'] for query in queries), 1)
+
+    def test_command_dry_run(self):
+        """Verify the dry run reports due occurrences without writing."""
+        output = StringIO()
+        call_command('materialize_recurring', until='2025-03-31', dry_run=True, stdout=output)
+        self.assertIn('3 occurrence(s) due', output.getvalue())
+        self.assertFalse(CashFlowRecord.objects.exists())
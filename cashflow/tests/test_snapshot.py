@@ -0,0 +1,147 @@
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import activate
+
+from cashflow.analytics import analyze
+from cashflow.models import CashFlowRecord, Category, Status, Subcategory, Type
+from cashflow.snapshot import load_snapshot, read_manifest, refresh_snapshot, snapshot_dir
+
+
+class SnapshotTests(TestCase):
+    """Tests for the memory-mapped columnar record snapshot."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create records in two categories, written an hour ago."""
+        cls.status = Status.objects.create(name='Business')
+        cls.type = Type.objects.create(name='Expense')
+        cls.rent = Category.objects.create(name='Rent')
+        cls.food = Category.objects.create(name='Food')
+        cls.office = Subcategory.objects.create(name='Office', category=cls.rent)
+        cls.lunch = Subcategory.objects.create(name='Lunch', category=cls.food)
+        CashFlowRecord.objects.bulk_create([
+            CashFlowRecord(
+                date=date(2025, 1, day), status=cls.status, type=cls.type, category=cls.food,
+                subcategory=cls.lunch, amount=amount, comment='team' if day == 2 else '',
+            )
+            for day, amount in enumerate(['10.50', '12.00', '11.25', '9.99', '500.00'], start=1)
+        ])
+        CashFlowRecord.objects.create(
+            date=date(2025, 1, 3), status=cls.status, type=cls.type,
+            category=cls.rent, subcategory=cls.office, amount='1000.00',
+        )
+        # Older than the watermark overlap, so refreshes only read real changes
+        CashFlowRecord.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.enterContext(self.settings(CASHFLOW_SNAPSHOT_DIR=directory))
+
+    def test_columns_match_records(self):
+        """Verify each column holds the records in compact types, memory-mapped."""
+        result = refresh_snapshot()
+        snapshot = load_snapshot()
+        records = list(CashFlowRecord.objects.order_by('id'))
+
+        self.assertTrue(result['full'])
+        self.assertEqual(result['rows'], 6)
+        self.assertIsInstance(snapshot.columns['amounts'], np.memmap)
+        self.assertEqual(snapshot.columns['ids'].tolist(), [record.id for record in records])
+        self.assertEqual(snapshot.columns['amounts'].dtype, np.int64)
+        self.assertEqual(snapshot.columns['amounts'].tolist(), [int(record.amount * 100) for record in records])
+        self.assertEqual(snapshot.columns['dates'].dtype, np.int32)
+        self.assertEqual(
+            snapshot.columns['dates'].tolist(),
+            [(record.date - date(1970, 1, 1)).days for record in records],
+        )
+        self.assertEqual(snapshot.columns['category'].dtype, np.int32)
+        self.assertEqual(snapshot.columns['has_comment'].tolist(), [bool(record.comment) for record in records])
+        self.assertEqual(snapshot.dictionaries['category'], {self.rent.id: 'Rent', self.food.id: 'Food'})
+
+    def test_incremental_refresh_reads_only_changes(self):
+        """Verify an edit, an insert and a delete are applied without rereading everything."""
+        refresh_snapshot()
+        edited = CashFlowRecord.objects.get(amount='12.00')
+        edited.amount = '13.00'
+        edited.save()
+        CashFlowRecord.objects.get(amount='9.99').delete()
+        added = CashFlowRecord.objects.create(
+            date=date(2025, 2, 1), status=self.status, type=self.type,
+            category=self.rent, subcategory=self.office, amount='1000.00',
+        )
+
+        result = refresh_snapshot()
+        incremental = {name: np.array(values) for name, values in load_snapshot().columns.items()}
+        refresh_snapshot(full=True)
+        rebuilt = load_snapshot().columns
+
+        self.assertFalse(result['full'])
+        self.assertEqual(result['read'], 2)
+        self.assertEqual(result['deleted'], 1)
+        self.assertEqual(result['rows'], 6)
+        self.assertEqual(incremental['ids'][-1], added.id)
+        for name, values in rebuilt.items():
+            np.testing.assert_array_equal(incremental[name], values, err_msg=name)
+
+    def test_endpoint_uses_snapshot_without_queries(self):
+        """Verify ``source=snapshot`` matches the database analysis and runs no query."""
+        activate('en')
+        url = reverse('record_analytics')
+        self.assertEqual(self.client.get(url, {'source': 'snapshot'}).status_code, 404)
+
+        refresh_snapshot()
+        params = {'category': [self.food.id], 'date_min': '2025-01-02', 'amount_max': '600'}
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {**params, 'source': 'snapshot'})
+        result = response.json()
+        expected = analyze(CashFlowRecord.objects.filter(
+            category=self.food, date__gte=date(2025, 1, 2), amount__lte=600,
+        ))
+
+        self.assertEqual(result.pop('snapshot')['rows'], 6)
+        self.assertEqual(result, expected)
+        commented = self.client.get(url, {'source': 'snapshot', 'has_comment': 'true'}).json()
+        self.assertEqual(commented['overall']['total'], 12.0)
+        self.assertEqual(self.client.get(url, {'source': 'snapshot', 'date_min': 'soon'}).status_code, 400)
+        for amount in ('inf', 'NaN', 'lots'):
+            response = self.client.get(url, {'source': 'snapshot', 'amount_min': amount})
+            self.assertEqual(response.status_code, 400, amount)
+
+    def test_previous_generation_is_kept_for_readers(self):
+        """Verify a refresh keeps the generation it replaces and a reader racing it retries."""
+        directory = snapshot_dir()
+        refresh_snapshot()
+        first = read_manifest(directory)
+        refresh_snapshot()
+        second = read_manifest(directory)
+        self.assertTrue(os.path.isdir(os.path.join(directory, first['generation'])))
+
+        refresh_snapshot()
+        self.assertFalse(os.path.isdir(os.path.join(directory, first['generation'])))
+        self.assertTrue(os.path.isdir(os.path.join(directory, second['generation'])))
+
+        # A manifest read just before the refresh names a removed generation
+        with mock.patch('cashflow.snapshot.read_manifest', side_effect=[first, read_manifest(directory)]):
+            snapshot = load_snapshot(directory)
+        self.assertEqual(len(snapshot), 6)
+
+    def test_command_refreshes_snapshot(self):
+        """Verify the management command builds and then refreshes the snapshot."""
+        output = StringIO()
+        call_command('snapshot_records', stdout=output)
+        call_command('snapshot_records', stdout=output)
+
+        self.assertIn('Built', output.getvalue())
+        self.assertIn('Refreshed', output.getvalue())
+        self.assertIn('(0 read, 0 deleted)', output.getvalue())
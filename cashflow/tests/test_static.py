@@ -0,0 +1,71 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.templatetags.static import static
+
+
+class StaticPipelineTests(TestCase):
+    """Tests for fingerprinted, precompressed static asset serving."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Collect static files once into a temporary STATIC_ROOT."""
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(STATIC_ROOT=cls.static_root)
+        cls.settings_override.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the collected files."""
+        cls.settings_override.disable()
+        shutil.rmtree(cls.static_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_assets_are_fingerprinted(self):
+        """Verify the static tag resolves to a hashed file name."""
+        url = static('js/cashflow/form.js')
+        self.assertRegex(url, r'form\.[0-9a-f]{12}\.js$')
+
+    def test_gzip_variant_written(self):
+        """Verify collectstatic writes a gzip variant matching the asset."""
+        name = staticfiles_storage.stored_name('js/cashflow/form.js')
+        path = os.path.join(self.static_root, name)
+        with open(path, 'rb') as original, open(path + '.gz', 'rb') as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), original.read())
+
+    def test_hashed_asset_served_immutable_and_compressed(self):
+        """Verify hashed assets are served gzip-encoded with immutable caching."""
+        response = self.client.get(static('js/cashflow/form.js'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('javascript', response['Content-Type'])
+
+    def test_identity_when_compression_not_accepted(self):
+        """Verify clients without gzip support get the original bytes."""
+        response = self.client.get(static('js/cashflow/form.js'), HTTP_ACCEPT_ENCODING='gzip;q=0')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn(b'initCashFlowForm', b''.join(response.streaming_content))
+
+    def test_unhashed_asset_revalidates(self):
+        """Verify unhashed names must revalidate and honour If-None-Match."""
+        response = self.client.get('/static/js/cashflow/form.js')
+        self.assertIn('must-revalidate', response['Cache-Control'])
+
+        response = self.client.get('/static/js/cashflow/form.js', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_path_traversal_rejected(self):
+        """Verify paths outside STATIC_ROOT are not served."""
+        response = self.client.get('/static/../manage.py')
+        self.assertEqual(response.status_code, 404)
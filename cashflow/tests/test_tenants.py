@@ -0,0 +1,153 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import date
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from cashflow.cache import make_key
+from cashflow.models import CashFlowRecord, Category, Status, Subcategory, Tenant, Type
+from cashflow.tenants import TenantRouter, alias_for, db_alias, use_tenant
+
+
+def create_record(comment='Rent'):
+    """Create a record with fresh reference items in the active database."""
+    category = Category.objects.create(name='Office')
+    return CashFlowRecord.objects.create(
+        date=date(2025, 1, 15),
+        status=Status.objects.create(name='Business'),
+        type=Type.objects.create(name='Expense'),
+        category=category,
+        subcategory=Subcategory.objects.create(name='Rent', category=category),
+        amount='100.00',
+        comment=comment,
+    )
+
+
+class TenantTests(TransactionTestCase):
+    """Tests for per-tenant ledger databases.
+
+    Tenant files live in a temporary directory; the ``acme`` tenant
+    database is flushed after every test like the default one.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after validation: the alias is only registered by setUp
+        cls.databases = cls.databases | {alias_for('acme')}
+        cls.directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.directory, ignore_errors=True)
+        cls.enterClassContext(override_settings(CASHFLOW_TENANT_DIR=cls.directory))
+
+    def setUp(self):
+        """Create tenant ``acme``."""
+        cache.clear()
+        call_command('tenants', 'create', 'acme', '--name', 'ACME', stdout=StringIO())
+        self.addCleanup(cache.clear)
+
+    def tenant_rows(self, slug, table='cashflow_cashflowrecord'):
+        with sqlite3.connect(Tenant.objects.get(slug=slug).database) as db:
+            return db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def test_create_migrates_only_ledger_tables(self):
+        """Verify a new tenant file holds the ledger tables but not the registry or jobs."""
+        tenant = Tenant.objects.get(slug='acme')
+        self.assertEqual(tenant.database, os.path.join(self.directory, 'acme.sqlite3'))
+        with sqlite3.connect(tenant.database) as db:
+            tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertIn('cashflow_cashflowrecord', tables)
+        self.assertIn('cashflow_status', tables)
+        self.assertNotIn('cashflow_tenant', tables)
+        self.assertNotIn('cashflow_job', tables)
+        self.assertNotIn('auth_user', tables)
+
+    def test_writes_are_isolated_per_tenant(self):
+        """Verify records written for a tenant never reach the default database."""
+        with use_tenant('acme'):
+            self.assertEqual(db_alias(), alias_for('acme'))
+            create_record()
+            self.assertEqual(CashFlowRecord.objects.count(), 1)
+        self.assertEqual(CashFlowRecord.objects.count(), 0)
+        self.assertEqual(Status.objects.count(), 0)
+        self.assertEqual(self.tenant_rows('acme'), 1)
+
+    def test_cache_keys_are_prefixed_with_tenant(self):
+        """Verify each tenant has its own cache namespace."""
+        default_key = make_key('data-version')
+        with use_tenant('acme'):
+            self.assertEqual(make_key('data-version'), 'cashflow:tenant:acme:data-version')
+        self.assertEqual(default_key, 'cashflow:data-version')
+
+    def test_router_keeps_shared_models_in_default(self):
+        """Verify only ledger models migrate to and route to tenant databases."""
+        router = TenantRouter()
+        self.assertTrue(router.allow_migrate('tenant_acme', 'cashflow', 'cashflowrecord'))
+        self.assertFalse(router.allow_migrate('tenant_acme', 'cashflow', 'job'))
+        self.assertFalse(router.allow_migrate('tenant_acme', 'auth', 'user'))
+        self.assertIsNone(router.allow_migrate('default', 'cashflow', 'tenant'))
+        with use_tenant('acme'):
+            self.assertEqual(router.db_for_write(CashFlowRecord), 'tenant_acme')
+            self.assertIsNone(router.db_for_write(Tenant))
+
+    def test_header_selects_tenant(self):
+        """Verify requests naming a tenant list and add records in its database."""
+        with use_tenant('acme'):
+            record = create_record()
+        response = self.client.get(reverse('record_list'), headers={'X-Cashflow-Tenant': 'acme'})
+        self.assertContains(response, f'data-record-id="{record.pk}"')
+        self.assertNotContains(self.client.get(reverse('record_list')), f'data-record-id="{record.pk}"')
+
+        response = self.client.post(
+            reverse('add_record'),
+            {
+                'date': '2025-02-01', 'status': record.status_id, 'type': record.type_id,
+                'category': record.category_id, 'subcategory': record.subcategory_id,
+                'amount': '50.00', 'comment': 'Paper',
+            },
+            headers={'X-Cashflow-Tenant': 'acme'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.tenant_rows('acme'), 2)
+        self.assertEqual(CashFlowRecord.objects.count(), 0)
+
+    def test_unknown_tenant_is_not_found(self):
+        """Verify an unregistered tenant slug is rejected."""
+        self.client.cookies['cashflow_tenant'] = 'missing'
+        self.assertEqual(self.client.get(reverse('record_list')).status_code, 404)
+
+    def test_deleted_tenant_leaves_registry(self):
+        """Verify deleting a tenant outside ``manage.py tenants`` (the admin) takes effect at once."""
+        headers = {'X-Cashflow-Tenant': 'acme'}
+        self.assertEqual(self.client.get(reverse('record_list'), headers=headers).status_code, 200)
+        Tenant.objects.get(slug='acme').delete()
+        self.assertEqual(self.client.get(reverse('record_list'), headers=headers).status_code, 404)
+
+    def test_move_copies_database_and_updates_registry(self):
+        """Verify a moved tenant keeps its data at the new path."""
+        with use_tenant('acme'):
+            create_record()
+        old_path = Tenant.objects.get(slug='acme').database
+        destination = os.path.join(self.directory, 'moved', 'acme.sqlite3')
+        call_command('tenants', 'move', 'acme', destination, stdout=StringIO())
+
+        self.assertEqual(Tenant.objects.get(slug='acme').database, destination)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(f'{old_path}.moved'))
+        with use_tenant('acme'):
+            self.assertEqual(CashFlowRecord.objects.count(), 1)
+            self.assertEqual(connections[db_alias()].settings_dict['NAME'], destination)
+
+    def test_command_rejects_unknown_and_duplicate_tenants(self):
+        """Verify the command reports bad slugs as errors."""
+        with self.assertRaises(CommandError):
+            call_command('tenants', 'migrate', 'missing')
+        with self.assertRaises(CommandError):
+            call_command('tenants', 'create', 'acme', stdout=StringIO())
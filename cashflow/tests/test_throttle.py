@@ -0,0 +1,104 @@
+import threading
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from cashflow import metrics
+from cashflow.models import Status
+from cashflow.throttle import client_id, parse_rate, take_token
+from cashflow.writequeue import run_write
+
+
+class TokenBucketTests(TestCase):
+    """Tests for rate parsing and the cache-backed token bucket."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        """Verify rates are read as capacity and refill per second."""
+        self.assertEqual(parse_rate('60/min'), (60, 1.0))
+        self.assertEqual(parse_rate('10/s'), (10, 10.0))
+        self.assertIsNone(parse_rate(''))
+        with self.assertRaises(ValueError):
+            parse_rate('10/fortnight')
+
+    def test_bucket_refills_over_time(self):
+        """Verify an empty bucket reports the wait until its next token."""
+        rate = parse_rate('2/s')
+        self.assertEqual(take_token('bucket', rate, now=100.0), 0)
+        self.assertEqual(take_token('bucket', rate, now=100.0), 0)
+        self.assertAlmostEqual(take_token('bucket', rate, now=100.0), 0.5)
+        self.assertEqual(take_token('bucket', rate, now=100.5), 0)
+
+    @override_settings(CASHFLOW_THROTTLE_CLIENT_HEADER='X-Forwarded-For', CASHFLOW_THROTTLE_TRUSTED_PROXIES=1)
+    def test_client_id_ignores_client_supplied_entries(self):
+        """Verify the address is the entry appended by the trusted proxy, not the client's."""
+        factory = RequestFactory()
+        spoofed = factory.get('/', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(client_id(spoofed), '203.0.113.7')
+        with self.settings(CASHFLOW_THROTTLE_TRUSTED_PROXIES=2):
+            chained = factory.get('/', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7, 10.0.0.3')
+            self.assertEqual(client_id(chained), '203.0.113.7')
+        self.assertEqual(client_id(factory.get('/', REMOTE_ADDR='10.0.0.2')), '10.0.0.2')
+
+
+@override_settings(CASHFLOW_THROTTLE_RATES={'write': '2/min', 'ajax': ''})
+class ThrottledViewTests(TestCase):
+    """Tests for throttled and load-shedding views."""
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def quick_add(self, name, address='10.0.0.1'):
+        return self.client.post(reverse('quick_add_status'), {'name': name}, REMOTE_ADDR=address)
+
+    def test_client_over_rate_gets_429(self):
+        """Verify a client beyond its rate is rejected without affecting others."""
+        self.assertEqual(self.quick_add('A').status_code, 200)
+        self.assertEqual(self.quick_add('B').status_code, 200)
+
+        response = self.quick_add('C')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertFalse(Status.objects.filter(name='C').exists())
+        self.assertEqual(self.quick_add('C', address='10.0.0.2').status_code, 200)
+
+        counters = metrics.snapshot()
+        self.assertEqual(counters['throttle.rejected'], 1)
+        self.assertEqual(counters['throttle.rejected.write'], 1)
+
+    def test_buckets_are_per_view(self):
+        """Verify exhausting one endpoint leaves the others available."""
+        self.quick_add('A')
+        self.quick_add('B')
+        response = self.client.post(reverse('quick_add_type'), {'name': 'Income'}, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+
+    def test_form_pages_only_throttle_submissions(self):
+        """Verify loading the add form takes no write token."""
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse('add_record')).status_code, 200)
+
+    @override_settings(CASHFLOW_WRITE_CONCURRENCY=1, CASHFLOW_WRITE_ADMIT_WAIT=0)
+    def test_saturated_writes_are_shed_with_503(self):
+        """Verify a write finding no free slot is refused instead of waiting."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocker():
+            started.set()
+            release.wait(5)
+
+        writer = threading.Thread(target=run_write, args=(blocker,))
+        writer.start()
+        self.addCleanup(writer.join, 5)
+        self.addCleanup(release.set)
+        started.wait(5)
+
+        response = self.quick_add('A')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertEqual(metrics.snapshot()['throttle.shed'], 1)
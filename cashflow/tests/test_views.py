@@ -1,4 +1,8 @@
-from django.test import TestCase, Client
+import gzip
+
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from cashflow.models import Status, Type, Category, Subcategory, CashFlowRecord
 
@@ -102,4 +106,297 @@ class ViewTests(TestCase):
         
         # Verify deletion
         self.assertEqual(response.status_code, 200)
-        self.assertFalse(CashFlowRecord.objects.filter(id=record.id).exists())
\ No newline at end of file
+        self.assertFalse(CashFlowRecord.objects.filter(id=record.id).exists())
+
+
+class StreamingRecordListTests(TestCase):
+    """Tests for the streaming record list mode and streamed compression."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create enough records to span several stream chunks."""
+        status = Status.objects.create(name="Business")
+        type = Type.objects.create(name="Expense")
+        category = Category.objects.create(name="Rent")
+        subcategory = Subcategory.objects.create(name="Office", category=category)
+        CashFlowRecord.objects.bulk_create([
+            CashFlowRecord(
+                date="2025-01-01",
+                status=status,
+                type=type,
+                category=category,
+                subcategory=subcategory,
+                amount=10 + i,
+                comment=f"Row {i}",
+            )
+            for i in range(7)
+        ])
+
+    @override_settings(CASHFLOW_STREAM_CHUNK_SIZE=3)
+    def test_stream_mode_renders_all_rows(self):
+        """Verify the streamed page matches the buffered page content."""
+        response = self.client.get(reverse('record_list'), {'stream': '1'})
+
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.count('class="btn btn-danger btn-sm delete-btn'), 7)
+        self.assertIn('Cash Flow Records', content)
+        self.assertTrue(content.rstrip().endswith('</html>'))
+
+    def test_stream_mode_empty_result(self):
+        """Verify the empty-state row is streamed when nothing matches."""
+        response = self.client.get(reverse('record_list'), {'stream': '1', 'date_min': '2030-01-01'})
+
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('No records found matching your filters.', content)
+
+    @override_settings(CASHFLOW_RECORDS_PER_PAGE=3)
+    def test_buffered_list_is_paginated(self):
+        """Verify only one page of rows is rendered and links keep the filters."""
+        response = self.client.get(reverse('record_list'), {'date_min': '2024-01-01', 'page': '3'})
+
+        self.assertEqual([record.comment for record in response.context['records']], ["Row 0"])
+        self.assertContains(response, 'Page 3 of 3')
+        self.assertContains(response, '?date_min=2024-01-01&amp;page=2')
+
+    @override_settings(CASHFLOW_STREAM_CHUNK_SIZE=2)
+    def test_streamed_response_is_gzipped_per_chunk(self):
+        """Verify streamed pages are compressed without buffering every chunk."""
+        response = self.client.get(reverse('record_list'), {'stream': '1'}, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 3)
+        content = gzip.decompress(b''.join(chunks)).decode()
+        self.assertEqual(content.count('class="btn btn-danger btn-sm delete-btn'), 7)
+
+    def test_buffered_response_is_gzipped(self):
+        """Verify regular pages are compressed when the client accepts gzip."""
+        response = self.client.get(reverse('record_list'), HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'Cash Flow Records', gzip.decompress(response.content))
+
+
+class ReferenceUpsertTests(TestCase):
+    """Tests for the batch reference upsert endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create reference rows that the payload partly repeats."""
+        cls.status = Status.objects.create(name="Business")
+        cls.food = Category.objects.create(name="Food")
+        cls.travel = Category.objects.create(name="Travel")
+        cls.taxi = Subcategory.objects.create(name="Taxi", category=cls.travel)
+
+    def upsert(self, payload):
+        return self.client.post(reverse('bulk_upsert_references'), payload, content_type='application/json')
+
+    def test_creates_tree_and_returns_ids(self):
+        """Verify new names are created and existing ones keep their ids."""
+        response = self.upsert({
+            'statuses': ['Business', 'Personal'],
+            'types': ['Income', 'Expense'],
+            'categories': ['Salary', {'name': 'Food', 'subcategories': ['Restaurants', 'Groceries', 'Taxi']}],
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        self.assertEqual(data['statuses']['Business'], self.status.id)
+        self.assertEqual(data['statuses']['Personal'], Status.objects.get(name='Personal').id)
+        self.assertEqual(set(data['types']), {'Income', 'Expense'})
+        self.assertEqual(data['categories']['Food'], self.food.id)
+        self.assertEqual(Subcategory.objects.get(id=data['subcategories']['Groceries']).category, self.food)
+        # "Taxi" already belongs to Travel and is left there
+        self.assertEqual(data['conflicts'], ['Taxi'])
+        self.assertNotIn('Taxi', data['subcategories'])
+        self.taxi.refresh_from_db()
+        self.assertEqual(self.taxi.category, self.travel)
+
+    def test_repeated_upsert_is_idempotent(self):
+        """Verify a second identical request creates nothing and returns the same ids."""
+        payload = {'types': ['Income'], 'categories': [{'name': 'Rent', 'subcategories': ['Office']}]}
+        first = self.upsert(payload).json()
+        counts = (Type.objects.count(), Category.objects.count(), Subcategory.objects.count())
+
+        self.assertEqual(self.upsert(payload).json(), first)
+        self.assertEqual((Type.objects.count(), Category.objects.count(), Subcategory.objects.count()), counts)
+
+    def test_invalid_payload(self):
+        """Verify malformed bodies are rejected without writing."""
+        self.assertEqual(self.upsert({'statuses': 'Business'}).status_code, 400)
+        self.assertEqual(self.upsert({'types': ['  ']}).status_code, 400)
+        self.assertEqual(self.upsert({'categories': [{'name': 'X', 'subcategories': [1]}]}).status_code, 400)
+        response = self.client.post(reverse('bulk_upsert_references'), 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Category.objects.filter(name='X').exists())
+
+
+class ReferenceBootstrapTests(TestCase):
+    """Tests for the versioned reference bootstrap document."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create one row of each reference table."""
+        cls.status = Status.objects.create(name="Business")
+        cls.type = Type.objects.create(name="Income")
+        cls.category = Category.objects.create(name="Food")
+        cls.subcategory = Subcategory.objects.create(name="Groceries", category=cls.category)
+
+    def bootstrap_url(self):
+        response = self.client.get(reverse('add_record'))
+        return response.context['references_url']
+
+    def test_document_is_compact_and_immutable(self):
+        """Verify the hashed URL serves compact arrays with immutable caching."""
+        response = self.client.get(self.bootstrap_url())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response.json(), {
+            'statuses': [[self.status.id, 'Business']],
+            'types': [[self.type.id, 'Income']],
+            'categories': [[self.category.id, 'Food']],
+            'subcategories': [[self.subcategory.id, 'Groceries', self.category.id]],
+        })
+
+    def test_url_changes_with_content(self):
+        """Verify a reference change yields a new URL and the old one redirects."""
+        old_url = self.bootstrap_url()
+        Subcategory.objects.create(name="Restaurants", category=self.category)
+        new_url = self.bootstrap_url()
+
+        self.assertNotEqual(old_url, new_url)
+        response = self.client.get(old_url)
+        self.assertRedirects(response, new_url)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+    def test_form_references_bootstrap(self):
+        """Verify the add and edit forms expose the bootstrap URL to the script."""
+        url = self.bootstrap_url()
+        self.assertContains(self.client.get(reverse('add_record')), f'data-references-url="{url}"')
+
+
+class PatchRecordTests(TestCase):
+    """Tests for the inline-editing PATCH endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create reference data and one record."""
+        cls.status = Status.objects.create(name="Business")
+        cls.type = Type.objects.create(name="Expense")
+        cls.category = Category.objects.create(name="Office")
+        cls.subcategory = Subcategory.objects.create(name="Paper", category=cls.category)
+        cls.other_status = Status.objects.create(name="Personal")
+
+    def setUp(self):
+        """Create the record to edit."""
+        self.record = CashFlowRecord.objects.create(
+            date="2025-05-01", status=self.status, type=self.type, category=self.category,
+            subcategory=self.subcategory, amount="10.00", comment="Paper",
+        )
+        self.url = reverse('patch_record', args=[self.record.id])
+
+    def patch(self, data):
+        return self.client.patch(self.url, data, content_type='application/json')
+
+    def test_updates_only_submitted_columns(self):
+        """Verify one field is validated and written without touching the others."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch({'amount': '12.75'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['amount'], '12.75')
+        self.assertEqual(response.json()['status'], {'id': self.status.id, 'name': 'Business'})
+        update, = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertIn('"amount"', update)
+        self.assertIn('"fingerprint"', update)
+        self.assertNotIn('"comment"', update)
+        self.record.refresh_from_db()
+        self.assertEqual(str(self.record.amount), '12.75')
+        self.assertEqual(self.record.fingerprint, self.record.compute_fingerprint())
+
+    def test_updates_relation(self):
+        """Verify a foreign key can be patched by id."""
+        response = self.patch({'status': self.other_status.id})
+        self.assertEqual(response.json()['status']['name'], 'Personal')
+
+    def test_validation_errors(self):
+        """Verify invalid values and unknown fields are rejected."""
+        response = self.patch({'amount': '-5'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.json()['errors'])
+        self.assertEqual(self.patch({'fingerprint': 'x'}).status_code, 400)
+        self.assertEqual(self.patch({}).status_code, 400)
+        self.record.refresh_from_db()
+        self.assertEqual(str(self.record.amount), '10.00')
+
+    def test_only_patch_allowed(self):
+        """Verify other methods are refused."""
+        self.assertEqual(self.client.post(self.url, {'amount': '1'}).status_code, 405)
+
+    def test_rows_expose_editable_values(self):
+        """Verify list rows carry the record id and raw cell values."""
+        response = self.client.get(reverse('record_list'))
+        self.assertContains(response, f'data-record-id="{self.record.id}"')
+        self.assertContains(response, 'data-field="amount" data-value="10.00"')
+
+
+class RecordFilterTests(TestCase):
+    """Tests for amount, multi-value and comment filters of the record list."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create records with different categories, amounts and comments."""
+        status = Status.objects.create(name="Business")
+        record_type = Type.objects.create(name="Expense")
+        cls.categories = [Category.objects.create(name=f"Category {i}") for i in range(3)]
+        subcategories = [
+            Subcategory.objects.create(name=f"Subcategory {i}", category=category)
+            for i, category in enumerate(cls.categories)
+        ]
+        comments = ["Rent", "", None]
+        cls.records = [
+            CashFlowRecord.objects.create(
+                date=f"2025-01-{i + 1:02d}",
+                status=status,
+                type=record_type,
+                category=cls.categories[i % 3],
+                subcategory=subcategories[i % 3],
+                amount=10 * (i + 1),
+                comment=comments[i % 3],
+            )
+            for i in range(6)
+        ]
+
+    def listed_ids(self, **params):
+        """Return ids of the listed records, newest first."""
+        response = self.client.get(reverse('record_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [record.id for record in response.context['records']]
+
+    def ids(self, *indexes):
+        return [self.records[i].id for i in sorted(indexes, reverse=True)]
+
+    def test_amount_range(self):
+        """Verify amount bounds are inclusive and may be used alone."""
+        self.assertEqual(self.listed_ids(amount_min='20', amount_max='40'), self.ids(1, 2, 3))
+        self.assertEqual(self.listed_ids(amount_min='50'), self.ids(4, 5))
+
+    def test_multiple_categories(self):
+        """Verify several values of one filter match any of them, and one value still works."""
+        categories = [self.categories[0].id, self.categories[2].id]
+        self.assertEqual(self.listed_ids(category=categories), self.ids(0, 2, 3, 5))
+        self.assertEqual(self.listed_ids(category=self.categories[1].id), self.ids(1, 4))
+
+    def test_comment_presence(self):
+        """Verify empty and missing comments both count as no comment."""
+        self.assertEqual(self.listed_ids(has_comment='true'), self.ids(0, 3))
+        self.assertEqual(self.listed_ids(has_comment='false'), self.ids(1, 2, 4, 5))
+
+    def test_filters_combine(self):
+        """Verify all filters apply together."""
+        ids = self.listed_ids(
+            category=[self.categories[0].id, self.categories[1].id], amount_min='30', has_comment='false',
+        )
+        self.assertEqual(ids, self.ids(4))
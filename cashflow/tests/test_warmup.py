@@ -0,0 +1,58 @@
+import logging
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TransactionTestCase
+
+from cashflow.models import Category, Status, Subcategory
+from cashflow.references import get_references
+from cashflow.warmup import warm_up
+
+
+class ReferenceCacheTests(TransactionTestCase):
+    """Tests for the data-versioned reference lists."""
+
+    def setUp(self):
+        """Start from an empty cache with one reference tree."""
+        cache.clear()
+        self.status = Status.objects.create(name="Business")
+        category = Category.objects.create(name="Rent")
+        Subcategory.objects.create(name="Office", category=category)
+
+    def test_second_read_served_from_cache(self):
+        """Verify repeated reads run no queries."""
+        references = get_references()
+        self.assertEqual(references['statuses'], [{'id': self.status.id, 'name': "Business"}])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_references(), references)
+
+    def test_write_invalidates_references(self):
+        """Verify a committed reference write is visible on the next read."""
+        get_references()
+        Status.objects.create(name="Personal")
+        names = [status['name'] for status in get_references()['statuses']]
+        self.assertEqual(names, ["Business", "Personal"])
+
+
+class WarmUpTests(TransactionTestCase):
+    """Tests for the worker warm-up hook."""
+
+    def test_reports_step_timings(self):
+        """Verify every warm-up step is timed and logged."""
+        with self.assertLogs('cashflow.warmup', 'INFO') as logs:
+            timings = warm_up()
+        self.assertEqual(set(timings), {'templates', 'translations', 'references', 'total'})
+        self.assertGreaterEqual(timings['total'], timings['templates'])
+        self.assertIn('Warm-up finished', logs.output[0])
+
+    def test_connections_closed(self):
+        """Verify no database connection outlives the warm-up for forked workers."""
+        # The in-memory test database ignores close(), so check the call itself
+        with mock.patch('cashflow.warmup.connections.close_all') as close_all:
+            warm_up()
+        close_all.assert_called_once_with()
+
+    def test_logger_is_configured(self):
+        """Verify warm-up timings at INFO reach a handler."""
+        self.assertTrue(logging.getLogger('cashflow.warmup').isEnabledFor(logging.INFO))
@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from cashflow import metrics, writequeue
+from cashflow.models import CashFlowRecord, Category, Status, Subcategory, Type
+from cashflow.writequeue import WriteQueue, batch_size_bucket
+
+
+class WriteQueueTests(TransactionTestCase):
+    """Tests for the serialized write queue.
+
+    Runs outside a wrapping transaction because the writer thread commits
+    on its own connection.
+    """
+
+    def setUp(self):
+        """Start a queue locking a throwaway file."""
+        cache.clear()
+        lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lock_dir, ignore_errors=True)
+        self.queue = WriteQueue(batch_size=10, lock_path=os.path.join(lock_dir, 'write.lock'))
+        self.addCleanup(self.queue.stop, 5)
+
+    def hold_writer(self):
+        """Queue a write that blocks the writer until the returned event is set."""
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocker():
+            started.set()
+            release.wait(5)
+
+        future = self.queue.submit(blocker)
+        started.wait(5)
+        return release, future
+
+    def test_queued_writes_commit_in_one_batch(self):
+        """Verify writes queued behind a busy writer share one group transaction."""
+        release, first = self.hold_writer()
+        futures = [self.queue.submit(Status.objects.create, name=f'Status {index}') for index in range(3)]
+        self.assertEqual(self.queue.depth, 3)
+        release.set()
+
+        statuses = [future.result(5) for future in futures]
+        first.result(5)
+        self.assertEqual([status.name for status in statuses], ['Status 0', 'Status 1', 'Status 2'])
+        self.assertEqual(Status.objects.count(), 3)
+        counters = metrics.snapshot()
+        self.assertEqual(counters['write_queue.batches'], 2)
+        self.assertEqual(counters['write_queue.batch_size.1'], 1)
+        self.assertEqual(counters['write_queue.batch_size.2_4'], 1)
+        self.assertEqual(counters['write_queue.committed'], 4)
+        self.assertEqual(self.queue.max_depth, 3)
+
+    def test_failed_write_does_not_abort_batch(self):
+        """Verify one failing write only fails its own future."""
+        Status.objects.create(name='Taken')
+        release, _ = self.hold_writer()
+        duplicate = self.queue.submit(Status.objects.create, name='Taken')
+        fresh = self.queue.submit(Status.objects.create, name='Fresh')
+        release.set()
+
+        with self.assertRaises(Exception):
+            duplicate.result(5)
+        self.assertEqual(fresh.result(5).name, 'Fresh')
+        self.assertEqual(set(Status.objects.values_list('name', flat=True)), {'Taken', 'Fresh'})
+        self.assertEqual(metrics.snapshot()['write_queue.failed'], 1)
+
+    def test_batch_size_buckets(self):
+        """Verify batch sizes map to their counter buckets."""
+        self.assertEqual([batch_size_bucket(size) for size in (1, 2, 4, 5, 16, 17, 500)],
+                         ['1', '2_4', '2_4', '5_16', '5_16', '17_plus', '17_plus'])
+
+    @override_settings(CASHFLOW_WRITE_QUEUE=True)
+    def test_views_write_through_queue(self):
+        """Verify form and quick-add writes go through the queue when enabled."""
+        self.addCleanup(setattr, writequeue, '_write_queue', None)
+        writequeue._write_queue = self.queue
+        status = Status.objects.create(name='Business')
+        type_obj = Type.objects.create(name='Expense')
+        category = Category.objects.create(name='Office')
+        subcategory = Subcategory.objects.create(name='Paper', category=category)
+
+        response = self.client.post(reverse('add_record'), {
+            'date': '2025-06-01', 'status': status.id, 'type': type_obj.id,
+            'category': category.id, 'subcategory': subcategory.id, 'amount': '3.00',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.post(reverse('quick_add_type'), {'name': 'Income'}).status_code, 200)
+
+        self.assertEqual(CashFlowRecord.objects.count(), 1)
+        self.assertTrue(Type.objects.filter(name='Income').exists())
+        self.assertEqual(metrics.snapshot()['write_queue.submitted'], 2)
+        self.assertIn('write_queue.depth', self.client.get(reverse('metrics')).json()['gauges'])
+
+    @override_settings(CASHFLOW_WRITE_QUEUE=True, CASHFLOW_WRITE_ADMIT_WAIT=0.1, CASHFLOW_WRITE_QUEUE_TIMEOUT=0.2)
+    def test_waiting_write_is_withdrawn_with_503(self):
+        """Verify a write still queued after the admit wait is cancelled and answered with 503."""
+        self.addCleanup(setattr, writequeue, '_write_queue', None)
+        writequeue._write_queue = self.queue
+        release, _ = self.hold_writer()
+        self.addCleanup(release.set)
+
+        response = self.client.post(reverse('quick_add_category'), {'name': 'Office'})
+        release.set()
+        self.queue.stop(5)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        self.assertFalse(Category.objects.exists())
+
+    @override_settings(CASHFLOW_WRITE_QUEUE=True, CASHFLOW_WRITE_ADMIT_WAIT=0.1, CASHFLOW_WRITE_QUEUE_TIMEOUT=0.2)
+    def test_started_slow_write_is_reported_pending(self):
+        """Verify a started write that misses the timeout is reported pending and still commits."""
+        self.addCleanup(setattr, writequeue, '_write_queue', None)
+        writequeue._write_queue = self.queue
+        started = threading.Event()
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def slow_create(**fields):
+            started.set()
+            release.wait(5)
+            return Category.objects.create(**fields)
+
+        with self.assertRaises(writequeue.WritePending):
+            writequeue.run_write(slow_create, name='Office')
+        self.assertTrue(started.is_set())
+        release.set()
+        self.queue.stop(5)
+        self.assertTrue(Category.objects.filter(name='Office').exists())
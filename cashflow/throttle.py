@@ -0,0 +1,117 @@
+"""
+Per-client request throttling and load shedding.
+
+``@throttle(scope)`` gives every client (by address) one token bucket per
+view, stored in Django's cache so all workers share it. A bucket of rate
+``"N/period"`` (``CASHFLOW_THROTTLE_RATES[scope]``) holds up to N tokens
+and refills at N per period; a request without a token gets ``429`` with
+``Retry-After``. Reads and writes of a bucket are not atomic across
+workers, so a burst may let a few extra requests through.
+
+Views decorated with ``throttle`` also turn ``writequeue.Overloaded``
+(raised when the write path is saturated) into ``503`` with
+``Retry-After`` instead of waiting for the database timeout, and
+``writequeue.WritePending`` (a started write slow to commit) into ``202``.
+Rejections are counted in the ``throttle.*`` metrics.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+from . import metrics
+from .writequeue import Overloaded, WritePending
+
+KEY_PREFIX = 'cashflow:throttle:'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600}
+
+metrics.declare('throttle.rejected', 'throttle.shed', 'throttle.pending')
+
+
+def parse_rate(rate):
+    """Parse ``"N/period"`` into ``(capacity, tokens per second)``; None disables."""
+    if not rate:
+        return None
+    count, _, period = rate.partition('/')
+    try:
+        return int(count), int(count) / PERIODS[period.strip().lower()]
+    except (KeyError, ValueError):
+        raise ValueError(f'Invalid throttle rate: {rate!r} (expected e.g. "60/min")') from None
+
+
+def take_token(key, rate, now=None):
+    """Take one token from the bucket at ``key``.
+
+    Returns:
+        float: 0 when a token was taken, otherwise seconds until the next one
+    """
+    capacity, per_second = rate
+    now = time.time() if now is None else now
+    tokens, updated = cache.get(key) or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * per_second)
+    if tokens < 1:
+        return (1 - tokens) / per_second
+    # A bucket untouched until it is full again is the same as no bucket
+    cache.set(key, (tokens - 1, now), math.ceil(capacity / per_second))
+    return 0
+
+
+def client_id(request):
+    """Address of the client, from ``CASHFLOW_THROTTLE_CLIENT_HEADER`` behind a proxy.
+
+    Proxies append to the header, so only the last
+    ``CASHFLOW_THROTTLE_TRUSTED_PROXIES`` entries were written by trusted
+    proxies; entries before them come from the client and are ignored.
+    """
+    header = settings.CASHFLOW_THROTTLE_CLIENT_HEADER
+    if header and request.headers.get(header):
+        entries = [entry.strip() for entry in request.headers[header].split(',') if entry.strip()]
+        if entries:
+            return entries[-min(max(settings.CASHFLOW_THROTTLE_TRUSTED_PROXIES, 1), len(entries))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def rejected(status, retry_after, message):
+    response = JsonResponse({'error': message}, status=status)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def throttle(scope, safe_methods=True):
+    """Rate-limit a view per client and shed load when writes are saturated.
+
+    Args:
+        scope: Key of ``CASHFLOW_THROTTLE_RATES`` giving the bucket rate
+        safe_methods: Whether GET/HEAD/OPTIONS requests take tokens too
+    """
+    metrics.declare(f'throttle.rejected.{scope}')
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            rate = parse_rate(settings.CASHFLOW_THROTTLE_RATES.get(scope)) if settings.CASHFLOW_THROTTLE else None
+            if rate and (safe_methods or request.method not in SAFE_METHODS):
+                key = f'{KEY_PREFIX}{scope}:{view.__name__}:{client_id(request)}'
+                wait = take_token(key, rate)
+                if wait:
+                    metrics.incr('throttle.rejected')
+                    metrics.incr(f'throttle.rejected.{scope}')
+                    return rejected(429, wait, 'Too many requests')
+            try:
+                return view(request, *args, **kwargs)
+            except Overloaded as exc:
+                metrics.incr('throttle.shed')
+                return rejected(503, exc.retry_after, 'Server busy, try again later')
+            except WritePending as exc:
+                metrics.incr('throttle.pending')
+                response = JsonResponse(
+                    {'status': 'pending', 'message': 'Write started but not committed yet'}, status=202,
+                )
+                response['Retry-After'] = str(max(1, math.ceil(exc.retry_after)))
+                return response
+        return wrapper
+    return decorator
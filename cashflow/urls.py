@@ -7,14 +7,31 @@ urlpatterns = [
     path('add/', views.add_record, name='add_record'),
     path('edit-record/<int:pk>/', views.edit_record, name='edit_record'),
     path('delete/<int:pk>/', views.delete_record, name='delete_record'),
+    path('records/<int:pk>/', views.patch_record, name='patch_record'),
+    path('records/events/', views.record_events, name='record_events'),
     
     # Dynamic data loading URLs
     path('get_categories/', views.get_categories, name='get_categories'),
     path('get_subcategories/', views.get_subcategories, name='get_subcategories'),
+    path('references/<slug:digest>.json', views.reference_bootstrap, name='reference_bootstrap'),
     
     # Quick-add functionality URLs
     path('status/quick-add/', views.quick_add_status, name='quick_add_status'),
     path('type/quick-add/', views.quick_add_type, name='quick_add_type'),
     path('category/quick-add/', views.quick_add_category, name='quick_add_category'),
     path('subcategory/quick-add/', views.quick_add_subcategory, name='quick_add_subcategory'),
+    path('references/bulk-upsert/', views.bulk_upsert_references, name='bulk_upsert_references'),
+
+    # Background job URLs
+    path('jobs/submit/<slug:kind>/', views.submit_job, name='submit_job'),
+    path('jobs/<int:pk>/', views.job_status, name='job_status'),
+    path('jobs/<int:pk>/download/', views.job_download, name='job_download'),
+
+    # Analytics URLs
+    path('analytics/', views.record_analytics, name='record_analytics'),
+    path('forecast/', views.forecast_report, name='forecast_report'),
+    path('budgets/', views.budget_report, name='budget_report'),
+
+    # Monitoring URLs
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,12 +1,30 @@
+import json
+import os
+from datetime import date
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, render, redirect
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.urls import reverse
+from django.utils import translation
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
-from .models import CashFlowRecord, Status, Type, Category, Subcategory
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+from . import analytics, budgets, duplicates, events, forecast, jobs, metrics, snapshot
+from .cache import cached_filter_result, versioned_page_cache
+from .querybudget import query_budget
+from .throttle import throttle
+from .references import get_bootstrap, get_references, parse_reference_tree, upsert_references
+from .models import CashFlowRecord, Status, Type, Category, Subcategory, Job
 from .filters import CashFlowFilter
-from .forms import CashFlowForm
+from .forms import CashFlowForm, CashFlowPatchForm
+from .writequeue import Overloaded, WritePending, run_write
 
 
+@query_budget(10)
+@versioned_page_cache
 def record_list(request):
     """
     Display a filtered and paginated list of cash flow records.
@@ -15,21 +33,79 @@ def record_list(request):
         request: HttpRequest object
         
     Returns:
-        HttpResponse: Rendered record list template with filtered records
+        HttpResponse: Rendered record list template with one page of records,
+        or a StreamingHttpResponse of all matching records when streaming
+        mode is requested
         
     Context:
         filter: CashFlowFilter instance for filtering records
-        records: Filtered and ordered queryset of CashFlowRecords
+        records: Records of the current page, newest first
+        page_obj: Page of matching record ids
+        page_query: Query string of the active filters, without ``page``
     """
-    records = CashFlowRecord.objects.all().order_by('-date')
+    records = CashFlowRecord.objects.select_related(
+        'status', 'type', 'category', 'subcategory'
+    ).order_by('-date', '-id')
     record_filter = CashFlowFilter(request.GET, queryset=records)
-    
-    return render(request, 'cashflow/record_list.html', {
+
+    if request.GET.get('stream') == '1' or settings.CASHFLOW_STREAM_RECORD_LIST:
+        context = {'filter': record_filter, 'records': record_filter.qs}
+        return StreamingHttpResponse(_stream_record_list(request, context))
+
+    # Ids of matching records are shared across requests until the next write;
+    # only the rows of the requested page are fetched
+    record_ids = cached_filter_result(
+        'record_ids', request.GET,
+        lambda: list(record_filter.qs.values_list('id', flat=True)),
+    )
+    page = Paginator(record_ids, settings.CASHFLOW_RECORDS_PER_PAGE).get_page(request.GET.get('page'))
+    rows = records.in_bulk(page.object_list)
+    page_query = request.GET.copy()
+    page_query.pop('page', None)
+    context = {
         'filter': record_filter,
-        'records': record_filter.qs
-    })
+        'records': [rows[pk] for pk in page.object_list if pk in rows],
+        'page_obj': page,
+        'page_query': page_query.urlencode(),
+    }
+    return render(request, 'cashflow/record_list.html', context)
+
+
+def _stream_record_list(request, context):
+    """
+    Yield the record list page piece by piece.
 
+    The page shell up to the table body is sent first, then rows are rendered
+    in chunks from a server-side iterator, so neither time-to-first-byte nor
+    memory grows with the number of records.
+    """
+    language = translation.get_language()
+    chunk_size = settings.CASHFLOW_STREAM_CHUNK_SIZE
+    row_template = get_template('cashflow/includes/record_rows.html')
+
+    with translation.override(language):
+        page = render_to_string('cashflow/record_list.html', {**context, 'streaming': True}, request)
+    head, tail = page.split('<!--cashflow:rows-->', 1)
+    yield head
+
+    chunk = []
+    streamed = False
+    for record in context['records'].iterator(chunk_size=chunk_size):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            with translation.override(language):
+                yield row_template.render({'records': chunk}, request)
+            chunk = []
+            streamed = True
+    if chunk or not streamed:
+        # An empty final chunk renders the "no records" row
+        with translation.override(language):
+            yield row_template.render({'records': chunk}, request)
+    yield tail
 
+
+@query_budget(12)
+@throttle('write', safe_methods=False)
 def add_record(request):
     """
     Handle cash flow record creation through form submission.
@@ -42,29 +118,25 @@ def add_record(request):
         
     Context:
         form: CashFlowForm instance
-        statuses: All available Status objects
-        types: All available Type objects
-        categories: All available Category objects
-        subcategories: All available Subcategory objects
+        statuses/types/categories/subcategories: Cached reference lists
+            of id/name dicts (see references.get_references)
+        references_url: Versioned URL of the reference bootstrap document
     """
     if request.method == 'POST':
         form = CashFlowForm(request.POST)
         if form.is_valid():
-            form.save()
+            run_write(form.save)
             return redirect('record_list')
     else:
         form = CashFlowForm()
     
-    context = {
-        'form': form,
-        'statuses': Status.objects.all(),
-        'types': Type.objects.all(),
-        'categories': Category.objects.all(),
-        'subcategories': Subcategory.objects.all()
-    }
+    references = get_references()
+    context = {'form': form, **references, 'references_url': _bootstrap_url(references)}
     return render(request, 'cashflow/add_record.html', context)
 
 
+@query_budget(13)
+@throttle('write', safe_methods=False)
 def edit_record(request, pk):
     """
     Handle editing of existing cash flow records.
@@ -80,7 +152,8 @@ def edit_record(request, pk):
         form: CashFlowForm instance pre-populated with record data
         is_edit: Boolean flag indicating edit mode
         record_id: ID of record being edited
-        statuses/types/categories/subcategories: All available options
+        statuses/types/categories/subcategories: Cached reference lists
+        references_url: Versioned URL of the reference bootstrap document
         selected_[field]_id: Currently selected IDs for dropdowns
     """
     record = get_object_or_404(CashFlowRecord, pk=pk)
@@ -88,27 +161,28 @@ def edit_record(request, pk):
     if request.method == 'POST':
         form = CashFlowForm(request.POST, instance=record)
         if form.is_valid():
-            form.save()
+            run_write(form.save)
             return redirect('record_list')
     else:
         form = CashFlowForm(instance=record)
 
+    references = get_references()
     context = {
         'form': form,
         'is_edit': True,
         'record_id': record.id,
-        'statuses': Status.objects.all(),
-        'types': Type.objects.all(),
-        'categories': Category.objects.all(),
-        'subcategories': Subcategory.objects.all(),
-        'selected_category_id': record.category.id,
-        'selected_status_id': record.status.id,
-        'selected_type_id': record.type.id,
-        'selected_subcategory_id': record.subcategory.id,
+        **references,
+        'references_url': _bootstrap_url(references),
+        'selected_category_id': record.category_id,
+        'selected_status_id': record.status_id,
+        'selected_type_id': record.type_id,
+        'selected_subcategory_id': record.subcategory_id,
     }
     return render(request, 'cashflow/add_record.html', context)
 
 
+@query_budget(2)
+@throttle('write')
 @require_POST
 def delete_record(request, pk):
     """
@@ -128,7 +202,7 @@ def delete_record(request, pk):
     """
     try:
         record = CashFlowRecord.objects.get(pk=pk)
-        record.delete()
+        run_write(record.delete)
         return JsonResponse({
             'status': 'success',
             'message': f'Record {pk} deleted successfully'
@@ -138,6 +212,9 @@ def delete_record(request, pk):
             'status': 'error',
             'message': f'Record {pk} not found'
         }, status=404)
+    except (Overloaded, WritePending):
+        # Answered by throttle with 503 / 202
+        raise
     except Exception as e:
         return JsonResponse({
             'status': 'error',
@@ -145,7 +222,64 @@ def delete_record(request, pk):
         }, status=500)
 
 
+def _record_payload(record):
+    payload = {
+        'id': record.id,
+        'date': record.date.isoformat(),
+        'amount': str(record.amount),
+        'comment': record.comment or '',
+    }
+    for field in ('status', 'type', 'category', 'subcategory'):
+        related = getattr(record, field)
+        payload[field] = {'id': related.id, 'name': related.name}
+    return payload
+
+
+@query_budget(5)
+@throttle('write')
+@require_http_methods(['PATCH'])
+def patch_record(request, pk):
+    """
+    Update some fields of a record in place (inline editing).
+
+    Only the submitted fields are validated and only their columns are
+    written.
+
+    Args:
+        request: HttpRequest with a JSON object body, e.g. ``{"amount": "12.50"}``
+        pk: Primary key of the record
+
+    Returns:
+        JsonResponse: The updated record (see ``_record_payload``)
+
+    Possible Responses:
+        200: Record updated
+        400: Invalid JSON, unknown fields or validation errors (``errors``
+            in ``Form.errors.get_json_data()`` format)
+        404: Record not found
+    """
+    record = get_object_or_404(
+        CashFlowRecord.objects.select_related('status', 'type', 'category', 'subcategory'), pk=pk
+    )
+    try:
+        data = json.loads(request.body)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if not isinstance(data, dict) or not data:
+        return JsonResponse({'error': 'A JSON object with the changed fields is required'}, status=400)
+
+    form = CashFlowPatchForm(data, instance=record)
+    unknown = set(data) - set(form.fields)
+    if unknown:
+        return JsonResponse({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}, status=400)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    return JsonResponse(_record_payload(run_write(form.save)))
+
+
 # AJAX API Endpoints
+@query_budget(4)
+@throttle('write')
 @csrf_exempt
 def quick_add_status(request):
     """
@@ -167,7 +301,7 @@ def quick_add_status(request):
     if request.method == 'POST':
         status_name = request.POST.get('name', '').strip()
         if status_name:
-            status, created = Status.objects.get_or_create(name=status_name)
+            status, created = run_write(Status.objects.get_or_create, name=status_name)
             return JsonResponse({
                 'id': status.id, 
                 'name': status.name
@@ -175,6 +309,8 @@ def quick_add_status(request):
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
 
+@query_budget(4)
+@throttle('write')
 @csrf_exempt
 def quick_add_type(request):
     """
@@ -184,7 +320,7 @@ def quick_add_type(request):
     if request.method == 'POST':
         type_name = request.POST.get('name', '').strip()
         if type_name:
-            type_obj, created = Type.objects.get_or_create(name=type_name)
+            type_obj, created = run_write(Type.objects.get_or_create, name=type_name)
             return JsonResponse({
                 'id': type_obj.id, 
                 'name': type_obj.name
@@ -192,6 +328,8 @@ def quick_add_type(request):
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
 
+@query_budget(1)
+@throttle('write')
 @csrf_exempt
 def quick_add_category(request):
     """
@@ -216,17 +354,21 @@ def quick_add_category(request):
             return JsonResponse({'error': 'Name is required'}, status=400)
             
         try:
-            category = Category.objects.create(name=name)
+            category = run_write(Category.objects.create, name=name)
             return JsonResponse({
                 'id': category.id,
                 'name': category.name
             })
+        except (Overloaded, WritePending):
+            raise
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
     
     return JsonResponse({'error': 'Invalid request method'}, status=400)
 
 
+@query_budget(1)
+@throttle('write')
 @csrf_exempt
 def quick_add_subcategory(request):
     """
@@ -256,7 +398,8 @@ def quick_add_subcategory(request):
             return JsonResponse({'error': 'Name is required'}, status=400)
             
         try:
-            subcategory = Subcategory.objects.create(
+            subcategory = run_write(
+                Subcategory.objects.create,
                 name=name,
                 category_id=category_id
             )
@@ -264,15 +407,85 @@ def quick_add_subcategory(request):
                 'id': subcategory.id,
                 'name': subcategory.name
             })
+        except (Overloaded, WritePending):
+            raise
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
     
     return JsonResponse({'error': 'Invalid request method'}, status=400)
 
 
+@query_budget(10)
+@throttle('write')
+@csrf_exempt
+@require_POST
+def bulk_upsert_references(request):
+    """
+    AJAX endpoint creating a whole tree of reference data in one transaction.
+
+    Existing names are kept, so the call is idempotent and safe to run from
+    several clients at once.
+
+    Request Body (JSON):
+        {"statuses": [name, ...], "types": [name, ...],
+         "categories": [name | {"name": name, "subcategories": [name, ...]}, ...]}
+
+    Returns:
+        JsonResponse: ``statuses``, ``types``, ``categories`` and
+        ``subcategories`` name -> id maps and ``conflicts`` (subcategory
+        names already used by another category)
+
+    Possible Responses:
+        200: Success with the id maps
+        400: Invalid JSON or payload
+    """
+    try:
+        tree = parse_reference_tree(json.loads(request.body))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(upsert_references(tree))
+
+
+def _bootstrap_url(references):
+    digest, _ = get_bootstrap(references)
+    return reverse('reference_bootstrap', args=[digest])
+
+
+@query_budget(4)
+@require_GET
+def reference_bootstrap(request, digest):
+    """
+    Serve all reference lists as one compact JSON document.
+
+    The URL carries the content hash of the document, so a response can be
+    cached by the browser forever; a stale hash redirects to the current one.
+
+    Args:
+        request: HttpRequest object
+        digest: Content hash from ``references.get_bootstrap``
+
+    Response Format:
+        {"statuses": [[id, name], ...], "types": [...], "categories": [...],
+         "subcategories": [[id, name, category_id], ...]}
+    """
+    current, body = get_bootstrap()
+    if digest != current:
+        response = redirect('reference_bootstrap', digest=current)
+        response['Cache-Control'] = 'no-cache'
+        return response
+    response = HttpResponse(body, content_type='application/json')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response['ETag'] = f'"{digest}"'
+    return response
+
+
+@query_budget(1)
+@throttle('ajax')
 def get_categories(request):
     """
-    AJAX endpoint for fetching categories filtered by type.
+    AJAX endpoint for fetching categories.
     
     Args:
         request: HttpRequest object with GET parameters
@@ -280,17 +493,19 @@ def get_categories(request):
     Returns:
         JsonResponse: List of categories in JSON format
         
-    Required GET Parameters:
-        type_id: ID of type to filter categories
+    Optional GET Parameters:
+        type_id: Accepted for compatibility and ignored; categories are no
+            longer linked to types (migration 0002)
         
     Response Format:
         [{'id': int, 'name': str}, ...]
     """
-    type_id = request.GET.get('type_id')
-    categories = Category.objects.filter(type_id=type_id).values('id', 'name')
+    categories = Category.objects.values('id', 'name')
     return JsonResponse(list(categories), safe=False)
 
 
+@query_budget(1)
+@throttle('ajax')
 def get_subcategories(request):
     """
     AJAX endpoint for fetching subcategories filtered by category.
@@ -309,4 +524,275 @@ def get_subcategories(request):
     """
     category_id = request.GET.get('category_id')
     subcategories = Subcategory.objects.filter(category_id=category_id).values('id', 'name')
-    return JsonResponse(list(subcategories), safe=False)
\ No newline at end of file
+    return JsonResponse(list(subcategories), safe=False)
+
+
+# Background job endpoints
+def _job_payload(job):
+    """Serialize a Job for the status and submit endpoints."""
+    payload = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'status_url': reverse('job_status', args=[job.id]),
+    }
+    if job.status == Job.STATUS_DONE and job.result_file:
+        payload['download_url'] = reverse('job_download', args=[job.id])
+    if job.status == Job.STATUS_FAILED:
+        payload['error'] = job.error.strip().splitlines()[-1] if job.error else ''
+    return payload
+
+
+@query_budget(1)
+@throttle('write')
+@require_POST
+def submit_job(request, kind):
+    """
+    Queue a background job and return immediately.
+
+    Args:
+        request: HttpRequest object (POST only)
+        kind: Registered job kind (export_records, import_records, monthly_report)
+
+    POST Parameters:
+        file: CSV upload (import_records only)
+        on_duplicate: skip, warn or merge (import_records only, optional)
+        any other: Record filter parameters (export_records, monthly_report)
+
+    Possible Responses:
+        202: Job queued, body contains its status URL
+        400: Unknown job kind, duplicate policy or missing upload
+    """
+    if kind not in jobs.JOB_HANDLERS:
+        return JsonResponse({'error': f'Unknown job kind: {kind}'}, status=400)
+
+    if kind == 'import_records':
+        upload = request.FILES.get('file')
+        if upload is None:
+            return JsonResponse({'error': 'File is required'}, status=400)
+        on_duplicate = request.POST.get('on_duplicate')
+        if on_duplicate and on_duplicate not in duplicates.POLICIES:
+            return JsonResponse({'error': f'Unknown duplicate policy: {on_duplicate}'}, status=400)
+        params = {'path': jobs.save_upload(upload)}
+        if on_duplicate:
+            params['on_duplicate'] = on_duplicate
+    else:
+        filters = {key: values for key, values in request.POST.lists() if key != 'csrfmiddlewaretoken'}
+        params = {'filters': filters}
+
+    job = jobs.submit_job(kind, params)
+    return JsonResponse(_job_payload(job), status=202)
+
+
+@query_budget(1)
+@require_GET
+def job_status(request, pk):
+    """
+    Report the state and progress of a background job.
+
+    Response Format:
+        {'id': int, 'kind': str, 'status': str, 'progress': int, ...}
+    """
+    job = get_object_or_404(Job, pk=pk)
+    return JsonResponse(_job_payload(job))
+
+
+@query_budget(1)
+@require_GET
+def job_download(request, pk):
+    """
+    Download the result file of a finished job.
+
+    Possible Responses:
+        200: Result file as an attachment
+        404: Unknown job or missing result file
+        409: Job has not finished successfully yet
+    """
+    job = get_object_or_404(Job, pk=pk)
+    if job.status != Job.STATUS_DONE:
+        return JsonResponse({'error': 'Job is not finished'}, status=409)
+
+    path = os.path.join(jobs.jobs_root(), job.result_file)
+    if not job.result_file or not os.path.isfile(path):
+        raise Http404('Result file not found')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
+
+
+@query_budget(6)
+@require_GET
+def record_analytics(request):
+    """
+    Statistics and outliers of the records matching the list filters.
+
+    Accepts the record_list filter parameters. Results are cached per filter
+    set until the next write.
+
+    Optional GET Parameters:
+        window: Rolling average window in days (default 7)
+        z: Z-score threshold for outliers (default 3)
+        iqr: IQR fence factor for outliers (default 1.5)
+        source: ``snapshot`` to analyze the memory-mapped columnar snapshot
+            (manage.py snapshot_records) without querying the database;
+            the result is as fresh as the last refresh
+
+    Response Format:
+        {'overall': {...}, 'categories': [...], 'daily': [...],
+         'outliers': [...], 'outlier_count': int}
+        plus 'snapshot': {'generation', 'rows', 'watermark'} for the snapshot source
+
+    Possible Responses:
+        200: Analysis result
+        400: Invalid numeric or filter parameter
+        404: No snapshot has been built yet
+    """
+    try:
+        window = max(1, int(request.GET.get('window', 7)))
+        z_threshold = float(request.GET.get('z', 3.0))
+        iqr_factor = float(request.GET.get('iqr', 1.5))
+    except ValueError:
+        return JsonResponse({'error': 'window, z and iqr must be numbers'}, status=400)
+
+    if request.GET.get('source') == 'snapshot':
+        records = snapshot.load_snapshot()
+        if records is None:
+            return JsonResponse({'error': 'No snapshot yet, run manage.py snapshot_records'}, status=404)
+        try:
+            arrays = snapshot.analytics_arrays(records, request.GET)
+        except ValueError as exc:
+            return JsonResponse({'error': f'Invalid filter: {exc}'}, status=400)
+        result = analytics.analyze_arrays(
+            arrays, records.dictionaries['category'], window, z_threshold, iqr_factor,
+        )
+        result['snapshot'] = {key: records.manifest[key] for key in ('generation', 'rows', 'watermark')}
+        return JsonResponse(result)
+
+    record_filter = CashFlowFilter(request.GET, queryset=CashFlowRecord.objects.all())
+    if not record_filter.is_valid():
+        return JsonResponse({'errors': record_filter.errors.get_json_data()}, status=400)
+    result = cached_filter_result(
+        'analytics', request.GET,
+        lambda: analytics.analyze(record_filter.qs, window, z_threshold, iqr_factor),
+    )
+    return JsonResponse(result)
+
+
+@query_budget(4)
+@require_GET
+def forecast_report(request):
+    """
+    Projected income, expense and net balance for the coming months.
+
+    Optional GET Parameters:
+        months: Number of months to project (1-36, default
+            CASHFLOW_FORECAST_MONTHS)
+        format: ``json`` for the raw forecast
+
+    Returns:
+        HttpResponse: Rendered forecast report, or JsonResponse with
+        ``format=json``
+
+    Context:
+        forecast: Result of forecast.forecast()
+        totals: Per-month rows of month, income, expense, net and balance
+        horizon: Number of projected months
+    """
+    try:
+        horizon = min(36, max(1, int(request.GET.get('months', settings.CASHFLOW_FORECAST_MONTHS))))
+    except ValueError:
+        horizon = settings.CASHFLOW_FORECAST_MONTHS
+    result = forecast.forecast(horizon)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(result)
+
+    totals = result['totals']
+    context = {
+        'forecast': result,
+        'totals': list(zip(result['months'], totals['income'], totals['expense'], totals['net'], totals['balance'])),
+        'horizon': horizon,
+    }
+    return render(request, 'cashflow/forecast.html', context)
+
+
+@query_budget(4)
+@require_GET
+def budget_report(request):
+    """
+    Spending against every budget in the current month, quarter or year.
+
+    Actuals come from the monthly aggregates maintained with each record
+    write, so the page costs the same whatever the number of records.
+
+    Optional GET Parameters:
+        date: Day whose periods are reported (YYYY-MM-DD, default today)
+        format: ``json`` for the raw report
+
+    Returns:
+        HttpResponse: Rendered budget report, or JsonResponse with
+        ``format=json``
+
+    Context:
+        report: Result of budgets.budget_report()
+        day: Reported day
+
+    Possible Responses:
+        200: Budget report
+        400: Invalid date
+    """
+    day = date.today()
+    if request.GET.get('date'):
+        try:
+            day = date.fromisoformat(request.GET['date'])
+        except ValueError:
+            return JsonResponse({'error': 'date must look like YYYY-MM-DD'}, status=400)
+    report = budgets.budget_report(day)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(report)
+    return render(request, 'cashflow/budgets.html', {'report': report, 'day': day})
+
+
+@query_budget(0)
+@require_GET
+async def record_events(request):
+    """
+    Server-Sent Events stream of record and reference changes.
+
+    Served through ASGI the stream stays open and is fed by the in-process
+    broker (see ``cashflow.events``). Under WSGI, which would tie up a
+    worker thread per client, the missed events are sent and the stream
+    ends; the browser reconnects after the ``retry`` delay, i.e. polls.
+
+    Headers:
+        Last-Event-ID: Id of the last event received (sent by EventSource
+            when reconnecting)
+
+    Events:
+        record: {"op": "saved", "id", "date", "amount", "comment",
+            "status"/"type"/"category"/"subcategory": [id, name or null]}
+            or {"op": "deleted", "id"}
+        reference: {"op": "saved" | "deleted", "model", "id", "name"}
+        refresh: {} - changes that cannot be patched in place; reload the list
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    tenant = getattr(request, 'tenant', None)
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(events.stream(last_event_id, tenant), content_type='text/event-stream')
+    else:
+        response = HttpResponse(events.backlog(last_event_id, tenant), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@query_budget(0)
+@require_GET
+def metrics_view(request):
+    """
+    Report application counters (page cache hits/misses, ...) and the
+    gauges of the worker process serving the request (write queue depth).
+
+    Response Format:
+        {'counters': {name: int, ...}, 'gauges': {name: int, ...}}
+    """
+    return JsonResponse({'counters': metrics.snapshot(), 'gauges': metrics.gauges()})
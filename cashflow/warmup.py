@@ -0,0 +1,80 @@
+"""
+Worker warm-up run from the WSGI/ASGI entry points.
+
+The first request served by a fresh worker otherwise pays for compiling the
+main templates, loading the translation catalogs and querying the reference
+tables. ``warm_up`` does that work at boot instead. It is not run from
+``AppConfig.ready`` so management commands such as ``migrate`` never touch
+tables that may not exist yet, and database errors only skip the reference
+step. Connections are closed afterwards, so workers forked from a preloading
+server (``gunicorn --preload``) never share the master's SQLite handle.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template.loader import get_template
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TEMPLATES = (
+    'base.html',
+    'cashflow/record_list.html',
+    'cashflow/includes/record_rows.html',
+    'cashflow/add_record.html',
+)
+
+
+def _timed(timings, step, func):
+    start = time.perf_counter()
+    func()
+    timings[step] = round((time.perf_counter() - start) * 1000, 3)
+
+
+def _compile_templates():
+    for name in WARMUP_TEMPLATES:
+        get_template(name)
+
+
+def _load_catalogs():
+    for code, _ in settings.LANGUAGES:
+        with translation.override(code):
+            translation.gettext('CashFlow')
+
+
+def _prime_references():
+    from .references import get_bootstrap, get_references
+
+    try:
+        get_bootstrap(get_references())
+    except DatabaseError as exc:
+        logger.warning('Warm-up skipped reference data: %s', exc)
+
+
+def warm_up():
+    """Compile templates, load catalogs and prime reference data.
+
+    Returns:
+        dict: Duration of each step and the total, in milliseconds
+    """
+    timings = {}
+    start = time.perf_counter()
+    _timed(timings, 'templates', _compile_templates)
+    _timed(timings, 'translations', _load_catalogs)
+    _timed(timings, 'references', _prime_references)
+    connections.close_all()
+    timings['total'] = round((time.perf_counter() - start) * 1000, 3)
+    logger.info(
+        'Warm-up finished in %.1f ms (templates %.1f, translations %.1f, references %.1f)',
+        timings['total'], timings['templates'], timings['translations'], timings['references'],
+    )
+    return timings
+
+
+def warm_up_if_enabled():
+    """Run ``warm_up`` when ``CASHFLOW_WARMUP`` is enabled."""
+    if settings.CASHFLOW_WARMUP:
+        return warm_up()
+    return None
@@ -0,0 +1,293 @@
+"""
+Serialized write path for SQLite.
+
+With ``CASHFLOW_WRITE_QUEUE`` enabled, views hand their mutations to a
+single writer thread per worker process instead of writing from the request
+thread. The writer drains its queue in batches of up to
+``CASHFLOW_WRITE_QUEUE_BATCH`` writes and runs each batch as one group
+transaction, every write in its own savepoint so a failing write does not
+affect the others. Writer threads of different worker processes take an
+exclusive lock on ``CASHFLOW_WRITE_QUEUE_LOCK`` around each transaction, so
+SQLite sees one writer at a time instead of lock timeouts. Writes of
+different tenants go to different databases, so they are committed in
+separate transactions under separate lock files. Callers get a
+``concurrent.futures.Future`` per write.
+
+``run_write`` refuses work instead of queueing it when the write path is
+saturated: more than ``CASHFLOW_WRITE_QUEUE_MAX_DEPTH`` queued writes, no
+free slot among ``CASHFLOW_WRITE_CONCURRENCY`` direct writers within
+``CASHFLOW_WRITE_ADMIT_WAIT`` seconds, or a database still locked after
+its timeout. It raises ``Overloaded``, which ``throttle`` answers with 503.
+A queued write that has not started within ``CASHFLOW_WRITE_ADMIT_WAIT`` is
+withdrawn the same way; one that started but is slow to commit raises
+``WritePending``, answered with 202 since it may still commit.
+"""
+import atexit
+import contextvars
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: workers rely on SQLite's busy timeout instead
+    fcntl = None
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+
+from . import metrics
+from .tenants import db_alias
+
+logger = logging.getLogger(__name__)
+
+# Upper bound (inclusive) and counter suffix of each batch size bucket
+BATCH_SIZE_BUCKETS = ((1, '1'), (4, '2_4'), (16, '5_16'), (None, '17_plus'))
+
+metrics.declare(
+    'write_queue.submitted',
+    'write_queue.batches',
+    'write_queue.committed',
+    'write_queue.failed',
+    *(f'write_queue.batch_size.{label}' for _, label in BATCH_SIZE_BUCKETS),
+)
+
+
+class WriteQueue:
+    """
+    Queue of pending writes consumed by one writer thread.
+
+    The thread starts with the first submitted write and keeps its own
+    database connection.
+    """
+
+    def __init__(self, batch_size=50, lock_path=None):
+        self.batch_size = batch_size
+        self.lock_path = lock_path
+        self.max_depth = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def depth(self):
+        """Number of writes waiting for the writer."""
+        return self._queue.qsize()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue ``func(*args, **kwargs)`` for the writer thread.
+
+        Returns:
+            Future: Resolves to the return value of ``func`` once its batch
+            has committed, or to the exception it (or the commit) raised
+        """
+        future = Future()
+        self._ensure_started()
+        # The write runs with the caller's context, i.e. its tenant
+        self._queue.put((future, func, args, kwargs, contextvars.copy_context()))
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        metrics.incr('write_queue.submitted')
+        return future
+
+    def stop(self, timeout=None):
+        """Finish the queued writes and stop the writer thread."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='cashflow-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            running = True
+            while running:
+                batch, running = self._next_batch()
+                if batch:
+                    self._commit(batch)
+        finally:
+            connections.close_all()
+
+    def _next_batch(self):
+        """Block for one write, then take whatever else is queued up to the batch size.
+
+        Returns:
+            tuple: ``(batch, running)``; ``running`` is False once the stop
+            marker was taken
+        """
+        batch = []
+        item = self._queue.get()
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, True
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return batch, True
+        return batch, False
+
+    def _commit(self, batch):
+        groups = {}
+        for item in batch:
+            if item[0].set_running_or_notify_cancel():
+                context = item[4]
+                groups.setdefault(context.run(db_alias), []).append(item)
+        for alias, pending in groups.items():
+            # Commit hooks (cache invalidation) must see the tenant of the writes
+            pending[0][4].run(self._commit_group, alias, pending)
+
+    def _commit_group(self, alias, pending):
+        outcomes = []
+        try:
+            with self._process_lock(alias), transaction.atomic(using=alias):
+                for future, func, args, kwargs, _ in pending:
+                    try:
+                        with transaction.atomic(using=alias):
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            # The group transaction failed to commit: none of the writes happened
+            logger.exception('Write queue batch of %d failed to commit', len(pending))
+            metrics.incr('write_queue.failed', len(pending))
+            for future, *_ in pending:
+                future.set_exception(exc)
+            return
+
+        failed = 0
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                failed += 1
+                future.set_exception(exc)
+        metrics.incr('write_queue.batches')
+        metrics.incr(f'write_queue.batch_size.{batch_size_bucket(len(pending))}')
+        if len(pending) > failed:
+            metrics.incr('write_queue.committed', len(pending) - failed)
+        if failed:
+            metrics.incr('write_queue.failed', failed)
+
+    @contextmanager
+    def _process_lock(self, alias):
+        """Hold an exclusive lock on the database's lock file shared by all worker processes."""
+        if fcntl is None or not self.lock_path:
+            yield
+            return
+        lock_path = self.lock_path if alias == 'default' else f'{self.lock_path}.{alias}'
+        os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class Overloaded(Exception):
+    """Raised instead of waiting when the write path is saturated."""
+
+    def __init__(self, reason, retry_after=None):
+        super().__init__(reason)
+        self.retry_after = settings.CASHFLOW_OVERLOAD_RETRY_AFTER if retry_after is None else retry_after
+
+
+class WritePending(Exception):
+    """Raised when a started write did not commit in time; it may still commit."""
+
+    def __init__(self, reason, retry_after=None):
+        super().__init__(reason)
+        self.retry_after = settings.CASHFLOW_OVERLOAD_RETRY_AFTER if retry_after is None else retry_after
+
+
+def batch_size_bucket(size):
+    """Counter suffix of the bucket a batch size falls in."""
+    for upper, label in BATCH_SIZE_BUCKETS:
+        if upper is None or size <= upper:
+            return label
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+# (size, semaphore) limiting direct writes in this process
+_write_slots = None
+
+
+def get_write_queue():
+    """Return this process's write queue, creating it from settings on first use."""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue(
+                batch_size=settings.CASHFLOW_WRITE_QUEUE_BATCH,
+                lock_path=settings.CASHFLOW_WRITE_QUEUE_LOCK,
+            )
+            atexit.register(_write_queue.stop, 5)
+        return _write_queue
+
+
+def run_write(func, *args, **kwargs):
+    """Run a write through the write queue when enabled, otherwise directly.
+
+    Waits up to ``CASHFLOW_WRITE_ADMIT_WAIT`` seconds for a queued write to
+    start, then up to ``CASHFLOW_WRITE_QUEUE_TIMEOUT`` in total for its
+    result, and re-raises the exception of a failed write.
+
+    Raises:
+        Overloaded: The write was withdrawn from the queue before it started
+        WritePending: The write started but has not committed in time; it
+            may still commit
+    """
+    if not settings.CASHFLOW_WRITE_QUEUE:
+        return _run_direct(func, *args, **kwargs)
+    write_queue = get_write_queue()
+    if write_queue.depth >= settings.CASHFLOW_WRITE_QUEUE_MAX_DEPTH:
+        raise Overloaded(f'{write_queue.depth} writes queued')
+    future = write_queue.submit(func, *args, **kwargs)
+    admit_wait = min(settings.CASHFLOW_WRITE_ADMIT_WAIT, settings.CASHFLOW_WRITE_QUEUE_TIMEOUT)
+    try:
+        return future.result(timeout=admit_wait)
+    except FutureTimeoutError:
+        # cancel() only succeeds while the writer has not taken the write
+        if future.cancel():
+            raise Overloaded(f'write not started within {admit_wait:g} s') from None
+    try:
+        return future.result(timeout=max(settings.CASHFLOW_WRITE_QUEUE_TIMEOUT - admit_wait, 0))
+    except FutureTimeoutError:
+        raise WritePending('write started but not committed yet') from None
+
+
+def _run_direct(func, *args, **kwargs):
+    global _write_slots
+    size = settings.CASHFLOW_WRITE_CONCURRENCY
+    if _write_slots is None or _write_slots[0] != size:
+        _write_slots = (size, threading.BoundedSemaphore(size))
+    slots = _write_slots[1]
+    if not slots.acquire(timeout=settings.CASHFLOW_WRITE_ADMIT_WAIT):
+        raise Overloaded(f'{size} writes in progress')
+    try:
+        return func(*args, **kwargs)
+    except OperationalError as exc:
+        if 'locked' in str(exc):
+            raise Overloaded('database is locked') from exc
+        raise
+    finally:
+        slots.release()
+
+
+def queue_depth():
+    """Writes currently waiting in this process's queue."""
+    return _write_queue.depth if _write_queue is not None else 0
+
+
+metrics.register_gauge('write_queue.depth', queue_depth)
+metrics.register_gauge('write_queue.max_depth', lambda: _write_queue.max_depth if _write_queue is not None else 0)
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cashflow_project.settings')
 
 application = get_asgi_application()
+
+# Pay template, translation and reference-data costs before the first request
+from cashflow.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
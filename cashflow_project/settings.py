@@ -40,11 +40,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'cashflow.middleware.StaticAssetMiddleware',
+    'cashflow.middleware.StreamingGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cashflow.tenants.TenantMiddleware',
+    'cashflow.profiling.ProfilerMiddleware',
+    'cashflow.querybudget.QueryBudgetMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,6 +67,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.i18n',
+                'cashflow.context_processors.page_cache_csrf',
             ],
         },
     },
@@ -80,6 +86,19 @@ DATABASES = {
     }
 }
 
+# Ledger models go to the active tenant's database (see cashflow.tenants)
+DATABASE_ROUTERS = ['cashflow.tenants.TenantRouter']
+
+# Cache shared by all workers; point CACHE_URL at a shared backend
+# (e.g. filecache:///var/tmp/cashflow or redis://...) when running several
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://cashflow'),
+}
+
+# Full-page cache for record_list, invalidated by data version on every write
+CASHFLOW_PAGE_CACHE = env.bool('CASHFLOW_PAGE_CACHE', default=True)
+CASHFLOW_PAGE_CACHE_TIMEOUT = env.int('CASHFLOW_PAGE_CACHE_TIMEOUT', default=300)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -120,5 +139,120 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic fingerprints assets and writes gzip/brotli variants, which
+# StaticAssetMiddleware serves with immutable caching (no separate web server)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'cashflow.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+CASHFLOW_SERVE_STATIC = env.bool('CASHFLOW_SERVE_STATIC', default=True)
+
+# Background jobs (exports, imports, reports) run by `manage.py run_jobs`
+CASHFLOW_JOBS_ROOT = env('CASHFLOW_JOBS_ROOT', default=os.path.join(BASE_DIR, 'var', 'jobs'))
+CASHFLOW_JOB_WORKERS = env.int('CASHFLOW_JOB_WORKERS', default=2)
+
+# Record ids matching a filter combination are cached per data version in a
+# per-process LRU (bounded by entry count) backed by the shared cache
+CASHFLOW_FILTER_CACHE = env.bool('CASHFLOW_FILTER_CACHE', default=True)
+CASHFLOW_FILTER_CACHE_SIZE = env.int('CASHFLOW_FILTER_CACHE_SIZE', default=256)
+CASHFLOW_FILTER_CACHE_TIMEOUT = env.int('CASHFLOW_FILTER_CACHE_TIMEOUT', default=300)
+CASHFLOW_RECORDS_PER_PAGE = env.int('CASHFLOW_RECORDS_PER_PAGE', default=50)
+
+# Stream record_list rows in chunks instead of buffering the whole page
+# (also available per request with ?stream=1)
+CASHFLOW_STREAM_RECORD_LIST = env.bool('CASHFLOW_STREAM_RECORD_LIST', default=False)
+CASHFLOW_STREAM_CHUNK_SIZE = env.int('CASHFLOW_STREAM_CHUNK_SIZE', default=500)
+
+# Staff-only request profiling (X-Cashflow-Profile: 1 header or ?_profile=1)
+CASHFLOW_PROFILING = env.bool('CASHFLOW_PROFILING', default=True)
+CASHFLOW_PROFILE_DIR = env('CASHFLOW_PROFILE_DIR', default=os.path.join(BASE_DIR, 'var', 'profiles'))
+CASHFLOW_SLOW_QUERY_MS = env.float('CASHFLOW_SLOW_QUERY_MS', default=100.0)
+
+# Per-view query budgets and N+1 detection (development and tests)
+CASHFLOW_QUERY_BUDGETS_ENABLED = env.bool('CASHFLOW_QUERY_BUDGETS_ENABLED', default=DEBUG)
+CASHFLOW_QUERY_BUDGET_RAISE = env.bool('CASHFLOW_QUERY_BUDGET_RAISE', default=DEBUG)
+CASHFLOW_NPLUSONE_THRESHOLD = env.int('CASHFLOW_NPLUSONE_THRESHOLD', default=3)
+# URL name -> max queries; overrides budgets declared with @query_budget
+CASHFLOW_QUERY_BUDGETS = {}
+
+# Compile templates, load catalogs and prime reference data when a WSGI/ASGI
+# worker boots (see cashflow.warmup)
+CASHFLOW_WARMUP = env.bool('CASHFLOW_WARMUP', default=True)
+
+# Forecast report: types counted as income (by name) and default horizon
+CASHFLOW_INCOME_TYPES = env.list('CASHFLOW_INCOME_TYPES', default=['Income', 'Пополнение'])
+CASHFLOW_FORECAST_MONTHS = env.int('CASHFLOW_FORECAST_MONTHS', default=6)
+
+# Online SQLite backups written by `manage.py backup_cashflow`
+CASHFLOW_BACKUP_DIR = env('CASHFLOW_BACKUP_DIR', default=os.path.join(BASE_DIR, 'var', 'backups'))
+CASHFLOW_BACKUP_KEEP = env.int('CASHFLOW_BACKUP_KEEP', default=7)
+# Seconds a backup may take, including restarts caused by concurrent writes
+CASHFLOW_BACKUP_TIMEOUT = env.float('CASHFLOW_BACKUP_TIMEOUT', default=600)
+
+# What to do with a record whose content fingerprint matches an existing
+# one: skip, warn (ask for confirmation / report) or merge
+CASHFLOW_DUPLICATE_POLICY = env('CASHFLOW_DUPLICATE_POLICY', default='warn')
+
+# Funnel view writes through one writer thread per process, committed in
+# group transactions and serialized across processes with a lock file
+CASHFLOW_WRITE_QUEUE = env.bool('CASHFLOW_WRITE_QUEUE', default=False)
+CASHFLOW_WRITE_QUEUE_BATCH = env.int('CASHFLOW_WRITE_QUEUE_BATCH', default=50)
+CASHFLOW_WRITE_QUEUE_LOCK = env('CASHFLOW_WRITE_QUEUE_LOCK', default=os.path.join(BASE_DIR, 'var', 'write.lock'))
+CASHFLOW_WRITE_QUEUE_TIMEOUT = env.int('CASHFLOW_WRITE_QUEUE_TIMEOUT', default=30)
+
+# Load shedding: writes are refused with 503 instead of waiting when this
+# many are queued, or when no direct write slot frees up within the wait
+CASHFLOW_WRITE_QUEUE_MAX_DEPTH = env.int('CASHFLOW_WRITE_QUEUE_MAX_DEPTH', default=500)
+CASHFLOW_WRITE_CONCURRENCY = env.int('CASHFLOW_WRITE_CONCURRENCY', default=4)
+CASHFLOW_WRITE_ADMIT_WAIT = env.float('CASHFLOW_WRITE_ADMIT_WAIT', default=5.0)
+CASHFLOW_OVERLOAD_RETRY_AFTER = env.int('CASHFLOW_OVERLOAD_RETRY_AFTER', default=5)
+
+# Token buckets per client and view ("N/s", "N/min" or "N/hour"; empty
+# disables a scope), shared by all workers through the cache
+CASHFLOW_THROTTLE = env.bool('CASHFLOW_THROTTLE', default=True)
+CASHFLOW_THROTTLE_RATES = {
+    'write': env('CASHFLOW_THROTTLE_WRITE', default='120/min'),
+    'ajax': env('CASHFLOW_THROTTLE_AJAX', default='600/min'),
+}
+# Header holding the client address behind a reverse proxy (e.g. X-Forwarded-For)
+# and the number of trusted proxies appending to it; the address is the
+# entry the outermost trusted proxy appended
+CASHFLOW_THROTTLE_CLIENT_HEADER = env('CASHFLOW_THROTTLE_CLIENT_HEADER', default='')
+CASHFLOW_THROTTLE_TRUSTED_PROXIES = env.int('CASHFLOW_THROTTLE_TRUSTED_PROXIES', default=1)
+
+# Live record-list updates: events kept for reconnecting clients, seconds
+# between heartbeats and between checks for writes made by other workers
+CASHFLOW_EVENTS_BUFFER = env.int('CASHFLOW_EVENTS_BUFFER', default=1000)
+CASHFLOW_EVENTS_HEARTBEAT = env.int('CASHFLOW_EVENTS_HEARTBEAT', default=15)
+CASHFLOW_EVENTS_POLL = env.int('CASHFLOW_EVENTS_POLL', default=5)
+
+# Per-tenant ledgers: directory of new tenant databases and the request
+# header naming the tenant (a "cashflow_tenant" cookie works too)
+CASHFLOW_TENANT_DIR = env('CASHFLOW_TENANT_DIR', default=os.path.join(BASE_DIR, 'var', 'tenants'))
+CASHFLOW_TENANT_HEADER = env('CASHFLOW_TENANT_HEADER', default='X-Cashflow-Tenant')
+
+# Columnar record snapshots for analytics (manage.py snapshot_records),
+# one subdirectory per tenant
+CASHFLOW_SNAPSHOT_DIR = env('CASHFLOW_SNAPSHOT_DIR', default=os.path.join(BASE_DIR, 'var', 'snapshots'))
+
+# Application log (warm-up timings, backups, slow queries, ...) goes to stderr
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'cashflow': {
+            'handlers': ['console'],
+            'level': env('CASHFLOW_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
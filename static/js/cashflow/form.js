@@ -1,5 +1,57 @@
+const REFERENCES_STORAGE_KEY = 'cashflow.references';
+
+/**
+ * Load the reference bootstrap document, from localStorage when the stored
+ * copy has the same versioned URL, otherwise from the server (once).
+ * @param {string} url - Content-hashed bootstrap URL rendered by the page
+ * @returns {Promise<Object>} Bootstrap document
+ */
+export function loadReferences(url) {
+    try {
+        const stored = JSON.parse(localStorage.getItem(REFERENCES_STORAGE_KEY));
+        if (stored && stored.url === url) return Promise.resolve(stored.data);
+    } catch (error) {
+        // Storage disabled or corrupted: fall through to the network
+    }
+    return fetch(url)
+        .then(response => response.json())
+        .then(data => {
+            try {
+                localStorage.setItem(REFERENCES_STORAGE_KEY, JSON.stringify({ url, data }));
+            } catch (error) {
+                // Quota exceeded or storage disabled: keep the in-memory copy only
+            }
+            return data;
+        });
+}
+
+/**
+ * Group bootstrap subcategories by category id.
+ * @param {Object} data - Bootstrap document
+ * @returns {Map<string, Array>} Category id -> [id, name] pairs
+ */
+export function indexSubcategories(data) {
+    const index = new Map();
+    data.subcategories.forEach(([id, name, categoryId]) => {
+        const key = String(categoryId);
+        if (!index.has(key)) index.set(key, []);
+        index.get(key).push([id, name]);
+    });
+    return index;
+}
+
 // Initialize all form interactions
 export function initCashFlowForm() {
+    const form = document.querySelector('form[data-references-url]');
+    const referencesUrl = form?.dataset.referencesUrl;
+    // Subcategories by category id, filled from the bootstrap document
+    let subcategoryIndex = null;
+    const subcategoriesReady = referencesUrl
+        ? loadReferences(referencesUrl)
+            .then(data => { subcategoryIndex = indexSubcategories(data); })
+            .catch(error => console.error('Error:', error))
+        : Promise.resolve();
+
     /**
      * Generic function to handle dynamic field addition
      * @param {string} selectId - ID of the select element
@@ -45,6 +97,11 @@ export function initCashFlowForm() {
             .then(response => response.json())
             .then(data => {
                 if (data.id) {
+                    if (extraParams.category_id && subcategoryIndex) {
+                        const key = String(formData.get('category_id'));
+                        if (!subcategoryIndex.has(key)) subcategoryIndex.set(key, []);
+                        subcategoryIndex.get(key).push([data.id, data.name]);
+                    }
                     const option = new Option(data.name, data.id, true, true);
                     select.add(option);
                     input.value = '';
@@ -92,19 +149,29 @@ export function initCashFlowForm() {
         }
     );
     
-    // Dynamic subcategory loading
+    // Subcategories are filtered locally from the bootstrap document; the
+    // per-category endpoint is only used when it could not be loaded
     document.getElementById("id_category")?.addEventListener("change", function() {
         const categoryId = this.value;
         if (!categoryId) return;
-        
-        fetch(`/get_subcategories/?category_id=${categoryId}`)
-            .then(response => response.json())
-            .then(data => {
-                const select = document.getElementById("id_subcategory");
-                select.innerHTML = '<option value="" selected disabled>Select subcategory...</option>';
-                data.forEach(item => {
-                    select.add(new Option(item.name, item.id));
-                });
-            });
+
+        const select = document.getElementById("id_subcategory");
+        const placeholder = select.options[0]?.text || 'Select subcategory...';
+        const fill = items => {
+            select.innerHTML = '';
+            select.add(new Option(placeholder, '', true, true));
+            select.options[0].disabled = true;
+            items.forEach(([id, name]) => select.add(new Option(name, id)));
+        };
+
+        subcategoriesReady.then(() => {
+            if (subcategoryIndex) {
+                fill(subcategoryIndex.get(categoryId) || []);
+                return;
+            }
+            fetch(`/get_subcategories/?category_id=${categoryId}`)
+                .then(response => response.json())
+                .then(data => fill(data.map(item => [item.id, item.name])));
+        });
     });
-}
\ No newline at end of file
+}
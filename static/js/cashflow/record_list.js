@@ -37,3 +37,153 @@ export function initRecordList() {
         });
     });
 }
+
+// Inline editing: double-click a date, amount or comment cell, then press
+// Enter (or leave the field) to PATCH just that field; Escape cancels
+const INLINE_INPUT_TYPES = {date: 'date', amount: 'number', comment: 'text'};
+
+const formatCell = (field, value) => {
+    if (field === 'amount') return `${value} ₽`;
+    if (field === 'comment' && value.length > 50) return `${value.slice(0, 49)}…`;
+    return value;
+};
+
+export function initInlineEditing() {
+    const table = document.querySelector('table[data-csrf-token]');
+
+    table.addEventListener('dblclick', (e) => {
+        const cell = e.target.closest('td[data-field]');
+        if (!cell || cell.querySelector('input')) return;
+        const field = cell.dataset.field;
+        const recordId = cell.closest('tr').dataset.recordId;
+        const original = cell.innerHTML;
+
+        const input = document.createElement('input');
+        input.type = INLINE_INPUT_TYPES[field] || 'text';
+        input.className = 'form-control form-control-sm';
+        input.value = cell.dataset.value;
+        if (field === 'amount') input.step = '0.01';
+        cell.replaceChildren(input);
+        input.focus();
+
+        const restore = () => { cell.innerHTML = original; };
+        const save = async () => {
+            if (input.value === cell.dataset.value) return restore();
+            try {
+                const response = await fetch(`/records/${recordId}/`, {
+                    method: 'PATCH',
+                    headers: {
+                        'X-CSRFToken': table.dataset.csrfToken,
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({[field]: input.value})
+                });
+                const data = await response.json();
+                if (!response.ok) {
+                    const messages = Object.values(data.errors || {}).flat().map(error => error.message);
+                    throw new Error(messages.join(' ') || data.error);
+                }
+                cell.dataset.value = data[field];
+                cell.textContent = formatCell(field, data[field]);
+            } catch (error) {
+                console.error('Error:', error);
+                alert('Error updating record: ' + error.message);
+                restore();
+            }
+        };
+
+        input.addEventListener('blur', save, {once: true});
+        input.addEventListener('keydown', (event) => {
+            if (event.key === 'Enter') {
+                input.blur();
+            } else if (event.key === 'Escape') {
+                input.removeEventListener('blur', save);
+                restore();
+            }
+        });
+    });
+}
+
+// Live updates: patch rows in place from the record event stream; changes
+// that cannot be placed (new records, moved dates, unknown names) show a
+// reload banner instead
+export function initLiveUpdates() {
+    const table = document.querySelector('table[data-events-url]');
+    if (!window.EventSource) return;
+    const banner = document.getElementById('live-updates-banner');
+    const showBanner = () => banner?.classList.remove('d-none');
+    const source = new EventSource(table.dataset.eventsUrl);
+
+    source.addEventListener('record', (e) => {
+        const data = JSON.parse(e.data);
+        const row = table.querySelector(`tr[data-record-id="${data.id}"]`);
+        if (data.op === 'deleted') {
+            row?.remove();
+            return;
+        }
+        if (!row) return showBanner();
+
+        ['date', 'amount', 'comment'].forEach(field => {
+            const cell = row.querySelector(`td[data-field="${field}"]`);
+            if (!cell || cell.querySelector('input') || cell.dataset.value === data[field]) return;
+            if (field === 'date') showBanner();
+            cell.dataset.value = data[field];
+            cell.textContent = formatCell(field, data[field]);
+        });
+        ['status', 'type', 'category', 'subcategory'].forEach(field => {
+            const cell = row.querySelector(`td[data-ref^="${field}:"]`);
+            const [id, name] = data[field];
+            if (!cell || cell.dataset.ref === `${field}:${id}`) return;
+            if (name === null) return showBanner();
+            cell.dataset.ref = `${field}:${id}`;
+            cell.textContent = name;
+        });
+    });
+
+    source.addEventListener('reference', (e) => {
+        const data = JSON.parse(e.data);
+        if (data.op !== 'saved') return;
+        table.querySelectorAll(`td[data-ref="${data.model}:${data.id}"]`).forEach(cell => {
+            cell.textContent = data.name;
+        });
+    });
+
+    source.addEventListener('refresh', showBanner);
+}
+
+// Export filtered records via a background job, then download the result
+export function initExport() {
+    const exportBtn = document.getElementById('export-btn');
+    const label = exportBtn.innerHTML;
+
+    const pollJob = async (statusUrl) => {
+        while (true) {
+            const job = await (await fetch(statusUrl)).json();
+            if (job.status === 'done') return job;
+            if (job.status === 'failed') throw new Error(job.error || 'Export failed');
+            exportBtn.textContent = `${job.progress}%`;
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    };
+
+    exportBtn.addEventListener('click', async function() {
+        const csrfToken = document.querySelector('table').dataset.csrfToken;
+        this.disabled = true;
+        try {
+            const response = await fetch(this.dataset.submitUrl, {
+                method: 'POST',
+                headers: {'X-CSRFToken': csrfToken},
+                body: new FormData(this.closest('form'))
+            });
+            if (!response.ok) throw new Error('Failed to start export');
+            const job = await pollJob((await response.json()).status_url);
+            window.location.href = job.download_url;
+        } catch (error) {
+            console.error('Error:', error);
+            alert('Error exporting records: ' + error.message);
+        } finally {
+            this.disabled = false;
+            this.innerHTML = label;
+        }
+    });
+}